@@ -0,0 +1,103 @@
+# app/association.py
+import numpy as np
+
+
+class SpatialAssociator:
+    """
+    Once-per-frame batched association of persons with bottles and smoke.
+
+    - person-hand x bottle: delegated to DrinkingDetector.detect_drinking_batch
+      (one distance matrix).
+    - person-head x smoke box: the head region is a box around the mouth
+      point (sized by face width) or, without pose, the top head_fraction of
+      the person box, grown by head_margin. A (persons x smoke) overlap
+      matrix is built in NumPy; each smoke box is attributed to the one
+      overlapping head whose centre is closest, so smoke no longer colours
+      every person.
+
+    Cost is a few array ops over (persons x objects), no per-pair Python calls.
+    """
+
+    def __init__(self, drinking_detector, head_fraction=0.25, head_margin=0.5, face_scale=2.5):
+        self.drinking_detector = drinking_detector
+        self.head_fraction = head_fraction
+        self.head_margin = head_margin
+        self.face_scale = face_scale
+
+    def head_boxes(self, person_boxes, person_data_list):
+        boxes = np.asarray(person_boxes, dtype=np.float32).reshape(-1, 4)
+        x1, y1, x2, y2 = boxes.T
+        w, h = x2 - x1, y2 - y1
+
+        # Default: top slice of the person box
+        heads = np.stack([x1, y1, x2, y1 + self.head_fraction * h], axis=1)
+
+        # Better: around the mouth point, when pose found one
+        for i, data in enumerate(person_data_list):
+            if data and data.get("mouth") is not None and data.get("face_width", 0) > 0:
+                mx, my = data["mouth"]
+                half = self.face_scale * data["face_width"] / 2.0
+                heads[i] = (mx - half, my - half, mx + half, my + half)
+
+        # Smoke drifts: grow the head box
+        hw = (heads[:, 2] - heads[:, 0]) * self.head_margin
+        hh = (heads[:, 3] - heads[:, 1]) * self.head_margin
+        heads[:, 0] -= hw
+        heads[:, 2] += hw
+        heads[:, 1] -= hh
+        heads[:, 3] += hh
+        return heads
+
+    def attribute_smoke(self, heads, smoke_boxes):
+        """Returns smoke_idx: int array (P,), index of the attributed smoke box or -1."""
+        n = len(heads)
+        smoke_idx = np.full(n, -1, dtype=np.int64)
+        if n == 0 or len(smoke_boxes) == 0:
+            return smoke_idx
+
+        smoke = np.asarray(smoke_boxes, dtype=np.float32).reshape(-1, 4)
+        ix1 = np.maximum(heads[:, None, 0], smoke[None, :, 0])
+        iy1 = np.maximum(heads[:, None, 1], smoke[None, :, 1])
+        ix2 = np.minimum(heads[:, None, 2], smoke[None, :, 2])
+        iy2 = np.minimum(heads[:, None, 3], smoke[None, :, 3])
+        overlaps = (ix2 > ix1) & (iy2 > iy1)  # (P, S)
+
+        head_c = np.stack([(heads[:, 0] + heads[:, 2]) / 2, (heads[:, 1] + heads[:, 3]) / 2], axis=1)
+        smoke_c = np.stack([(smoke[:, 0] + smoke[:, 2]) / 2, (smoke[:, 1] + smoke[:, 3]) / 2], axis=1)
+        dist = np.linalg.norm(head_c[:, None, :] - smoke_c[None, :, :], axis=2)
+        dist = np.where(overlaps, dist, np.inf)
+
+        # Each smoke box goes to its closest overlapping head
+        owner = np.argmin(dist, axis=0)                      # (S,)
+        has_owner = np.isfinite(dist[owner, np.arange(len(smoke))])
+        for s in np.nonzero(has_owner)[0]:
+            p = owner[s]
+            if smoke_idx[p] < 0 or dist[p, s] < dist[p, smoke_idx[p]]:
+                smoke_idx[p] = s
+        return smoke_idx
+
+    def associate(self, tracked, person_points, bottle_boxes, smoke_boxes):
+        """
+        tracked: [(oid, bbox, cls, conf), ...]
+        person_points: {oid: person_data or None}
+        Returns {oid: {"drinking": bool, "bottle": idx or None,
+                       "smoke": bool, "smoke_box": idx or None}}
+        """
+        if not tracked:
+            return {}
+        oids = [oid for oid, _, _, _ in tracked]
+        data = [person_points.get(oid) for oid in oids]
+
+        is_drinking, bottle_idx = self.drinking_detector.detect_drinking_batch(data, bottle_boxes)
+        heads = self.head_boxes([bbox for _, bbox, _, _ in tracked], data)
+        smoke_idx = self.attribute_smoke(heads, smoke_boxes)
+
+        out = {}
+        for i, oid in enumerate(oids):
+            out[oid] = {
+                "drinking": bool(is_drinking[i]),
+                "bottle": int(bottle_idx[i]) if bottle_idx[i] >= 0 else None,
+                "smoke": bool(smoke_idx[i] >= 0),
+                "smoke_box": int(smoke_idx[i]) if smoke_idx[i] >= 0 else None,
+            }
+        return out
@@ -0,0 +1,372 @@
+# app/backends.py
+"""
+Pluggable CPU inference backends for the YOLO models.
+
+The backend is picked from the weights path, so Detector / SmokeDetector keep
+the same detect() contract whatever runs underneath:
+    yolov8n.pt                 PyTorch (eager)
+    yolov8n.onnx               ONNX Runtime
+    yolov8n.int8.onnx          ONNX Runtime, static INT8 (quantize_onnx_int8)
+    yolov8n_openvino_model/    OpenVINO IR
+
+Export, quantize and compare:
+    python -m app.backends --weights yolov8n.pt app/best.pt --calib-dir data/ --report backends.json
+
+INT8 models must stay within --max-map-drop mAP@0.5 of their FP32 export
+(accuracy_gate); the command exits non-zero otherwise.
+
+Optional dependencies: onnx + onnxruntime (ONNX, INT8), openvino (IR).
+ultralytics / torch are imported on use, so the report helpers (map50,
+accuracy_gate, detect_head_nodes) load without them.
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".avi")
+
+
+def backend_of(path):
+    path = str(path)
+    if path.endswith(".onnx"):
+        return "onnx"
+    if path.rstrip("/").endswith("_openvino_model") or path.endswith(".xml"):
+        return "openvino"
+    return "torch"
+
+
+def load_yolo(path, device='cpu'):
+    """YOLO model for any backend. Only PyTorch weights can be moved with .to()."""
+    from ultralytics import YOLO
+    model = YOLO(str(path), task="detect")
+    if backend_of(path) == "torch":
+        model.to(device)
+    return model
+
+
+# ----------------------------------------------------------
+# EXPORT
+# ----------------------------------------------------------
+def export_onnx(weights, imgsz=640):
+    # dynamic=True keeps the batch axis free for detect_batch / the inference server
+    from ultralytics import YOLO
+    return YOLO(str(weights)).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+
+
+def export_openvino(weights, imgsz=640, half=False):
+    from ultralytics import YOLO
+    return YOLO(str(weights)).export(format="openvino", imgsz=imgsz, dynamic=True, half=half)
+
+
+# ----------------------------------------------------------
+# CALIBRATION DATA (frames from our own footage)
+# ----------------------------------------------------------
+def sample_frames(source_dir, count=200, per_video=None):
+    """Evenly spaced frames from every .mp4/.avi under source_dir."""
+    videos = sorted(str(p) for p in Path(source_dir).rglob("*") if p.suffix.lower() in VIDEO_EXTENSIONS)
+    if not videos:
+        raise FileNotFoundError(f"no {'/'.join(VIDEO_EXTENSIONS)} files in {source_dir}")
+    per_video = per_video or max(1, count // len(videos))
+
+    frames = []
+    for path in videos:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or per_video
+        for idx in np.linspace(0, max(total - 1, 0), per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+    return frames[:count]
+
+
+class _FrameCalibrationReader:
+    """onnxruntime CalibrationDataReader over letterboxed frames."""
+
+    def __init__(self, frames, input_name, imgsz):
+        from app.letterbox import letterbox
+        self._inputs = iter(
+            {input_name: letterbox(frame, imgsz).tensor.numpy()} for frame in frames
+        )
+
+    def get_next(self):
+        return next(self._inputs, None)
+
+
+# ----------------------------------------------------------
+# INT8 POST-TRAINING QUANTIZATION
+# ----------------------------------------------------------
+def detect_head_nodes(model):
+    """
+    Names of the YOLO detect-head decode nodes: everything between the graph
+    output and the last Conv layers (final Concat, class Sigmoid, DFL
+    softmax/conv, box decode arithmetic, reshapes). Their outputs are box
+    coordinates in pixels and scores in [0, 1] in one tensor, which a single
+    INT8 scale cannot represent, so they stay in float.
+    """
+    producers = {out: node for node in model.graph.node for out in node.output}
+    excluded, stack = set(), [o.name for o in model.graph.output]
+    while stack:
+        node = producers.get(stack.pop())
+        if node is None or node.name in excluded:
+            continue  # graph input / initializer, or already visited
+        if node.op_type == "Conv" and "dfl" not in node.name.lower():
+            continue  # last feature conv of the head: quantized as usual
+        excluded.add(node.name)
+        stack.extend(node.input)
+    return sorted(excluded)
+
+
+def quantize_onnx_int8(onnx_path, frames, imgsz=640, out_path=None):
+    """
+    Static INT8 (QDQ, per-channel) quantization calibrated on our frames.
+    The detect-head decode stays in float (detect_head_nodes).
+    """
+    import onnx
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    onnx_path = str(onnx_path)
+    out_path = out_path or onnx_path.replace(".onnx", ".int8.onnx")
+    input_name = ort.InferenceSession(onnx_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class Reader(_FrameCalibrationReader, CalibrationDataReader):
+        pass
+
+    quantize_static(
+        onnx_path,
+        out_path,
+        Reader(frames, input_name, imgsz),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+        nodes_to_exclude=detect_head_nodes(onnx.load(onnx_path)),
+    )
+
+    # Keep the ultralytics metadata (class names, stride, imgsz) so YOLO() can load it
+    src, dst = onnx.load(onnx_path), onnx.load(out_path)
+    del dst.metadata_props[:]
+    dst.metadata_props.extend(src.metadata_props)
+    onnx.save(dst, out_path)
+    return out_path
+
+
+def quantize_openvino_int8(ir_dir, frames, imgsz=640, out_dir=None):
+    """INT8 OpenVINO IR via NNCF, same calibration frames."""
+    import nncf
+    import openvino as ov
+    from app.letterbox import letterbox
+
+    ir_dir = Path(ir_dir)
+    xml = next(ir_dir.glob("*.xml"))
+    model = ov.Core().read_model(str(xml))
+    dataset = nncf.Dataset(frames, lambda frame: letterbox(frame, imgsz).tensor.numpy())
+    quantized = nncf.quantize(model, dataset, preset=nncf.QuantizationPreset.MIXED)
+
+    out_dir = Path(out_dir or str(ir_dir).replace("_openvino_model", "_int8_openvino_model"))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    ov.save_model(quantized, str(out_dir / xml.name))
+    for extra in ir_dir.glob("*.yaml"):  # ultralytics metadata.yaml
+        (out_dir / extra.name).write_text(extra.read_text())
+    return str(out_dir)
+
+
+# ----------------------------------------------------------
+# ACCURACY vs SPEED REPORT
+# ----------------------------------------------------------
+def _boxes(model, frame, imgsz, conf):
+    from app.letterbox import letterbox
+    prepared = letterbox(frame, imgsz)
+    r = model.predict(source=prepared.tensor, imgsz=imgsz, conf=conf, verbose=False)[0]
+    if getattr(r, "boxes", None) is None or len(r.boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return (r.boxes.xyxy.cpu().numpy(), r.boxes.cls.cpu().numpy().astype(np.int64),
+            r.boxes.conf.cpu().numpy())
+
+
+def _agreement(ref, test, iou_thr=0.5):
+    """Greedy same-class IoU matching of test boxes against the reference boxes."""
+    from app.tracker import iou_matrix
+    (ref_boxes, ref_cls, _), (test_boxes, test_cls, _) = ref, test
+    if len(ref_boxes) == 0 or len(test_boxes) == 0:
+        return 0, len(ref_boxes), len(test_boxes)
+    iou = iou_matrix(ref_boxes, test_boxes)
+    iou[ref_cls[:, None] != test_cls[None, :]] = 0.0
+    matched = 0
+    while iou.size and iou.max() >= iou_thr:
+        r, c = np.unravel_index(np.argmax(iou), iou.shape)
+        matched += 1
+        iou[r, :] = 0.0
+        iou[:, c] = 0.0
+    return matched, len(ref_boxes), len(test_boxes)
+
+
+def map50(ref_outs, test_outs, iou_thr=0.5):
+    """
+    mAP@0.5 of test detections, taking the reference boxes as ground truth
+    (footage has no labels: the PyTorch model's boxes stand in for them).
+    All-point interpolated AP per class, averaged over every class in the
+    reference or the test output: a class the reference never saw scores 0.
+    None when the reference has no boxes at all (nothing to measure against).
+    """
+    from app.tracker import iou_matrix
+    scored = {}  # {cls: [(conf, is_tp), ...]}
+    n_ref = {}
+    for (ref_boxes, ref_cls, _), (test_boxes, test_cls, test_conf) in zip(ref_outs, test_outs):
+        for c in ref_cls:
+            n_ref[int(c)] = n_ref.get(int(c), 0) + 1
+        iou = iou_matrix(test_boxes, ref_boxes)
+        taken = np.zeros(len(ref_boxes), dtype=bool)
+        for i in np.argsort(-test_conf):
+            same = (ref_cls == test_cls[i]) & ~taken
+            j = int(np.argmax(np.where(same, iou[i], -1.0))) if same.any() else -1
+            hit = j >= 0 and iou[i, j] >= iou_thr
+            if hit:
+                taken[j] = True
+            scored.setdefault(int(test_cls[i]), []).append((float(test_conf[i]), hit))
+
+    if not n_ref:
+        return None
+    aps = []
+    for c in sorted(set(n_ref) | set(scored)):
+        total = n_ref.get(c, 0)
+        hits = np.array([hit for _, hit in sorted(scored.get(c, []), key=lambda x: -x[0])], dtype=bool)
+        if not total or not len(hits):
+            aps.append(0.0)  # only false positives, or nothing found
+            continue
+        tp = np.cumsum(hits)
+        recall = np.concatenate(([0.0], tp / total, [1.0]))
+        precision = np.concatenate(([1.0], tp / np.arange(1, len(hits) + 1), [0.0]))
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        aps.append(float(np.sum(np.diff(recall) * precision[1:])))
+    return float(np.mean(aps))
+
+
+def _round(value, digits=4):
+    return None if value is None else round(value, digits)
+
+
+def compare_backends(reference, candidates, frames, imgsz=640, conf=0.25, warmup=3):
+    """
+    reference: PyTorch weights path; candidates: {name: weights path}.
+    Reports latency / FPS per backend and recall / precision / mAP@0.5 of
+    its boxes against the reference model's boxes on the same frames.
+    """
+    ref_model = load_yolo(reference)
+    ref_out = [_boxes(ref_model, f, imgsz, conf) for f in frames]
+
+    report = {}
+    for name, path in [("torch", reference)] + list(candidates.items()):
+        model = ref_model if path == reference else load_yolo(path)
+        for frame in frames[:warmup]:
+            _boxes(model, frame, imgsz, conf)
+
+        latencies, outs, matched, n_ref, n_test = [], [], 0, 0, 0
+        for frame, ref in zip(frames, ref_out):
+            start = time.perf_counter()
+            out = _boxes(model, frame, imgsz, conf)
+            latencies.append(time.perf_counter() - start)
+            outs.append(out)
+            m, r, t = _agreement(ref, out)
+            matched, n_ref, n_test = matched + m, n_ref + r, n_test + t
+
+        mean = float(np.mean(latencies))
+        report[name] = {
+            "weights": str(path),
+            "mean_ms": round(1000 * mean, 2),
+            "p95_ms": round(1000 * float(np.percentile(latencies, 95)), 2),
+            "fps": round(1.0 / mean, 2) if mean > 0 else 0.0,
+            "recall_vs_torch": round(matched / n_ref, 4) if n_ref else 1.0,
+            "precision_vs_torch": round(matched / n_test, 4) if n_test else 1.0,
+            "map50_vs_torch": _round(map50(ref_out, outs)),
+        }
+    base = report["torch"]["mean_ms"]
+    for entry in report.values():
+        entry["speedup"] = round(base / entry["mean_ms"], 2) if entry["mean_ms"] else 0.0
+    return report
+
+
+# INT8 candidate -> the FP32 backend it is gated against
+INT8_BASELINES = {"onnx-int8": "onnx", "openvino-int8": "openvino"}
+
+
+def accuracy_gate(report, max_map_drop=0.02):
+    """
+    Marks every INT8 row of a build_all() report "pass" / "fail": it fails
+    when its mAP@0.5 is more than max_map_drop below its FP32 backend's.
+    "no-reference" when the evaluation frames gave the reference model no
+    boxes (map50 is None): the gate cannot decide, which also fails it.
+    Returns the failing "model/backend" names.
+    """
+    failures = []
+    for model_name, rows in report.items():
+        for int8, fp32 in INT8_BASELINES.items():
+            if int8 not in rows or fp32 not in rows:
+                continue
+            fp32_map, int8_map = rows[fp32]["map50_vs_torch"], rows[int8]["map50_vs_torch"]
+            if fp32_map is None or int8_map is None:
+                rows[int8]["accuracy_gate"] = "no-reference"
+                failures.append(f"{model_name}/{int8}")
+                continue
+            drop = fp32_map - int8_map
+            rows[int8]["map50_drop_vs_fp32"] = round(drop, 4)
+            rows[int8]["accuracy_gate"] = "fail" if drop > max_map_drop else "pass"
+            if drop > max_map_drop:
+                failures.append(f"{model_name}/{int8}")
+    return failures
+
+
+def build_all(weights, calib_dir, imgsz=640, calib_frames=200, openvino=False):
+    frames = sample_frames(calib_dir, 2 * calib_frames)
+    # Calibrate and evaluate on different frames
+    calib, evaluation = frames[::2], frames[1::2]
+    report = {}
+    for w in weights:
+        candidates = {}
+        onnx_path = export_onnx(w, imgsz)
+        candidates["onnx"] = onnx_path
+        candidates["onnx-int8"] = quantize_onnx_int8(onnx_path, calib, imgsz)
+        if openvino:
+            ir_dir = export_openvino(w, imgsz)
+            candidates["openvino"] = ir_dir
+            try:
+                candidates["openvino-int8"] = quantize_openvino_int8(ir_dir, calib, imgsz)
+            except ImportError:
+                print("nncf not installed: skipping OpenVINO INT8")
+        report[os.path.basename(str(w))] = compare_backends(w, candidates, evaluation, imgsz)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export, INT8-quantize and compare YOLO CPU backends")
+    parser.add_argument("--weights", nargs="+", default=["yolov8n.pt", "app/best.pt"])
+    parser.add_argument("--calib-dir", required=True, help="directory with footage for calibration/evaluation")
+    parser.add_argument("--calib-frames", type=int, default=200)
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--openvino", action="store_true", help="also export OpenVINO IR")
+    parser.add_argument("--report", default="backends_report.json")
+    parser.add_argument("--max-map-drop", type=float, default=0.02,
+                        help="fail when an INT8 model loses more mAP@0.5 than this vs its FP32 model")
+    args = parser.parse_args()
+
+    result = build_all(args.weights, args.calib_dir, args.imgsz, args.calib_frames, args.openvino)
+    failures = accuracy_gate(result, args.max_map_drop)
+    with open(args.report, "w") as f:
+        json.dump(result, f, indent=2)
+    for model_name, rows in result.items():
+        print(model_name)
+        for backend, row in rows.items():
+            map50_text = "n/a" if row["map50_vs_torch"] is None else f"{row['map50_vs_torch']:.3f}"
+            print(f"  {backend:14s} {row['mean_ms']:8.2f} ms  x{row['speedup']:<5} "
+                  f"recall {row['recall_vs_torch']:.3f}  precision {row['precision_vs_torch']:.3f}  "
+                  f"mAP50 {map50_text}  {row.get('accuracy_gate', '')}")
+    if failures:
+        raise SystemExit(f"INT8 accuracy gate failed (mAP@0.5 drop > {args.max_map_drop}, "
+                         f"or no reference boxes to measure against): {', '.join(failures)}")
@@ -0,0 +1,214 @@
+# app/batchrunner.py
+"""
+Headless batch analysis of recorded footage (no GUI, no display needed).
+
+    python -m app.batchrunner data/ --out results/ --stride 2 --workers 4
+    python -m app.batchrunner data/ --decoder pyav --keyframes-only --decode-width 960
+
+Every .mp4/.avi under the input directory is split into segments that are
+processed in parallel worker processes, as fast as the CPU allows. Writes:
+    results/events.jsonl   one JSON record per detected event: "event" (display
+                           text) plus the fields of app/eventstore.py --
+                           "event_type", "track_id", "confidence" -- and the
+                           track's "state" when the event started
+    results/evidence/      evidence clips, named after the source file
+"""
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import cv2
+
+from app.videosource import BACKENDS, open_source
+
+VIDEO_EXTENSIONS = (".mp4", ".avi")
+
+# event_type -> display text of an events.jsonl record (same as the on-screen event text)
+EVENT_TEXT = {
+    "smoking": "CONFIRMED SMOKING VIOLATION ID {}",
+    "drinking": "DRINKING DETECTED ID {}",
+}
+
+# Per-process model cache, filled by _init_worker
+_models = {}
+
+
+def find_videos(input_dir):
+    return sorted(
+        str(p) for p in Path(input_dir).rglob("*")
+        if p.suffix.lower() in VIDEO_EXTENSIONS
+    )
+
+
+def plan_segments(path, segment_seconds):
+    """Split one file into (path, start_frame, end_frame) jobs."""
+    cap = cv2.VideoCapture(path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    cap.release()
+
+    if total <= 0:
+        return [(path, 0, None)]
+    seg_frames = max(1, int(segment_seconds * fps))
+    return [(path, start, min(start + seg_frames, total)) for start in range(0, total, seg_frames)]
+
+
+def _init_worker():
+    # Parallelism comes from processes: keep each one single-threaded
+    import torch
+    cv2.setNumThreads(1)
+    torch.set_num_threads(1)
+
+    from app.cctvprocessor import CCTVProcessor
+    from app.posedetector import PoseDetector
+
+    _models["frame_detector"] = CCTVProcessor.build_frame_detector()
+    _models["pose_detector"] = PoseDetector(mode=CCTVProcessor.POSE_MODE)
+
+
+def _make_offline_processor(evidence_dir, source_name):
+    from app.cctvprocessor import CCTVProcessor
+
+    class OfflineProcessor(CCTVProcessor):
+        EVIDENCE_FOLDER = evidence_dir
+        EVENT_STORE = False  # events go to events.jsonl, stamped with video time
+
+        def _evidence_name(self, file_prefix, t):
+            # Video time, not wall-clock time: unique and traceable to the source
+            return f"{file_prefix}_{source_name}_{int(t * 1000):010d}ms.mp4"
+
+    _models["pose_detector"].release_tracks([])
+    return OfflineProcessor(
+        frame_detector=_models["frame_detector"],
+        pose_detector=_models["pose_detector"],
+        camera_id=source_name
+    )
+
+
+def process_segment(path, start_frame, end_frame, out_dir, stride=1, warmup_seconds=3.0,
+                    decoder="opencv", keyframes_only=False, decode_width=None):
+    """
+    Runs the analysis over frames [start_frame, end_frame) of one file.
+    Timestamps come from the video itself, so the state machine windows hold
+    no matter how fast frames are processed. A short warm-up before
+    start_frame primes the tracker/state machine; its events are not logged.
+    """
+    source_name = Path(path).stem
+    evidence_dir = os.path.join(out_dir, "evidence")
+    processor = _make_offline_processor(evidence_dir, source_name)
+
+    try:
+        # Skipped frames are never converted (opencv: never decoded)
+        source = open_source(path, backend=decoder, width=decode_width, stride=stride,
+                             keyframes_only=keyframes_only)
+    except IOError:
+        return [{"file": path, "event": "ERROR", "detail": "could not open video"}]
+
+    fps = source.fps
+    warmup_frames = int(warmup_seconds * fps) if start_frame > 0 else 0
+    first = max(0, start_frame - warmup_frames)
+    if first > 0:
+        source.seek(first)
+
+    processor.fps = fps / stride
+    processor.recorder_blocking = True  # offline: never drop evidence frames
+
+    events = []
+    active = set()  # (track_id, event_type) seen on the previous analyzed frame (log on rising edge)
+    while True:
+        item = source.read()
+        if item is None:
+            break
+        index, frame = item
+        if end_frame is not None and index >= end_frame:
+            break
+
+        t = index / fps
+        processor.record_evidence = index >= start_frame  # no clips from the warm-up
+        result = processor._analyze(frame, t)
+        if processor.record_evidence and processor.EVIDENCE_ANNOTATED:
+            processor._draw_detections(frame, result)  # only the clips show the drawing
+        recording = processor._update_recording(frame, result, t)
+
+        current = {(oid, event_type): ts for oid, ts in result["track_states"].items()
+                   for event_type in EVENT_TEXT if ts[event_type]}
+        if index >= start_frame:
+            for oid, event_type in sorted(current.keys() - active):
+                ts = current[(oid, event_type)]
+                events.append({
+                    "file": path,
+                    "event": EVENT_TEXT[event_type].format(oid),
+                    "event_type": event_type,
+                    "track_id": oid,
+                    "state": ts["state"],
+                    "confidence": round(ts[f"{event_type}_conf"], 3),
+                    "frame": index,
+                    "video_time": round(t, 3),
+                    "clip": processor.evidence_path if recording else None,
+                })
+        active = set(current)
+
+    processor._close_recording()
+    source.release()
+    return events
+
+
+def run_batch(input_dir, out_dir, stride=1, workers=None, segment_seconds=600.0,
+              decoder="opencv", keyframes_only=False, decode_width=None):
+    videos = find_videos(input_dir)
+    if not videos:
+        print(f"No {'/'.join(VIDEO_EXTENSIONS)} files found in {input_dir}")
+        return []
+
+    Path(out_dir, "evidence").mkdir(parents=True, exist_ok=True)
+    jobs = [job for path in videos for job in plan_segments(path, segment_seconds)]
+    workers = workers or os.cpu_count() or 1
+    print(f"{len(videos)} files, {len(jobs)} segments, {workers} workers")
+
+    all_events = []
+    log_path = os.path.join(out_dir, "events.jsonl")
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool, \
+            open(log_path, "a") as log:
+        futures = {
+            pool.submit(process_segment, path, start, end, out_dir, stride,
+                        decoder=decoder, keyframes_only=keyframes_only, decode_width=decode_width): (path, start)
+            for path, start, end in jobs
+        }
+        for future in as_completed(futures):
+            path, start = futures[future]
+            try:
+                events = future.result()
+            except Exception as e:
+                events = [{"file": path, "event": "ERROR", "frame": start, "detail": repr(e)}]
+            for event in events:
+                log.write(json.dumps(event) + "\n")
+            log.flush()
+            all_events.extend(events)
+            print(f"done: {path} @ frame {start} ({len(events)} events)")
+
+    return all_events
+
+
+def build_arg_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description="Headless batch analysis of recorded footage")
+    parser.add_argument("input_dir", help="directory with .mp4/.avi files")
+    parser.add_argument("--out", default="results", help="output directory for events.jsonl and evidence")
+    parser.add_argument("--stride", type=int, default=1, help="analyze every Nth frame")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--segment-seconds", type=float, default=600.0,
+                        help="split long files into segments of this length")
+    parser.add_argument("--decoder", choices=BACKENDS, default="opencv",
+                        help="video decoder (pyav = threaded FFmpeg)")
+    parser.add_argument("--keyframes-only", action="store_true",
+                        help="analyze keyframes only (pyav decoder; fast coarse scan)")
+    parser.add_argument("--decode-width", type=int, default=None,
+                        help="downscale frames to this width while decoding")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    run_batch(args.input_dir, args.out, max(1, args.stride), args.workers, args.segment_seconds,
+              args.decoder, args.keyframes_only, args.decode_width)
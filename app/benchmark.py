@@ -0,0 +1,367 @@
+# app/benchmark.py
+"""
+Reproducible per-frame benchmark (no display needed).
+
+    python -m app.benchmark --out bench.json
+    python -m app.benchmark --clip data/sample.mp4 --resolutions 640x360 1920x1080 --persons 1 10 100
+    python -m app.benchmark --out new.json --compare old.json
+
+Stages measured (each over the same seeded synthetic inputs, or frames from
+--clip): Detector.detect, SmokeDetector.detect, PoseDetector.is_smoking_pose /
+get_person_points, per-person latency of each pose mode (holistic / lite)
+with its agreement with Holistic, SimpleTracker / KalmanTracker.update,
+DrinkingDetector.detect_drinking and the full CCTVProcessor per-frame path.
+
+Reports p50/p95/p99 latency and FPS per stage, peak RSS, and (with
+--trace-alloc) peak / retained Python allocations per stage. Results are JSON so two
+versions can be compared with --compare.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+import cv2
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(rss / 1024.0 if platform.system() != "Darwin" else rss / (1024.0 * 1024.0), 1)
+
+
+def measure(fn, inputs, repeat=1, warmup=2, trace_alloc=False):
+    """Runs fn(x) for every x in inputs (repeat times) and summarizes latency."""
+    for x in inputs[:warmup]:
+        fn(x)
+    gc.collect()
+
+    if trace_alloc:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    latencies = []
+    for _ in range(repeat):
+        for x in inputs:
+            start = time.perf_counter()
+            fn(x)
+            latencies.append(time.perf_counter() - start)
+
+    stats = {
+        "calls": len(latencies),
+        "p50_ms": round(1000 * _percentile(latencies, 50), 3),
+        "p95_ms": round(1000 * _percentile(latencies, 95), 3),
+        "p99_ms": round(1000 * _percentile(latencies, 99), 3),
+        "mean_ms": round(1000 * float(np.mean(latencies)), 3) if latencies else 0.0,
+    }
+    stats["fps"] = round(1000.0 / stats["mean_ms"], 2) if stats["mean_ms"] > 0 else 0.0
+
+    if trace_alloc:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        stats["alloc_peak_kb"] = round(peak / 1024.0, 1)
+        stats["alloc_retained_kb"] = round(current / 1024.0, 1)
+
+    stats["peak_rss_mb"] = peak_rss_mb()
+    return stats
+
+
+# ----------------------------------------------------------
+# INPUTS
+# ----------------------------------------------------------
+def synthetic_frames(width, height, count, seed=0):
+    """Deterministic frames: noisy background plus a few moving blobs."""
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (height, width, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = base.copy()
+        for k in range(3):
+            cx = int((0.2 + 0.3 * k) * width + 5 * i) % width
+            cy = int(0.5 * height)
+            cv2.circle(frame, (cx, cy), max(4, height // 12), (40 * k, 200, 255 - 40 * k), -1)
+        frames.append(frame)
+    return frames
+
+
+def clip_frames(path, width, height, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(frame, (width, height)))
+    cap.release()
+    if not frames:
+        raise RuntimeError(f"could not read frames from {path}")
+    return frames
+
+
+def synthetic_detections(n_persons, width, height, count, seed=0):
+    """Per-frame person detections drifting slowly, like a crowd."""
+    rng = random.Random(seed)
+    people = [(rng.uniform(0, width - 60), rng.uniform(0, height - 150), rng.uniform(-3, 3)) for _ in range(n_persons)]
+    frames = []
+    for i in range(count):
+        dets = []
+        for x, y, vx in people:
+            px = min(max(0, x + vx * i), width - 60)
+            dets.append((int(px), int(y), int(px + 60), int(y + 150), rng.uniform(0.4, 0.95), 0))
+        frames.append(dets)
+    return frames
+
+
+def synthetic_person_points(n_persons, n_bottles, seed=0):
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(n_persons):
+        mouth = (rng.randint(0, 1000), rng.randint(0, 600))
+        hand = (mouth[0] + rng.randint(-100, 100), mouth[1] + rng.randint(-100, 100))
+        bottles = [[b, b, b + 30, b + 80] for b in (rng.randint(0, 1000) for _ in range(n_bottles))]
+        cases.append(({"hand": hand, "mouth": mouth}, bottles))
+    return cases
+
+
+# ----------------------------------------------------------
+# STAGES
+# ----------------------------------------------------------
+def bench_trackers(person_counts, width, height, frames, trace_alloc):
+    from app.tracker import KalmanTracker, SimpleTracker
+    out = {}
+    for n in person_counts:
+        dets = synthetic_detections(n, width, height, frames)
+        for name, cls in (("SimpleTracker.update", SimpleTracker), ("KalmanTracker.update", KalmanTracker)):
+            tracker = cls()
+            out[f"{name}[persons={n}]"] = measure(tracker.update, dets, warmup=0, trace_alloc=trace_alloc)
+    return out
+
+
+def bench_drinking(person_counts, trace_alloc):
+    from app.drinkingdetector import DrinkingDetector
+    detector = DrinkingDetector()
+    out = {}
+    for n in person_counts:
+        cases = synthetic_person_points(n, n_bottles=max(1, n // 4))
+        out[f"DrinkingDetector.detect_drinking[persons={n}]"] = measure(
+            lambda case: detector.detect_drinking(*case), cases, repeat=20, trace_alloc=trace_alloc
+        )
+        points = [c[0] for c in cases]
+        bottles = cases[0][1]
+        out[f"DrinkingDetector.detect_drinking_batch[persons={n}]"] = measure(
+            lambda _: detector.detect_drinking_batch(points, bottles), [None] * 20, trace_alloc=trace_alloc
+        )
+    return out
+
+
+def bench_models(frames, label, trace_alloc):
+    from app.cctvprocessor import CCTVProcessor
+    from app.detector import Detector
+    from app.smokedetector import SmokeDetector
+    from app.posedetector import PoseDetector
+
+    out = {}
+    det = Detector(CCTVProcessor.DETECTOR_WEIGHTS, class_conf=CCTVProcessor.CLASS_CONF)
+    out[f"Detector.detect[{label}]"] = measure(det.detect, frames, trace_alloc=trace_alloc)
+
+    smoke = SmokeDetector(CCTVProcessor.SMOKE_WEIGHTS, conf=CCTVProcessor.SMOKE_CONF)
+    out[f"SmokeDetector.detect[{label}]"] = measure(smoke.detect, frames, trace_alloc=trace_alloc)
+
+    pose = PoseDetector()
+    out[f"PoseDetector.is_smoking_pose[{label}]"] = measure(
+        lambda f: pose.is_smoking_pose(f, draw=False), frames, trace_alloc=trace_alloc
+    )
+    h, w = frames[0].shape[:2]
+    bbox = (w // 4, h // 8, w // 2, h - 1)
+    out[f"PoseDetector.get_person_points[{label}]"] = measure(
+        lambda f: pose.get_person_points(f, bbox, track_id=0), frames, trace_alloc=trace_alloc
+    )
+    pose.close()
+    return out
+
+
+def _person_boxes(detector, frames, min_conf=0.35):
+    """Person boxes per frame from the detector, or one fixed box when it finds nobody."""
+    h, w = frames[0].shape[:2]
+    fallback = [(w // 4, h // 8, w // 2, h - 1)]
+    cases = []
+    for frame in frames:
+        boxes = [d[:4] for d in detector.detect(frame) if d[5] == 0 and d[4] >= min_conf]
+        cases.extend((frame, box) for box in boxes or fallback)
+    return cases
+
+
+def pose_agreement(reference, candidate):
+    """
+    How well one pose mode reproduces another, over the same person crops:
+    share of crops with a face found, hand_to_mouth agreement, and median
+    mouth / hand position error in face widths of the reference.
+    """
+    both = [(r, c) for r, c in zip(reference, candidate) if r is not None and c is not None]
+    mouth_err, hand_err = [], []
+    for r, c in both:
+        scale = max(r["face_width"], 1.0)
+        mouth_err.append(np.hypot(r["mouth"][0] - c["mouth"][0], r["mouth"][1] - c["mouth"][1]) / scale)
+        if r["hand"] is not None and c["hand"] is not None:
+            hand_err.append(np.hypot(r["hand"][0] - c["hand"][0], r["hand"][1] - c["hand"][1]) / scale)
+    n = max(len(reference), 1)
+    return {
+        "crops": len(reference),
+        "found_reference": round(sum(r is not None for r in reference) / n, 3),
+        "found_candidate": round(sum(c is not None for c in candidate) / n, 3),
+        "hand_to_mouth_agreement": round(
+            sum(bool(r and r["hand_to_mouth"]) == bool(c and c["hand_to_mouth"])
+                for r, c in zip(reference, candidate)) / n, 3),
+        "mouth_err_face_widths_p50": round(_percentile(mouth_err, 50), 3),
+        "hand_err_face_widths_p50": round(_percentile(hand_err, 50), 3),
+    }
+
+
+def bench_pose_modes(frames, label, trace_alloc):
+    """
+    Per-person latency of every pose mode (independent crops, as for new
+    tracks) and agreement of each mode with Holistic on the same crops.
+    Synthetic frames contain nobody: use --clip for a meaningful agreement.
+    """
+    from app.cctvprocessor import CCTVProcessor
+    from app.detector import Detector
+    from app.posedetector import POSE_MODES, PoseDetector
+
+    cases = _person_boxes(Detector(CCTVProcessor.DETECTOR_WEIGHTS, class_conf=CCTVProcessor.CLASS_CONF), frames)
+    stages, points = {}, {}
+    for mode in POSE_MODES:
+        pose = PoseDetector(mode=mode, draw_landmarks=False)
+        stages[f"PoseDetector[{mode}].person[{label}]"] = measure(
+            lambda case: pose.get_person_points(case[0], case[1]), cases, trace_alloc=trace_alloc
+        )
+        points[mode] = [pose.get_person_points(frame, box) for frame, box in cases]
+        pose.close()
+
+    agreement = {
+        mode: pose_agreement(points["holistic"], points[mode])
+        for mode in POSE_MODES if mode != "holistic"
+    }
+    return stages, agreement
+
+
+def bench_processor(frames, label, trace_alloc, frame_detector=None, pose_detector=None):
+    """
+    Full per-frame path (analyze + annotate + status) without a display or writer.
+    frame_detector / pose_detector: used instead of loading the models (tests).
+    """
+    from app.cctvprocessor import CCTVProcessor
+    fps = 30.0
+    counter = [0]
+
+    def step(frame):
+        counter[0] += 1
+        t = counter[0] / fps
+        frame = frame.copy()
+        result = processor._analyze(frame, t)
+        processor._draw_detections(frame, result)
+        processor._draw_status(frame, result, False)
+
+    # No events.db, event-store writer thread or evidence clips from a benchmark run
+    with tempfile.TemporaryDirectory() as evidence_dir:
+        processor = CCTVProcessor(frame_detector=frame_detector, pose_detector=pose_detector,
+                                  settings={"EVENT_STORE": False, "EVIDENCE_FOLDER": evidence_dir})
+        processor.record_evidence = False
+        return {f"CCTVProcessor.frame[{label}]": measure(step, frames, trace_alloc=trace_alloc)}
+
+
+def environment():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        rev = None
+    return {
+        "git_rev": rev or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run(args):
+    cv2.setNumThreads(args.threads)
+    results = {"env": environment(), "config": vars(args).copy(), "stages": {}, "pose_agreement": {}}
+    stages = results["stages"]
+
+    stages.update(bench_trackers(args.persons, 1920, 1080, args.frames, args.trace_alloc))
+    stages.update(bench_drinking(args.persons, args.trace_alloc))
+
+    if not args.skip_models:
+        for res in args.resolutions:
+            w, h = (int(v) for v in res.lower().split("x"))
+            frames = clip_frames(args.clip, w, h, args.frames) if args.clip else synthetic_frames(w, h, args.frames)
+            label = f"{w}x{h}"
+            stages.update(bench_models(frames, label, args.trace_alloc))
+            pose_stages, results["pose_agreement"][label] = bench_pose_modes(frames, label, args.trace_alloc)
+            stages.update(pose_stages)
+            stages.update(bench_processor(frames, label, args.trace_alloc))
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def compare(new, old):
+    """Prints p50/p95 deltas for every stage present in both result files."""
+    print(f"{'stage':60s} {'p50 old':>9s} {'p50 new':>9s} {'delta':>8s} {'p95 new':>9s}")
+    for name, stats in new["stages"].items():
+        before = old.get("stages", {}).get(name)
+        if before is None:
+            continue
+        delta = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+        print(f"{name:60s} {before['p50_ms']:9.3f} {stats['p50_ms']:9.3f} {delta:+7.1f}% {stats['p95_ms']:9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-frame pipeline benchmark")
+    parser.add_argument("--clip", help="recorded clip to replay instead of synthetic frames")
+    parser.add_argument("--frames", type=int, default=60, help="frames per case")
+    parser.add_argument("--resolutions", nargs="+", default=["640x360", "1280x720", "1920x1080"])
+    parser.add_argument("--persons", nargs="+", type=int, default=[1, 10, 50, 100])
+    parser.add_argument("--threads", type=int, default=1, help="cv2 threads (1 = reproducible)")
+    parser.add_argument("--skip-models", action="store_true", help="only the pure-Python stages")
+    parser.add_argument("--trace-alloc", action="store_true", help="track Python allocations (slower)")
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--compare", help="previous result JSON to compare against")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"wrote {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    else:
+        for name, stats in results["stages"].items():
+            print(f"{name:60s} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  {stats['fps']:9.1f} fps")
+    for label, modes in results["pose_agreement"].items():
+        for mode, agreement in modes.items():
+            print(f"pose {mode} vs holistic [{label}]: {agreement}")
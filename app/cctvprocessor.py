@@ -1,243 +1,721 @@
 # app/cctvprocessor.py
-import cv2, time, numpy as np
+import cv2, time
+import logging
 import os
 from pathlib import Path
 from tkinter import messagebox
-from app.detector import Detector
-from app.tracker import SimpleTracker
-from app.posedetector import PoseDetector
-from app.smokedetector import SmokeDetector
-from app.drinking_detector import DrinkingDetector  # <-- ADDED
+from app.tracker import KalmanTracker
+from app.drinkingdetector import DrinkingDetector  # <-- ADDED
+from app.association import SpatialAssociator
+from app.pipeline import Pipeline
+from app.evidence import EvidenceRecorder
+from app.motiongate import MotionGate
+from app.scheduler import ModelScheduler
+from app.eventengine import EventEngine, POSE_ACTIVE, WAITING_FOR_SMOKE
+from app import metrics as metrics_module
+from app.metrics import REGISTRY
+from app.zones import ZoneSet, shift_detections
+from app.videosource import open_source
+from app.tiling import InferenceScalePolicy, TiledInference
+from app.eventstore import open_store
+from app.sinks import SinkSet, build_sinks
+from app import modelregistry
+
+logger = logging.getLogger(__name__)
 
 
 class CCTVProcessor:
     # --- Configuration ---
     EVIDENCE_FOLDER = "evidence"
-    RECORDING_DURATION = 5.0 
+    RECORDING_DURATION = 5.0  # post-roll after a confirmed event
+    PRE_ROLL_SECONDS = 5.0    # lead-up kept in the ring buffer
+    # Raw pre-roll memory per camera = width * height * 3 * fps * PRE_ROLL_SECONDS:
+    # ~140 MB at 720p30, ~930 MB at 1080p30. 256 MB holds ~1.4 s of raw 1080p
+    # (a warning is printed once when the cap shortens the pre-roll).
+    RING_BUFFER_MAX_BYTES = 256 * 1024 * 1024
+    RING_BUFFER_COMPRESS = False  # True: JPEG pre-roll frames, less memory but an imencode per frame
+    EVIDENCE_ANNOTATED = True    # clips show the detection boxes (False = clean frames, no drawing)
+    # --- EVENT STORE ---
+    EVENT_STORE = True          # log every event episode to SQLite (app/eventstore.py)
+    EVENT_STORE_PATH = None     # default: <EVIDENCE_FOLDER>/events.db
+    EVENT_RETENTION_DAYS = 90
     SMOKE_CLASS_ID = 0
     SMOKE_WINDOW_SECONDS = 3.0
     TARGET_CLASSES = [0] # Only detect Person (0) for tracking
-
-    # --- STATE MACHINE VARIABLES ---
-    POSE_STATE = "NONE"
-    POSE_TAKEN_OFF_TIME = 0.0
-
-    def __init__(self):
+    # Per-class confidence thresholds for the unified detection stage
+    # Persons are kept down to 0.15 for the tracker's low-score second pass;
+    # only boxes >= TRACK_HIGH_THRESH start new tracks.
+    CLASS_CONF = {0: 0.15, 39: 0.25}  # person, bottle
+
+    # --- TRACKER ---
+    TRACK_HIGH_THRESH = 0.35
+    TRACK_MAX_AGE = 30     # frames a lost track survives
+    TRACK_MIN_HITS = 3     # matches before a track is reported
+    TRACK_IOU_THRESHOLD = 0.3
+    SMOKE_CONF = 0.5
+    # Weights for each model: .pt, .onnx, .int8.onnx or *_openvino_model/
+    # (export/quantize with `python -m app.backends`)
+    DETECTOR_WEIGHTS = "yolov8n.pt"
+    SMOKE_WEIGHTS = "app/best.pt"
+
+    # --- POSE ---
+    # "holistic" (face mesh + hand models) or "lite" (MediaPipe Pose lite: body
+    # landmarks only, several times cheaper per person; see app/posedetector.py)
+    POSE_MODE = "holistic"
+    # Draw each analyzed person's landmarks on annotated frames (holistic: every
+    # landmark set, lite: the keypoints the rules use)
+    DRAW_POSE_LANDMARKS = True
+
+    # --- PER-TRACK EVENT ENGINE ---
+    EVENT_HISTORY_FRAMES = 15   # ring buffer length per track
+    POSE_ON_FRAMES = 2          # hand at mouth this many frames -> POSE_ACTIVE
+    POSE_OFF_FRAMES = 3         # hand away this many frames -> WAITING_FOR_SMOKE
+    DRINK_ON_FRAMES = 4         # positive frames in history to start DRINKING
+    DRINK_OFF_FRAMES = 1        # at most this many to stop it
+    TRACK_STATE_TTL = 5.0       # seconds before an unseen track's state is evicted
+
+    # --- MOTION GATE ---
+    # Static, empty scenes reuse the last results and only run the models
+    # every MOTION_IDLE_INTERVAL frames.
+    MOTION_GATE = True
+    MOTION_METHOD = "diff"         # "diff" or "mog2"
+    MOTION_PIXEL_THRESHOLD = 25    # gray-level change counted as motion
+    MOTION_MIN_RATIO = 0.002       # fraction of changed pixels that counts as motion
+    MOTION_IDLE_INTERVAL = 15      # frames between inferences when nothing moves
+    MOTION_HOLD_SECONDS = 2.0      # keep full rate this long after the last motion
+
+    # --- ADAPTIVE MODEL SCHEDULING ---
+    # Each model runs every N frames and escalates to every frame while the
+    # smoking state machine is active or a tracked person is near a bottle.
+    ADAPTIVE_SCHEDULING = True
+    MODEL_INTERVALS = {"persons": 1, "smoke": 10, "pose": 3}
+    BOTTLE_PROXIMITY_PX = 120  # bottle centre this close to a person box -> pose at full rate
+
+    # --- ZONES ---
+    # Polygons (pixels, or 0..1 fractions of the frame) that limit processing:
+    # [{"points": [[x, y], ...], "mode": "include" | "exclude", "name": ...}, ...]
+    # ("normalized": true/false overrides the fractions-if-all-<=-1 guess)
+    # Detection and the full-frame pose pass only see the bounding crop of the
+    # zones; tracks covering less than ZONE_MIN_OVERLAP of their box skip
+    # pose/drinking/smoking analysis. None = whole frame.
+    ZONES = None
+    ZONE_MIN_OVERLAP = 0.3
+    ZONE_CROP_MARGIN = 32  # px around the zones' bounding box
+
+    # --- INFERENCE SCALE ---
+    # Model input size follows the analyzed frame (or zone crop): long side
+    # rounded up to 32 and clamped, so low-res feeds are not upscaled.
+    # Exported .onnx/OpenVINO weights need dynamic shapes for this (the default export).
+    DYNAMIC_IMGSZ = True
+    IMGSZ_MIN = 320
+    IMGSZ_MAX = 640
+    # Tiled (SAHI-style) inference for smoke and bottles on large frames.
+    # Tiles without motion or nearby persons are skipped.
+    TILING = False
+    TILE_SIZE = 640
+    TILE_OVERLAP = 0.2
+    TILE_MIN_FRAME_SIDE = 1920  # only frames at least this wide/high are tiled
+    TILE_TARGETS = ("smoke", "bottles")
+
+    # --- DECODE ---
+    DECODE_BACKEND = "opencv"  # "opencv", "pyav" (FFmpeg, threaded) or "auto"
+    DECODE_WIDTH = None        # downscale frames to this width at decode time (None = native)
+    DECODE_THREADS = 0         # FFmpeg decode threads (0 = FFmpeg default)
+    DECODE_OPTIONS = None      # FFmpeg demuxer options, e.g. {"rtsp_transport": "tcp"}
+
+    # --- OUTPUT ---
+    # Where the annotated preview goes (app/sinks.py): "none", "window",
+    # "mjpeg" (HTTP stream) and/or "shm" (shared memory for a viewer process),
+    # as type names or dicts, e.g. [{"type": "mjpeg", "port": 8090}].
+    # None = ["window"] for run_logic(display=True), else no preview.
+    # Frames are only annotated when a sink (or an annotated clip) uses them.
+    OUTPUT_SINKS = None
+    PREVIEW_FPS = 15      # preview rate, independent of the analysis rate
+    PREVIEW_WIDTH = None  # downscale the preview to this width (None = analyzed size)
+
+    # --- PIPELINE ---
+    QUEUE_SIZE = 4  # bounded queues between capture / inference / annotate / sinks
+
+    # --- METRICS ---
+    # Enables app/metrics.py from run_logic when nothing else has, e.g.
+    # {"port": 9108, "json_path": "metrics.json", "interval": 10}. None = disabled.
+    METRICS = None
+
+    def __init__(self, frame_detector=None, pose_detector=None, camera_id=None, zones=None, settings=None):
+        """
+        frame_detector / pose_detector: pass already-loaded models to share them
+        between streams (see app/supervisor.py). When omitted, the process-wide
+        warm models of app/modelregistry.py are used (loaded on first use).
+        zones: per-camera zone list (see ZONES); defaults to the class setting.
+        settings: per-camera overrides of the class settings, e.g. {"TILING": True}.
+                  Detector settings (weights, thresholds) select the registry model;
+                  a frame_detector passed in must have been built with them
+                  (CCTVProcessor.configured(settings).build_frame_detector()).
+        """
+        for name, value in self.validate_settings(settings).items():
+            setattr(self, name, value)
+
+        self._created = time.perf_counter()  # for the cold-start (first frame) measurement
+        self.time_to_first_frame = None
         Path(self.EVIDENCE_FOLDER).mkdir(exist_ok=True)
-        self.det = Detector()
-        self.tracker = SimpleTracker()
-        self.pose_detector = PoseDetector()
-        self.smoke_detector = SmokeDetector()
+        self.camera_id = camera_id
+        # One detection stage for persons, bottles and smoke, from the effective settings
+        self.frame_detector = frame_detector or modelregistry.frame_detector(self)
+        self.tracker = KalmanTracker(
+            max_age=self.TRACK_MAX_AGE,
+            min_hits=self.TRACK_MIN_HITS,
+            iou_threshold=self.TRACK_IOU_THRESHOLD,
+            high_thresh=self.TRACK_HIGH_THRESH,
+            low_thresh=self.CLASS_CONF[0]
+        )
+        if pose_detector is None:
+            pose_detector = modelregistry.pose_detector(self.POSE_MODE)
+            pose_detector.release_tracks([])  # drop estimators of a previous session
+        self.pose_detector = pose_detector
         self.drinking_detector = DrinkingDetector()  # <-- ADDED
-        self.zone = [(100,100),(500,100),(500,400),(100,400)]
-
+        self.associator = SpatialAssociator(self.drinking_detector)
+        # Smoking/drinking state per track ID (replaces the global POSE_STATE)
+        self.event_engine = EventEngine(
+            smoke_window_seconds=self.SMOKE_WINDOW_SECONDS,
+            history=self.EVENT_HISTORY_FRAMES,
+            pose_on_frames=self.POSE_ON_FRAMES,
+            pose_off_frames=self.POSE_OFF_FRAMES,
+            drink_on=self.DRINK_ON_FRAMES,
+            drink_off=self.DRINK_OFF_FRAMES,
+            track_ttl_seconds=self.TRACK_STATE_TTL
+        )
+        self.zones = ZoneSet(
+            zones if zones is not None else self.ZONES,
+            min_overlap=self.ZONE_MIN_OVERLAP,
+            crop_margin=self.ZONE_CROP_MARGIN
+        )
+
+        self.motion_gate = MotionGate(
+            method=self.MOTION_METHOD,
+            pixel_threshold=self.MOTION_PIXEL_THRESHOLD,
+            min_motion_ratio=self.MOTION_MIN_RATIO,
+            idle_interval=self.MOTION_IDLE_INTERVAL,
+            hold_seconds=self.MOTION_HOLD_SECONDS
+        ) if self.MOTION_GATE else None
+        self.scheduler = ModelScheduler(self.MODEL_INTERVALS) if self.ADAPTIVE_SCHEDULING else None
+        self.scale_policy = InferenceScalePolicy(self.IMGSZ_MIN, self.IMGSZ_MAX) if self.DYNAMIC_IMGSZ else None
+        self.tiler = TiledInference(
+            tile_size=self.TILE_SIZE,
+            overlap=self.TILE_OVERLAP,
+            min_frame_side=self.TILE_MIN_FRAME_SIDE,
+            targets=self.TILE_TARGETS
+        ) if self.TILING else None
+        # Results reused on frames the motion gate / scheduler skip
+        self._last_detections = None
+        self._last_pose = None
+        self._last_person_points = {}  # {oid: person_data}
+        self._confirmed = set()  # (oid, "smoking" / "drinking") confirmed on the last frame
+        self._rgb = None  # reused RGB buffer: one color conversion per analyzed frame
+
+        # --- Recording / pipeline state (reset per run_logic call) ---
+        self.fps = 30.0
+        self.record_evidence = False
+        self.recorder = None  # EvidenceRecorder, created on first use
+        self.recorder_blocking = False  # offline runs wait for the writer instead of dropping
+        self.evidence_path = None  # clip currently / last recorded
+        self.pipeline = None
+        self.sinks = SinkSet()
+        self._stop_requested = False
+        # Stage spans / counters; no-ops unless app.metrics is enabled
+        self.metrics = REGISTRY.camera(camera_id)
+
+        # Structured event log, written by a background thread
+        self.event_store = open_store(
+            self.EVENT_STORE_PATH or os.path.join(self.EVIDENCE_FOLDER, "events.db"),
+            retention_days=self.EVENT_RETENTION_DAYS
+        ) if self.EVENT_STORE else None
+        self.clock_origin = time.time()  # wall-clock time of t = 0
+        self._open_events = {}  # {(oid, event_type): start_time}
+        self._last_t = 0.0
+
+
+    @classmethod
+    def validate_settings(cls, settings):
+        """Checks per-camera overrides; returns them with JSON values normalized."""
+        out = {}
+        for name, value in (settings or {}).items():
+            if not name.isupper() or not hasattr(cls, name):
+                raise ValueError(f"unknown CCTVProcessor setting {name!r}")
+            if name == "CLASS_CONF":
+                value = {int(k): v for k, v in value.items()}  # JSON object keys are strings
+            out[name] = value
+        return out
+
+    @classmethod
+    def configured(cls, settings):
+        """The class with per-camera settings applied, e.g. to build that camera's detector."""
+        settings = cls.validate_settings(settings)
+        return type(cls.__name__, (cls,), settings) if settings else cls
+
+    @classmethod
+    def build_frame_detector(cls, config=None):
+        """
+        FrameDetector configured from the class settings (shared by workers),
+        or from config: a configured() class or a processor instance.
+        """
+        config = config or cls
+        # Imported here: loading torch/ultralytics is what makes startup slow
+        from app.framedetector import FrameDetector
+        return FrameDetector(
+            class_conf=config.CLASS_CONF,
+            smoke_conf=config.SMOKE_CONF,
+            smoke_class_id=config.SMOKE_CLASS_ID,
+            detector_weights=config.DETECTOR_WEIGHTS,
+            smoke_weights=config.SMOKE_WEIGHTS
+        )
 
     def _draw_zone(self, frame):
-        pts = np.array(self.zone, dtype=np.int32)
-        cv2.polylines(frame, [pts], True, (0,0,255), 2)
-
-
-    def run_logic(self, video_source):
-        
-        cap = cv2.VideoCapture(video_source)
-        if not cap.isOpened():
-            messagebox.showerror("Error", "Could not open video source. Check camera index (0) or file path.")
-            return
-
-        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
-        
-        video_writer = None
-        is_recording = False
-        stop_recording_time = 0
-        smoking_events = []
-        drinking_events = []  # <-- ADDED
-
-        start = time.time()
-        while True:
-            ret, frame = cap.read()
-            if not ret: 
-                if video_source == 0:
-                    print("Error: Failed to receive frame from camera stream.")
-                else:
-                    print("Video playback finished.")
-                break
-                
-            t = time.time() - start
-            
-            # -------------------------------------------
-            # 1. Detection (Person + Bottle)
-            # -------------------------------------------
-            dets = self.det.detect(frame)
-
-            bottle_boxes = []   # <-- ADDED
-
-            # Collect bottle boxes & keep person boxes for tracker
-            filtered_dets = []
-            for d in dets:
-                x1, y1, x2, y2, conf, cls = d
-
-                # bottle class ID → YOU MUST EDIT THIS according to your model
-                BOTTLE_CLASS = 39  # COCO bottle class (change if needed)
-
-                if cls == BOTTLE_CLASS:
-                    bottle_boxes.append([x1, y1, x2, y2])  # <-- ADDING BOTTLES
-                if cls in self.TARGET_CLASSES:
-                    filtered_dets.append(d)
-
-            dets = filtered_dets
+        self.zones.draw(frame)
+
+
+    def _person_near_bottle(self):
+        if not self._last_detections or not self._last_detections["bottles"]:
+            return False
+        margin = self.BOTTLE_PROXIMITY_PX
+        for x1, y1, x2, y2, _, _ in self.tracker.objects.values():
+            for bx1, by1, bx2, by2 in self._last_detections["bottles"]:
+                cx, cy = (bx1 + bx2) / 2, (by1 + by2) / 2
+                if x1 - margin <= cx <= x2 + margin and y1 - margin <= cy <= y2 + margin:
+                    return True
+        return False
+
+    def _hot_models(self):
+        """Models that should run at full rate, from the previous frame's state."""
+        state_hot = self.event_engine.any_in((POSE_ACTIVE, WAITING_FOR_SMOKE))
+        near_bottle = self._person_near_bottle()
+        return {
+            "persons": state_hot or near_bottle,
+            "pose": state_hot or near_bottle,
+            "smoke": state_hot,
+        }
+
+    # -------------------------------------------
+    # PIPELINE STAGES
+    # -------------------------------------------
+    def _analyze(self, frame, t):
+        """Detection, tracking, pose and the state machines. No drawing."""
+        # Only the bounding crop of the zones is analyzed (a view, no copy)
+        roi, offset = self.zones.crop(frame)
+        # -------------------------------------------
+        # 0. Motion gate: skip the models on static, empty frames
+        # -------------------------------------------
+        run_models = (
+            self.motion_gate is None
+            or self._last_detections is None
+            or self.motion_gate.should_infer(roi, t, active_tracks=len(self.tracker.objects))
+        )
+
+        # Per-model cadence; results of models that do not run are carried forward
+        plan = {"persons": run_models, "smoke": run_models, "pose": run_models}
+        if run_models and self.scheduler is not None:
+            plan = self.scheduler.plan(self._hot_models())
+
+        # -------------------------------------------
+        # 1. Detection (Person + Bottle + Smoke, single stage)
+        # -------------------------------------------
+        if self._last_detections is None:
+            plan["persons"] = plan["smoke"] = True
+        if plan["persons"] or plan["smoke"]:
+            imgsz = self.scale_policy.imgsz_for(roi.shape) if self.scale_policy is not None else None
+            with self.metrics.span("detect"):
+                fresh = self.frame_detector.detect(roi, persons=plan["persons"], smoke=plan["smoke"], imgsz=imgsz)
+            if self.tiler is not None:
+                with self.metrics.span("tiles"):
+                    fresh = self.tiler.detect(
+                        self.frame_detector, roi, fresh,
+                        persons=plan["persons"], smoke=plan["smoke"],
+                        motion_mask=self.motion_gate.last_mask if self.motion_gate is not None else None
+                    )
+            fresh = shift_detections(fresh, offset)
+            last = self._last_detections or {}
+            self._last_detections = {
+                key: value if value is not None else last.get(key)
+                for key, value in fresh.items()
+            }
+        detections = self._last_detections
+
+        bottle_boxes = detections["bottles"]   # <-- ADDED
+        smoke_boxes = detections["smoke_boxes"]
+
+        # Keep person boxes for tracker
+        dets = [d for d in detections["persons"] if d[5] in self.TARGET_CLASSES]
+        with self.metrics.span("track"):
             tracked = self.tracker.update(dets)
-            
-            # -------------------------------------------
-            # 2. Pose and Smoke Detection
-            # -------------------------------------------
-            hand_on_mouth_pose = self.pose_detector.is_smoking_pose(frame.copy()) 
-            smoke_detected, smoke_boxes = self.smoke_detector.detect(frame, self.SMOKE_CLASS_ID) 
-
-            # -------------------------------------------
-            # 3. Smoking State Machine
-            # -------------------------------------------
-            smoking_events.clear()
-
-            if hand_on_mouth_pose:
-                if self.POSE_STATE == "NONE" or self.POSE_STATE == "WAITING_FOR_SMOKE":
-                    self.POSE_STATE = "POSE_ACTIVE"
-            
-            elif self.POSE_STATE == "POSE_ACTIVE":
-                self.POSE_TAKEN_OFF_TIME = t
-                self.POSE_STATE = "WAITING_FOR_SMOKE"
-                
-            elif self.POSE_STATE == "WAITING_FOR_SMOKE":
-                if smoke_detected:
-                    smoking_events.append("CONFIRMED SMOKING VIOLATION")
-                    self.POSE_STATE = "VIOLATION_CONFIRMED"
-                elif (t - self.POSE_TAKEN_OFF_TIME) > self.SMOKE_WINDOW_SECONDS:
-                    self.POSE_STATE = "NONE"
-
-            elif self.POSE_STATE == "VIOLATION_CONFIRMED":
-                smoking_events.append("CONFIRMED SMOKING VIOLATION")
-                self.POSE_STATE = "NONE" 
-                 
+        # Tracks outside the zones are drawn but never analyzed
+        if self.zones:
+            active = [tr for tr in tracked if self.zones.contains_box(tr[1], frame.shape)]
+        else:
+            active = tracked
+
+        # -------------------------------------------
+        # 2. Pose Detection
+        # -------------------------------------------
+        # One full-frame pass, shared by the smoking and drinking logic
+        if self._last_pose is None:
+            plan["pose"] = True
+        with self.metrics.span("pose"):
+            roi_rgb = None
+            if plan["pose"]:
+                # Shared by the full-frame pass and every per-person crop
+                roi_rgb = self._rgb = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB, dst=self._rgb)
+                self._last_pose = self.pose_detector.analyze(roi, frame_rgb=roi_rgb, offset=offset)
+            pose = self._last_pose
+            self.pose_detector.release_tracks([oid for oid, _, _, _ in active])
 
             # -------------------------------------------
-            # 4. PERSON LOOP (Draw + Drinking Logic)
+            # 3. PER-PERSON OBSERVATIONS (Pose + Drinking Logic)
             # -------------------------------------------
-            drinking_events.clear()  # <-- ADDED
+            person_points = {}
 
-            for oid, bbox, cls, conf in tracked:
-                x1, y1, x2, y2 = bbox
-
-                # -------------------------
-                # DRINKING LOGIC ADDED HERE
-                # -------------------------
-                person_data = self.pose_detector.get_person_points(frame, bbox)
-
-                if person_data:
-                    is_drinking = self.drinking_detector.detect_drinking(person_data, bottle_boxes)
-
-                    if is_drinking:
-                        drinking_events.append(f"DRINKING DETECTED ID {oid}")
-                        color = (0, 165, 255)  # Orange for drinking
-                    else:
-                        color = (0, 255, 0)
+            for oid, bbox, cls, conf in active:
+                if plan["pose"]:
+                    person_points[oid] = self.pose_detector.get_person_points(
+                        frame, bbox, track_id=oid, pose=pose, frame_rgb=roi_rgb, rgb_offset=offset
+                    )
                 else:
-                    color = (0, 255, 0)
-
-                # Smoking overrides drinking (higher priority)
-                if self.POSE_STATE == "POSE_ACTIVE":
-                    color = (255, 165, 0)
-                if smoke_detected or "CONFIRMED SMOKING VIOLATION" in smoking_events:
-                    color = (0, 0, 255)
-
-                cv2.rectangle(frame,(x1,y1),(x2,y2),color,2)
-                cv2.putText(frame,f"ID{oid}",(x1,y1-8),
-                            cv2.FONT_HERSHEY_SIMPLEX,0.6,(255,255,255),2)
-
-            # Draw Bottle Boxes
-            for box in bottle_boxes:
-                x1, y1, x2, y2 = map(int, box)
-                cv2.rectangle(frame,(x1,y1),(x2,y2),(0,255,255),2)
-                cv2.putText(frame, "Bottle", (x1, y1-5),
-                            cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,255,255),2)
-
-            # Draw Smoke Boxes
-            for box in smoke_boxes:
-                x1, y1, x2, y2 = map(int, box)
-                cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-
-            self._draw_zone(frame)
-            
-            # -------------------------------------------
-            # 5. Recording Logic (Smoking + Drinking)
-            # -------------------------------------------
-            violation_detected = False
+                    person_points[oid] = self._last_person_points.get(oid)
+
+        # -------------------------
+        # DRINKING + SMOKE ATTRIBUTION (one batched step for all persons)
+        # -------------------------
+        rules_start = time.perf_counter()
+        assignments = self.associator.associate(active, person_points, bottle_boxes, smoke_boxes)
+
+        # Only samples of models that ran this frame: results carried forward by
+        # the scheduler / motion gate must not be counted again by the engine
+        observations = {}
+        for oid, bbox, cls, conf in active:
+            person_data = person_points[oid]
+            obs = {}
+            if plan["pose"]:
+                obs["hand_to_mouth"] = bool(person_data and person_data.get("hand_to_mouth"))
+                obs["drinking"] = assignments[oid]["drinking"]  # needs a fresh hand position
+            if plan["smoke"]:
+                obs["smoke"] = assignments[oid]["smoke"]
+            observations[oid] = obs
+
+        if plan["pose"]:
+            self._last_person_points = person_points
+
+        # -------------------------------------------
+        # 4. Per-track Smoking/Drinking State Machines + Colors
+        # -------------------------------------------
+        track_states = self.event_engine.update(t, observations)
 
-            if ("CONFIRMED_SMOKING_VIOLATION" in " ".join(smoking_events)) or len(drinking_events) > 0:
-                violation_detected = True
-
-            if violation_detected and video_source == 0 and not is_recording:
-
-                timestamp = time.strftime("%Y%m%d_%H%M%S")
+        smoking_events = []
+        drinking_events = []  # <-- ADDED
+        persons = []  # (oid, bbox, color)
+
+        for oid, bbox, cls, conf in tracked:
+            ts = track_states.get(oid)
+            if ts is None:
+                persons.append((oid, bbox, (128, 128, 128)))  # outside the zones
+                continue
+            color = (0, 255, 0)
+
+            if ts["drinking"]:
+                drinking_events.append(f"DRINKING DETECTED ID {oid}")
+                color = (0, 165, 255)  # Orange for drinking
+
+            # Smoking overrides drinking (higher priority)
+            if ts["state"] == POSE_ACTIVE:
+                color = (255, 165, 0)
+            if ts["smoking"]:
+                smoking_events.append(f"CONFIRMED SMOKING VIOLATION ID {oid}")
+            if assignments[oid]["smoke"] or ts["smoking"]:
+                color = (0, 0, 255)
+
+            persons.append((oid, bbox, color))
+        self.metrics.observe("rules", time.perf_counter() - rules_start)
+
+        self.metrics.inc("frames")
+        if run_models:
+            self.metrics.inc("inferred_frames")
+        # Events, not event-frames: count tracks that became confirmed on this frame
+        confirmed = {(oid, kind) for oid, ts in track_states.items()
+                     for kind in ("smoking", "drinking") if ts[kind]}
+        for oid, kind in confirmed - self._confirmed:
+            self.metrics.inc(kind)
+        self._confirmed = confirmed
+
+        return {
+            "persons": persons,
+            "bottles": bottle_boxes,
+            "smoke_boxes": smoke_boxes,
+            "smoking_events": smoking_events,
+            "drinking_events": drinking_events,
+            "state": self.event_engine.summary_state(),
+            "track_states": track_states,
+            "person_points": person_points,  # {oid: person_data or None}, active tracks
+            "inferred": run_models,
+        }
+
+    def _draw_detections(self, frame, result):
+        for oid, (x1, y1, x2, y2), color in result["persons"]:
+            cv2.rectangle(frame,(x1,y1),(x2,y2),color,2)
+            cv2.putText(frame,f"ID{oid}",(x1,y1-8),
+                        cv2.FONT_HERSHEY_SIMPLEX,0.6,(255,255,255),2)
+
+        if self.DRAW_POSE_LANDMARKS:
+            drawn = set()  # tracks matched to the full-frame pass share one result
+            for person_data in result["person_points"].values():
+                pose = person_data and person_data.get("pose")
+                if pose is not None and id(pose) not in drawn:
+                    drawn.add(id(pose))
+                    self.pose_detector.draw(frame, pose)
+
+        # Draw Bottle Boxes
+        for box in result["bottles"]:
+            x1, y1, x2, y2 = map(int, box)
+            cv2.rectangle(frame,(x1,y1),(x2,y2),(0,255,255),2)
+            cv2.putText(frame, "Bottle", (x1, y1-5),
+                        cv2.FONT_HERSHEY_SIMPLEX,0.5,(0,255,255),2)
+
+        # Draw Smoke Boxes
+        for box in result["smoke_boxes"]:
+            x1, y1, x2, y2 = map(int, box)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+
+        self._draw_zone(frame)
+
+    def _draw_status(self, frame, result, recording):
+        frame_height, frame_width = frame.shape[:2]
+        cv2.putText(frame, f"STATE: {result['state']}",
+                    (frame_width - 200, frame_height - 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6,
+                    (255, 255, 0), 2)
+
+        y_offset = 30
+        for e in result["smoking_events"]:
+            cv2.putText(frame, e, (10, y_offset),
+                        cv2.FONT_HERSHEY_SIMPLEX,0.6,(0,0,255),2)
+            y_offset += 20
+
+        for e in result["drinking_events"]:
+            cv2.putText(frame, e, (10, y_offset),
+                        cv2.FONT_HERSHEY_SIMPLEX,0.6,(0,165,255),2)
+            y_offset += 20
+
+        if recording:
+            cv2.putText(frame, "RECORDING...",
+                        (frame_width - 150, 30),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8,
+                        (0, 0, 255), 2)
+
+    def _evidence_name(self, file_prefix, t):
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
+        if self.camera_id is None:
+            return f"{file_prefix}_{timestamp}.mp4"
+        return f"{file_prefix}_{self.camera_id}_{timestamp}.mp4"
+
+    def _update_recording(self, frame, result, t):
+        """Recording Logic (Smoking + Drinking). Returns True while recording."""
+        violation_detected = False
+
+        if len(result["smoking_events"]) > 0 or len(result["drinking_events"]) > 0:
+            violation_detected = True
+
+        if not self.record_evidence:
+            return False
+
+        if self.recorder is None:
+            self.recorder = EvidenceRecorder(
+                pre_roll_seconds=self.PRE_ROLL_SECONDS,
+                post_roll_seconds=self.RECORDING_DURATION,
+                max_buffer_bytes=self.RING_BUFFER_MAX_BYTES,
+                compress=self.RING_BUFFER_COMPRESS,
+                block=self.recorder_blocking
+            )
+
+        if violation_detected and not self.recorder.recording:
+
+            if len(result["drinking_events"]) > 0:
+                file_prefix = "DRINKING"
+            else:
+                file_prefix = "SMOKING"
+
+            output_path = os.path.join(self.EVIDENCE_FOLDER, self._evidence_name(file_prefix, t))
+            self.evidence_path = output_path
+            # Flushes the pre-roll; encoding and disk I/O run on the writer thread
+            self.recorder.trigger(output_path, self.fps, t)
+
+        return self.recorder.push(frame, t)
+
+    # packet = {"index", "t", "frame", "result", "preview", "drawn", "recording"}
+    def _inference_stage(self, packet):
+        packet["result"] = self._analyze(packet["frame"], packet["t"])
+        return packet
+
+    def _annotate_stage(self, packet):
+        # Sinks this frame goes to (preview fps): frames nobody looks at are not drawn on
+        packet["preview"] = self.sinks.due(packet["t"])
+        if self.record_evidence:
+            # Clean clips: the recorder sees the frame before anything is drawn
+            packet["drawn"] = self.EVIDENCE_ANNOTATED
+        else:
+            packet["drawn"] = bool(packet["preview"])
+        if packet["drawn"]:
+            with self.metrics.span("draw"):
+                self._draw_detections(packet["frame"], packet["result"])
+        return packet
+
+    def _record_events(self, result, t):
+        """One event-store record per (track, event type) episode: opened on its first frame, closed after its last."""
+        self._last_t = t
+        if self.event_store is None:
+            return
+        now = self.clock_origin + t
+        clip = self.evidence_path if self.recorder is not None and self.recorder.recording else None
+        active = set()
+        for oid, ts in result["track_states"].items():
+            for event_type in ("smoking", "drinking"):
+                if not ts[event_type]:
+                    continue
+                key = (oid, event_type)
+                active.add(key)
+                if key not in self._open_events:
+                    self._open_events[key] = now
+                    self.event_store.open_event(self._camera_name(), oid, event_type, now,
+                                                ts[f"{event_type}_conf"], clip)
+        self._close_events(now, clip, keep=active)
+
+    def _close_events(self, now, clip=None, keep=()):
+        for key in [k for k in self._open_events if k not in keep]:
+            oid, event_type = key
+            self.event_store.close_event(self._camera_name(), oid, event_type, self._open_events.pop(key), now, clip)
+
+    def _camera_name(self):
+        return str(self.camera_id) if self.camera_id is not None else "default"
+
+    def _sink_stage(self, packet):
+        with self.metrics.span("encode"):
+            packet["recording"] = self._update_recording(packet["frame"], packet["result"], packet["t"])
+        self._record_events(packet["result"], packet["t"])
+        if packet["preview"]:
+            with self.metrics.span("draw"):
+                if not packet["drawn"]:
+                    self._draw_detections(packet["frame"], packet["result"])  # clip was recorded clean
+                self._draw_status(packet["frame"], packet["result"], packet["recording"] and self.record_evidence)
+            with self.metrics.span("display"):
+                self.sinks.submit(packet["frame"], packet["preview"])
+        return packet
+
+    def _close_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+        self.recorder = None
+
+    def stop(self):
+        """Ask a running run_logic() to finish (safe to call from another thread)."""
+        self._stop_requested = True
+        if self.pipeline is not None:
+            self.pipeline.stop()
+
+    @staticmethod
+    def is_live_source(video_source):
+        return isinstance(video_source, int) or str(video_source).startswith(("rtsp://", "rtmp://", "http://", "https://"))
+
+    def run_logic(self, video_source, display=True):
+        """
+        display=False runs without any window (supervisor workers); the
+        preview then only goes to OUTPUT_SINKS, if any.
+        Returns False if the source could not be opened.
+        """
+        if self.METRICS and not REGISTRY.enabled:
+            metrics_module.configure(self.METRICS)
+        live = self.is_live_source(video_source)
+        # Every packet in the pipeline holds one frame: the decode pool must outlive
+        # all queues (capture + 3 stages) plus the frames in flight.
+        pool_size = 4 * self.QUEUE_SIZE + 6
+        try:
+            cap = open_source(
+                video_source,
+                backend=self.DECODE_BACKEND,
+                width=self.DECODE_WIDTH,
+                threads=self.DECODE_THREADS,
+                pool_size=pool_size,
+                options=self.DECODE_OPTIONS
+            )
+        except IOError:
+            if display:
+                messagebox.showerror("Error", "Could not open video source. Check camera index (0) or file path.")
+            else:
+                logger.error("[%s] could not open video source %r", self._camera_name(), video_source)
+            return False
+
+        self.fps = cap.fps
+        self.record_evidence = live
+        self._close_recording()
+        self._stop_requested = False
+        self.sinks = build_sinks(
+            self.OUTPUT_SINKS if self.OUTPUT_SINKS is not None else (["window"] if display else []),
+            fps=self.PREVIEW_FPS,
+            width=self.PREVIEW_WIDTH,
+            camera_id=self.camera_id
+        ).start()
 
-                if len(drinking_events) > 0:
-                    file_prefix = "DRINKING"
+        start = time.time()
+        self.clock_origin = start
+        frame_index = [0]
+
+        def read_frame():
+            with self.metrics.span("decode"):
+                item = cap.read()
+            if item is None:
+                if live:
+                    logger.error("[%s] failed to receive frame from camera stream", self._camera_name())
                 else:
-                    file_prefix = "SMOKING"
-
-                output_path = os.path.join(
-                    self.EVIDENCE_FOLDER,
-                    f"{file_prefix}_{timestamp}.mp4"
-                )
-
-                fourcc = cv2.VideoWriter_fourcc(*'XVID')
-                video_writer = cv2.VideoWriter(
-                    output_path, 
-                    fourcc, 
-                    fps, 
-                    (frame_width, frame_height)
-                )
-                is_recording = True
-                stop_recording_time = t + self.RECORDING_DURATION
-                print(f"--- Recording started: {output_path} ---")
-
-            if is_recording and video_writer is not None:
-                video_writer.write(frame)
-                if t > stop_recording_time:
-                    video_writer.release()
-                    is_recording = False
-                    print("--- Recording stopped ---")
-
-            # -------------------------------------------
-            # 6. Display Output
-            # -------------------------------------------
-            cv2.putText(frame, f"STATE: {self.POSE_STATE}",
-                        (frame_width - 200, frame_height - 30),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.6,
-                        (255, 255, 0), 2)
-
-            y_offset = 30
-            for e in smoking_events:
-                cv2.putText(frame, e, (10, y_offset),
-                            cv2.FONT_HERSHEY_SIMPLEX,0.6,(0,0,255),2)
-                y_offset += 20
-
-            for e in drinking_events:
-                cv2.putText(frame, e, (10, y_offset),
-                            cv2.FONT_HERSHEY_SIMPLEX,0.6,(0,165,255),2)
-                y_offset += 20
-
-            if is_recording and video_source == 0:
-                cv2.putText(frame, "RECORDING...",
-                            (frame_width - 150, 30),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.8,
-                            (0, 0, 255), 2)
-
-            cv2.imshow("CCTV AI", frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+                    logger.info("[%s] video playback finished", self._camera_name())
+                return None
+            frame_index[0] += 1
+            return {"index": frame_index[0], "t": time.time() - start, "frame": item[1]}
+
+        # capture -> inference -> annotate -> sinks; window sinks are shown from this thread
+        # Live sources drop stale frames ("latest frame wins"); files never drop.
+        self.pipeline = Pipeline(live=live, queue_size=self.QUEUE_SIZE)
+        self.pipeline.set_source("capture", read_frame)
+        self.pipeline.add_stage("inference", self._inference_stage)
+        self.pipeline.add_stage("annotate", self._annotate_stage)
+        self.pipeline.add_stage("sinks", self._sink_stage)
+        output = self.pipeline.start()
+        self.metrics.attach_pipeline(self.pipeline)
+
+        # cv2.imshow / waitKey must stay on the thread that owns the window
+        while not self._stop_requested:
+            packet = output.get()
+            if packet is None:
                 break
-                
-        if video_writer is not None and video_writer.isOpened():
-            video_writer.release()
+            if self.time_to_first_frame is None:
+                # Construction (model loading) to the first fully processed frame
+                self.time_to_first_frame = time.perf_counter() - self._created
+                logger.info("[%s] first frame after %.2fs", self._camera_name(), self.time_to_first_frame)
+            if not self.sinks.poll():
+                break  # 'q' in the window
+
+        self.pipeline.stop()
+        self.pipeline.join()
+        camera = self._camera_name()
+        for error in self.pipeline.errors():
+            logger.error("[%s] pipeline error: %r", camera, error)
+        logger.info("[%s] pipeline: %s", camera, self.pipeline.snapshot())
+        if self.motion_gate is not None:
+            logger.info("[%s] motion gate: %s", camera, self.motion_gate.snapshot())
+        if self.scheduler is not None:
+            logger.info("[%s] model scheduler: %s", camera, self.scheduler.snapshot())
+        if self.tiler is not None:
+            logger.info("[%s] tiled inference: %s", camera, self.tiler.snapshot())
+        if self.sinks:
+            logger.info("[%s] output sinks: %s", camera, self.sinks.snapshot())
+
+        self._close_recording()
+        if self.event_store is not None:
+            self._close_events(self.clock_origin + self._last_t)
         cap.release()
-        cv2.destroyAllWindows()
+        self.sinks.close()
+        self.sinks = SinkSet()
+        return True
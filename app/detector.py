@@ -1,23 +1,60 @@
-from ultralytics import YOLO
+from app.backends import load_yolo
 
 class Detector:
-    # We will use the yolo detector purely to find the person's bounding box (class 0)
+    # We use the yolo detector to find persons (class 0) for tracking and
+    # bottles (class 39) for the drinking logic.
     # The PoseDetector will handle the activity detection.
-    def __init__(self, model_name='yolov8n.pt', device='cpu'):
-        self.model = YOLO(model_name)
-        self.model.to(device)
+    PERSON_CLASS = 0
+    BOTTLE_CLASS = 39  # COCO bottle class (change if needed)
 
-    def detect(self, frame):
-        # We only care about detecting person (class 0) for tracking purposes
-        results = self.model.predict(source=frame, classes=[0], imgsz=640, conf=0.35, verbose=False)
+    # Per-class confidence thresholds {class_id: min_conf}
+    DEFAULT_CLASS_CONF = {PERSON_CLASS: 0.35, BOTTLE_CLASS: 0.25}
+
+    def __init__(self, model_name='yolov8n.pt', device='cpu', class_conf=None, imgsz=640):
+        # .pt, .onnx (incl. INT8) or OpenVINO IR -- see app/backends.py
+        self.model = load_yolo(model_name, device)
+        self.class_conf = dict(class_conf or self.DEFAULT_CLASS_CONF)
+        self.imgsz = imgsz
+
+    def _predict(self, source, imgsz=None):
+        # Run with the lowest threshold, then apply the per-class thresholds in _parse
+        return self.model.predict(
+            source=source,
+            classes=list(self.class_conf),
+            imgsz=imgsz or self.imgsz,
+            conf=min(self.class_conf.values()),
+            verbose=False
+        )
+
+    def _parse(self, r, prepared=None):
         dets = []
-        r = results[0]
         if getattr(r, "boxes", None) is None:
             return dets
         for box in r.boxes:
-            x1, y1, x2, y2 = box.xyxy[0].tolist()
             conf = float(box.conf[0])
             cls = int(box.cls[0])
+            if conf < self.class_conf.get(cls, 1.0):
+                continue
+            xyxy = box.xyxy[0].tolist()
+            if prepared is not None:
+                xyxy = prepared.to_frame_coords(xyxy)
+            x1, y1, x2, y2 = xyxy
             # Returns 6 elements: (x1, y1, x2, y2, conf, cls)
             dets.append((int(x1), int(y1), int(x2), int(y2), conf, cls))
-        return dets
\ No newline at end of file
+        return dets
+
+    def detect(self, frame, prepared=None):
+        """
+        prepared: optional LetterboxedFrame shared with other models, so the
+                  frame is resized/normalized only once.
+        """
+        source = prepared.tensor if prepared is not None else frame
+        return self._parse(self._predict(source)[0], prepared)
+
+    def detect_batch(self, prepared_list, batch_tensor, imgsz=None):
+        """
+        One forward pass for many frames. batch_tensor = torch.cat of the prepared tensors.
+        imgsz: size the tensors were letterboxed to, when not self.imgsz.
+        """
+        results = self._predict(batch_tensor, imgsz)
+        return [self._parse(r, prepared) for r, prepared in zip(results, prepared_list)]
@@ -1,8 +1,11 @@
 # app/drinking_detector.py
 import math
+import numpy as np
 
 class DrinkingDetector:
-    
+    HAND_MOUTH_PX = 80     # hand near mouth threshold (px)
+    HAND_BOTTLE_PX = 120   # bottle centre near hand threshold (px)
+
     def _distance(self, p1, p2):
         if p1 is None or p2 is None:
             return 9999
@@ -32,7 +35,7 @@ class DrinkingDetector:
 
         # Hand near mouth?
         dist_hand_mouth = self._distance(hand, mouth)
-        if dist_hand_mouth > 80:   # threshold (px)
+        if dist_hand_mouth > self.HAND_MOUTH_PX:
             return False
 
         # Bottle near hand?
@@ -40,7 +43,43 @@ class DrinkingDetector:
             b_center = self._center(bottle)
             if b_center is not None:
                 dist_hand_bottle = self._distance(hand, b_center)
-                if dist_hand_bottle < 120:
+                if dist_hand_bottle < self.HAND_BOTTLE_PX:
                     return True
 
         return False
+
+    def detect_drinking_batch(self, person_data_list, bottle_boxes):
+        """
+        detect_drinking() for every person at once.
+        Builds one (persons x bottles) hand-to-bottle distance matrix in NumPy.
+        Returns (is_drinking: bool array (P,), bottle_idx: int array (P,), -1 = none)
+        """
+        n = len(person_data_list)
+        is_drinking = np.zeros(n, dtype=bool)
+        bottle_idx = np.full(n, -1, dtype=np.int64)
+        if n == 0 or len(bottle_boxes) == 0:
+            return is_drinking, bottle_idx
+
+        # NaN marks a missing hand / mouth
+        hands = np.full((n, 2), np.nan, dtype=np.float32)
+        mouths = np.full((n, 2), np.nan, dtype=np.float32)
+        for i, data in enumerate(person_data_list):
+            if data:
+                if data.get("hand") is not None:
+                    hands[i] = data["hand"]
+                if data.get("mouth") is not None:
+                    mouths[i] = data["mouth"]
+
+        boxes = np.asarray(bottle_boxes, dtype=np.float32).reshape(-1, 4)
+        centers = np.stack([(boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2], axis=1)
+
+        hand_mouth = np.linalg.norm(hands - mouths, axis=1)                          # (P,)
+        hand_bottle = np.linalg.norm(hands[:, None, :] - centers[None, :, :], axis=2)  # (P, B)
+
+        nearest = np.argmin(np.nan_to_num(hand_bottle, nan=np.inf), axis=1)
+        nearest_dist = hand_bottle[np.arange(n), nearest]
+
+        # NaN comparisons are False, so persons without hand/mouth never match
+        is_drinking = (hand_mouth <= self.HAND_MOUTH_PX) & (nearest_dist < self.HAND_BOTTLE_PX)
+        bottle_idx = np.where(is_drinking, nearest, -1)
+        return is_drinking, bottle_idx
@@ -0,0 +1,154 @@
+# app/eventengine.py
+from collections import deque
+
+
+# --- STATES (same names as the old global POSE_STATE) ---
+NONE = "NONE"
+POSE_ACTIVE = "POSE_ACTIVE"
+WAITING_FOR_SMOKE = "WAITING_FOR_SMOKE"
+VIOLATION_CONFIRMED = "VIOLATION_CONFIRMED"
+
+# Higher = more important, used for the on-screen summary
+_STATE_RANK = {NONE: 0, WAITING_FOR_SMOKE: 1, POSE_ACTIVE: 2, VIOLATION_CONFIRMED: 3}
+
+
+class TrackState:
+    """Compact per-track state: small ring buffers of the last observations."""
+
+    __slots__ = ("state", "pose_off_time", "hand_mouth", "smoke", "bottle",
+                 "drinking", "last_seen")
+
+    def __init__(self, history, t):
+        self.state = NONE
+        self.pose_off_time = 0.0
+        self.hand_mouth = deque(maxlen=history)  # hand near mouth (bool)
+        self.smoke = deque(maxlen=history)       # smoke overlapping the person (bool)
+        self.bottle = deque(maxlen=history)      # hand at mouth with a bottle (bool)
+        self.drinking = False
+        self.last_seen = t
+
+
+def _recent(buffer, n):
+    """Number of True values among the last n observations."""
+    if n >= len(buffer):
+        return sum(buffer)
+    return sum(buffer[i] for i in range(len(buffer) - n, len(buffer)))
+
+
+class EventEngine:
+    """
+    Per-track temporal event engine (smoking + drinking), keyed by track ID.
+
+    Every track runs its own copy of the smoking state machine:
+        NONE -> POSE_ACTIVE -> WAITING_FOR_SMOKE -> VIOLATION_CONFIRMED -> NONE
+    with debouncing: the hand must be at the mouth for pose_on_frames of the
+    last pose_on_frames observations to enter POSE_ACTIVE, and away for
+    pose_off_frames to leave it. Drinking uses hysteresis: it switches on once
+    drink_on of the last history frames were positive and off once at most
+    drink_off were.
+
+    State of tracks not seen for track_ttl_seconds is evicted, so memory stays
+    bounded; update() cost is O(observed tracks) plus an occasional sweep.
+    """
+
+    def __init__(self, smoke_window_seconds=3.0, history=15, pose_on_frames=2, pose_off_frames=3,
+                 smoke_frames=1, drink_on=4, drink_off=1, track_ttl_seconds=5.0):
+        self.smoke_window_seconds = smoke_window_seconds
+        self.history = history
+        self.pose_on_frames = pose_on_frames
+        self.pose_off_frames = pose_off_frames
+        self.smoke_frames = smoke_frames
+        self.drink_on = drink_on
+        self.drink_off = drink_off
+        self.track_ttl_seconds = track_ttl_seconds
+
+        self.tracks = {}  # {oid: TrackState}
+        self._last_sweep = 0.0
+
+    def _step_smoking(self, ts, t):
+        """Advance one track's smoking state machine. Returns True on a confirmed violation."""
+        pose_on = _recent(ts.hand_mouth, self.pose_on_frames) >= self.pose_on_frames
+        pose_off = _recent(ts.hand_mouth, self.pose_off_frames) == 0
+        smoke_seen = _recent(ts.smoke, self.smoke_frames) > 0
+
+        if pose_on:
+            if ts.state == NONE or ts.state == WAITING_FOR_SMOKE:
+                ts.state = POSE_ACTIVE
+
+        elif ts.state == POSE_ACTIVE:
+            if pose_off:
+                ts.pose_off_time = t
+                ts.state = WAITING_FOR_SMOKE
+
+        elif ts.state == WAITING_FOR_SMOKE:
+            if smoke_seen:
+                ts.state = VIOLATION_CONFIRMED
+                return True
+            elif (t - ts.pose_off_time) > self.smoke_window_seconds:
+                ts.state = NONE
+
+        elif ts.state == VIOLATION_CONFIRMED:
+            ts.state = NONE
+            return True
+
+        return False
+
+    def _step_drinking(self, ts):
+        count = sum(ts.bottle)
+        if not ts.drinking and count >= self.drink_on:
+            ts.drinking = True
+        elif ts.drinking and count <= self.drink_off:
+            ts.drinking = False
+        return ts.drinking
+
+    def update(self, t, observations):
+        """
+        observations = {oid: {"hand_to_mouth": bool, "smoke": bool, "drinking": bool}}
+        Only fresh samples count: leave a key out when its model did not run
+        this frame (scheduler / motion gate), or a carried-forward result
+        would be counted again and defeat the debouncing. The track is still
+        marked as seen and its state machine still advances.
+        Returns {oid: {"state": str, "smoking": bool, "drinking": bool,
+                       "smoking_conf": float, "drinking_conf": float}}
+        *_conf: share of the track's recent frames supporting the event.
+        """
+        out = {}
+        for oid, obs in observations.items():
+            ts = self.tracks.get(oid)
+            if ts is None:
+                ts = self.tracks[oid] = TrackState(self.history, t)
+            ts.last_seen = t
+            for key, buffer in (("hand_to_mouth", ts.hand_mouth), ("smoke", ts.smoke), ("drinking", ts.bottle)):
+                if key in obs:
+                    buffer.append(bool(obs[key]))
+
+            smoking = self._step_smoking(ts, t)
+            drinking = self._step_drinking(ts)
+            out[oid] = {
+                "state": ts.state,
+                "smoking": smoking,
+                "drinking": drinking,
+                "smoking_conf": sum(ts.hand_mouth) / max(1, len(ts.hand_mouth)),
+                "drinking_conf": sum(ts.bottle) / max(1, len(ts.bottle)),
+            }
+
+        # Evict expired tracks at most once per second
+        if t - self._last_sweep >= 1.0:
+            self.expire(t)
+        return out
+
+    def expire(self, t):
+        self._last_sweep = t
+        for oid in [oid for oid, ts in self.tracks.items() if t - ts.last_seen > self.track_ttl_seconds]:
+            del self.tracks[oid]
+
+    def any_in(self, states):
+        return any(ts.state in states for ts in self.tracks.values())
+
+    def summary_state(self):
+        """Most important state across all tracks (for the on-screen STATE text)."""
+        best = NONE
+        for ts in self.tracks.values():
+            if _STATE_RANK[ts.state] > _STATE_RANK[best]:
+                best = ts.state
+        return best
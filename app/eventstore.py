@@ -0,0 +1,265 @@
+# app/eventstore.py
+"""
+Append-only event log in SQLite (WAL mode), written off the hot loop.
+
+    store = open_store("evidence/events.db")
+    store.open_event("cam7", 12, "drinking", start_time=time.time(), confidence=0.8, clip_path=...)
+    store.close_event("cam7", 12, "drinking", start_time, end_time=time.time())
+    store.query(camera="cam7", event_type="drinking", since=time.time() - 7 * 86400)
+
+open_event / close_event only enqueue; one writer thread per database
+batches them into a single transaction (up to batch_size rows or every
+flush_interval seconds). Indexes on (camera, event_type, start_time) and
+(start_time) keep per-camera / time-range queries fast on millions of rows.
+Rows older than retention_days are deleted in chunks by the writer, then
+the WAL is checkpointed and free pages are returned to the OS.
+
+Query from the command line:
+    python -m app.eventstore evidence/events.db --camera cam7 --type drinking --since 7d
+    python -m app.eventstore evidence/events.db --compact --retention-days 30
+"""
+import argparse
+import atexit
+import json
+import queue
+import sqlite3
+import threading
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY,
+    camera      TEXT NOT NULL,
+    track_id    INTEGER,
+    event_type  TEXT NOT NULL,
+    start_time  REAL NOT NULL,
+    end_time    REAL,
+    confidence  REAL,
+    clip_path   TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_camera_type_time ON events (camera, event_type, start_time);
+CREATE INDEX IF NOT EXISTS idx_events_time ON events (start_time);
+"""
+
+COLUMNS = ("id", "camera", "track_id", "event_type", "start_time", "end_time", "confidence", "clip_path")
+
+
+def connect(path, timeout=30.0):
+    conn = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    # auto_vacuum only takes effect before the first table is created
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: durable across app crashes
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class EventStore:
+    def __init__(self, path, batch_size=500, flush_interval=1.0, max_pending=100000,
+                 retention_days=None, retention_check_seconds=3600.0):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retention_days = retention_days
+        self.retention_check_seconds = retention_check_seconds
+
+        connect(self.path).close()  # create schema / fail early on a bad path
+        self._ops = queue.Queue(maxsize=max_pending)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="event-store", daemon=True)
+        self._last_retention = 0.0
+
+        # --- Stats ---
+        self.written = 0
+        self.dropped = 0
+        self._thread.start()
+
+    # -------------------------------------------
+    # PRODUCER SIDE (hot loop, never blocks)
+    # -------------------------------------------
+    def _put(self, op):
+        try:
+            self._ops.put_nowait(op)
+        except queue.Full:
+            self.dropped += 1
+
+    def open_event(self, camera, track_id, event_type, start_time, confidence=None, clip_path=None):
+        self._put(("insert", (str(camera), track_id, event_type, start_time, None, confidence, clip_path)))
+
+    def close_event(self, camera, track_id, event_type, start_time, end_time, clip_path=None):
+        """Sets end_time (and the clip, if it started later) of an open event."""
+        self._put(("end", (end_time, clip_path, str(camera), track_id, event_type, start_time)))
+
+    def flush(self, timeout=10.0):
+        """Blocks until everything queued so far is committed."""
+        done = threading.Event()
+        try:
+            self._ops.put(("flush", done), timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout=10.0):
+        if self._stop_event.is_set():
+            return
+        self.flush(timeout)
+        self._stop_event.set()
+        try:
+            self._ops.put(("stop", None), timeout=timeout)  # wake the writer now, not after flush_interval
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # -------------------------------------------
+    # WRITER THREAD
+    # -------------------------------------------
+    def _write(self, conn, ops):
+        inserts = [args for kind, args in ops if kind == "insert"]
+        ends = [args for kind, args in ops if kind == "end"]
+        with conn:  # one transaction per batch
+            if inserts:
+                conn.executemany(
+                    "INSERT INTO events (camera, track_id, event_type, start_time, end_time, confidence, clip_path)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)", inserts
+                )
+            if ends:
+                conn.executemany(
+                    "UPDATE events SET end_time = ?, clip_path = COALESCE(clip_path, ?)"
+                    " WHERE camera = ? AND track_id IS ? AND event_type = ? AND start_time = ? AND end_time IS NULL",
+                    ends
+                )
+        self.written += len(inserts)
+
+    def _loop(self):
+        conn = connect(self.path)
+        try:
+            while not (self._stop_event.is_set() and self._ops.empty()):
+                ops, waiters = [], []
+                deadline = time.time() + self.flush_interval
+                while len(ops) < self.batch_size:
+                    try:
+                        op = self._ops.get(timeout=max(0.0, deadline - time.time()))
+                    except queue.Empty:
+                        break
+                    if op[0] == "stop":
+                        break
+                    if op[0] == "flush":
+                        waiters.append(op[1])
+                        break
+                    ops.append(op)
+                if ops:
+                    try:
+                        self._write(conn, ops)
+                    except sqlite3.Error as e:
+                        self.dropped += len(ops)
+                        print(f"[events] write failed: {e!r}")
+                for done in waiters:
+                    done.set()
+                if self.retention_days and time.time() - self._last_retention > self.retention_check_seconds:
+                    self._last_retention = time.time()
+                    apply_retention(conn, self.retention_days)
+        finally:
+            conn.close()
+
+    # -------------------------------------------
+    # QUERIES (own connection: WAL readers never block the writer)
+    # -------------------------------------------
+    def query(self, camera=None, event_type=None, since=None, until=None, limit=1000):
+        return query(self.path, camera, event_type, since, until, limit)
+
+    def snapshot(self):
+        return {"written": self.written, "pending": self._ops.qsize(), "dropped": self.dropped}
+
+
+def query(path, camera=None, event_type=None, since=None, until=None, limit=1000):
+    """Events matching all given filters, newest first, as dicts."""
+    where, args = [], []
+    for column, op, value in (("camera", "=", camera), ("event_type", "=", event_type),
+                              ("start_time", ">=", since), ("start_time", "<", until)):
+        if value is not None:
+            where.append(f"{column} {op} ?")
+            args.append(str(value) if column == "camera" else value)
+    sql = f"SELECT {', '.join(COLUMNS)} FROM events"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY start_time DESC LIMIT ?"
+    args.append(int(limit))
+
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30.0)
+    try:
+        return [dict(zip(COLUMNS, row)) for row in conn.execute(sql, args)]
+    finally:
+        conn.close()
+
+
+def apply_retention(conn, retention_days, chunk=10000):
+    """
+    Deletes events older than retention_days in chunks (short write locks),
+    then checkpoints the WAL and releases free pages. Returns rows deleted.
+    """
+    cutoff = time.time() - retention_days * 86400.0
+    deleted = 0
+    while True:
+        with conn:
+            cur = conn.execute(
+                "DELETE FROM events WHERE id IN (SELECT id FROM events WHERE start_time < ? LIMIT ?)",
+                (cutoff, chunk)
+            )
+        deleted += cur.rowcount
+        if cur.rowcount < chunk:
+            break
+    if deleted:
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA incremental_vacuum")
+    return deleted
+
+
+# One store (and writer thread) per database file and process
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path, **kwargs):
+    with _stores_lock:
+        store = _stores.get(str(path))
+        if store is None:
+            store = _stores[str(path)] = EventStore(path, **kwargs)
+        return store
+
+
+@atexit.register
+def _close_stores():
+    for store in list(_stores.values()):
+        store.close(timeout=5.0)
+
+
+def _parse_since(value):
+    """'7d', '12h', '30m' ago, or a unix timestamp."""
+    units = {"d": 86400, "h": 3600, "m": 60, "s": 1}
+    if value[-1:] in units:
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query or compact the event store")
+    parser.add_argument("db", help="path to events.db")
+    parser.add_argument("--camera")
+    parser.add_argument("--type", dest="event_type", help="smoking or drinking")
+    parser.add_argument("--since", help="e.g. 7d, 12h, or a unix timestamp")
+    parser.add_argument("--until", help="unix timestamp")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--compact", action="store_true", help="apply retention and reclaim space")
+    parser.add_argument("--retention-days", type=float, default=90.0)
+    args = parser.parse_args()
+
+    if args.compact:
+        conn = connect(args.db)
+        print(f"deleted {apply_retention(conn, args.retention_days)} events older than {args.retention_days} days")
+        conn.close()
+    else:
+        rows = query(args.db, args.camera, args.event_type,
+                     _parse_since(args.since) if args.since else None,
+                     float(args.until) if args.until else None, args.limit)
+        for row in rows:
+            print(json.dumps(row))
@@ -0,0 +1,175 @@
+# app/evidence.py
+import queue
+import threading
+from collections import deque
+
+import cv2
+
+
+class FrameRingBuffer:
+    """
+    Memory-bounded buffer of the most recent frames (the pre-roll).
+    Stores raw frame copies by default; compress=True stores JPEG bytes
+    instead, which is an explicit memory-saving option: it costs one
+    cv2.imencode per frame on the caller's thread. Either way the total size
+    is capped at max_bytes and the span at max_seconds.
+
+    Raw frames cost width * height * 3 bytes each: a full 5 s pre-roll at
+    30 fps is ~140 MB at 720p and ~930 MB at 1080p, per camera. The default
+    256 MB cap therefore holds only ~1.4 s of raw 1080p; when the cap cuts
+    the pre-roll short of max_seconds a warning is printed once and
+    capped_seconds records the span actually held.
+    """
+
+    def __init__(self, max_seconds=5.0, max_bytes=256 * 1024 * 1024, compress=False, jpeg_quality=85):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.jpeg_quality = jpeg_quality
+        self._items = deque()  # (t, data, nbytes)
+        self.nbytes = 0
+        self.capped_seconds = None  # pre-roll span held when max_bytes first evicted a frame early
+
+    def encode(self, frame):
+        if self.compress:
+            ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            if ok:
+                return buf
+        return frame.copy()
+
+    def push(self, data, t):
+        self._items.append((t, data, data.nbytes))
+        self.nbytes += data.nbytes
+        while self._items and (self.nbytes > self.max_bytes or t - self._items[0][0] > self.max_seconds):
+            oldest, _, n = self._items.popleft()
+            self.nbytes -= n
+            if self.capped_seconds is None and t - oldest <= self.max_seconds:
+                # Evicted by size while still inside the pre-roll window
+                self._warn_capped(t - self._items[0][0] if self._items else 0.0, data.nbytes)
+
+    def _warn_capped(self, span, frame_bytes):
+        self.capped_seconds = span
+        print(f"[evidence] pre-roll limited to {span:.1f}s of {self.max_seconds:.1f}s by "
+              f"max_bytes={self.max_bytes / 2**20:.0f} MB ({frame_bytes / 2**20:.1f} MB per frame); "
+              f"raise RING_BUFFER_MAX_BYTES or set RING_BUFFER_COMPRESS")
+
+    def drain(self):
+        """Returns all buffered (t, data) in order and empties the buffer."""
+        items = [(t, data) for t, data, _ in self._items]
+        self._items.clear()
+        self.nbytes = 0
+        return items
+
+    def __len__(self):
+        return len(self._items)
+
+
+def decode_frame(data):
+    # JPEG buffers are 1-D uint8; raw frames are already H x W x 3
+    if data.ndim == 1:
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+    return data
+
+
+class EvidenceWriter(threading.Thread):
+    """Background thread that owns every cv2.VideoWriter: decode + encode + disk I/O."""
+
+    def __init__(self, max_pending=512):
+        super().__init__(name="evidence-writer", daemon=True)
+        self.jobs = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.written = []  # finished clip paths
+
+    def submit(self, item, block=False):
+        try:
+            self.jobs.put(item, block=block)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def run(self):
+        writer = None
+        path = None
+        current_fps = 30.0
+        while True:
+            item = self.jobs.get()
+            kind = item[0]
+            if kind == "open":
+                _, path, fps = item
+                writer = None  # created on the first frame, once the size is known
+                current_fps = fps
+            elif kind == "frame" and path is not None:
+                frame = decode_frame(item[1])
+                if frame is None:
+                    continue
+                if writer is None:
+                    h, w = frame.shape[:2]
+                    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'XVID'), current_fps, (w, h))
+                writer.write(frame)
+            elif kind in ("close", "stop"):
+                if writer is not None:
+                    writer.release()
+                    self.written.append(path)
+                    print(f"--- Recording stopped: {path} ---")
+                writer = None
+                path = None
+                if kind == "stop":
+                    break
+
+
+class EvidenceRecorder:
+    """
+    Pre-roll + post-roll evidence clips.
+
+    push() every frame; trigger() on a confirmed event flushes the buffered
+    pre-roll and keeps forwarding frames until post_roll_seconds have passed.
+    All video encoding/disk work happens on the EvidenceWriter thread; push()
+    only copies the frame (plus a JPEG encode of the pre-roll when compress=True).
+    Live sources drop frames when the writer falls behind (block=False);
+    offline runs block.
+    """
+
+    def __init__(self, pre_roll_seconds=5.0, post_roll_seconds=5.0,
+                 max_buffer_bytes=256 * 1024 * 1024, compress=False, block=False):
+        self.buffer = FrameRingBuffer(pre_roll_seconds, max_buffer_bytes, compress)
+        self.post_roll_seconds = post_roll_seconds
+        self.block = block
+        self.writer = EvidenceWriter()
+        self.writer.start()
+        self.recording = False
+        self.stop_time = 0.0
+        self.path = None
+
+    def trigger(self, path, fps, t):
+        """Start a clip at time t. Returns False if one is already recording."""
+        if self.recording:
+            return False
+        self.recording = True
+        self.path = path
+        self.stop_time = t + self.post_roll_seconds
+        self.writer.submit(("open", path, fps), block=True)
+        for _, data in self.buffer.drain():
+            self.writer.submit(("frame", data), block=self.block)
+        print(f"--- Recording started: {path} ---")
+        return True
+
+    def push(self, frame, t):
+        """Add one frame. The frame may be modified by the caller afterwards."""
+        if not self.recording:
+            self.buffer.push(self.buffer.encode(frame), t)
+            return False
+
+        # The writer takes raw frames directly: no JPEG round trip while recording
+        self.writer.submit(("frame", frame.copy()), block=self.block)
+        if t > self.stop_time:
+            self.recording = False
+            self.writer.submit(("close",), block=True)
+        return self.recording
+
+    def close(self, timeout=10.0):
+        if self.recording:
+            self.writer.submit(("close",), block=True)
+            self.recording = False
+        self.writer.submit(("stop",), block=True)
+        self.writer.join(timeout)
@@ -0,0 +1,141 @@
+# app/framedetector.py
+import torch
+from app.backends import load_yolo
+from app.detector import Detector
+from app.smokedetector import SmokeDetector
+from app.letterbox import letterbox
+from app.metrics import REGISTRY
+
+
+class FrameDetector:
+    """
+    Unified detection stage: persons, bottles and smoke from one call.
+
+    Two modes:
+      - merged model: a single YOLO model trained on person + bottle + smoke,
+        one forward pass per frame (pass merged_model and merged_classes).
+      - split models: yolov8n + app/best.pt, both fed from the same
+        letterboxed/normalized tensor so preprocessing happens once.
+    """
+
+    def __init__(self, class_conf=None, smoke_conf=0.5, smoke_class_id=0,
+                 imgsz=640, device='cpu', merged_model=None, merged_classes=None,
+                 detector_weights='yolov8n.pt', smoke_weights='app/best.pt'):
+        self.imgsz = imgsz
+        self.smoke_class_id = smoke_class_id
+        self.class_conf = dict(class_conf or Detector.DEFAULT_CLASS_CONF)
+        self.smoke_conf = smoke_conf
+
+        self.merged = None
+        self.det = None
+        self.smoke_detector = None
+
+        if merged_model:
+            # merged_classes maps model class ids -> "person" / "bottle" / "smoke"
+            self.merged = load_yolo(merged_model, device)
+            self.merged_classes = dict(merged_classes or {0: "person", 39: "bottle", 80: "smoke"})
+        else:
+            self.det = Detector(detector_weights, device=device, class_conf=self.class_conf, imgsz=imgsz)
+            self.smoke_detector = SmokeDetector(smoke_weights, device=device, conf=smoke_conf, imgsz=imgsz)
+
+    def _conf_for(self, label):
+        if label == "smoke":
+            return self.smoke_conf
+        if label == "person":
+            return self.class_conf.get(Detector.PERSON_CLASS, 0.35)
+        return self.class_conf.get(Detector.BOTTLE_CLASS, 0.25)
+
+    def _parse_merged(self, r, prepared):
+        persons, bottles, smoke_boxes = [], [], []
+        if getattr(r, "boxes", None) is None:
+            return persons, bottles, smoke_boxes
+
+        for box in r.boxes:
+            cls = int(box.cls[0])
+            conf = float(box.conf[0])
+            label = self.merged_classes.get(cls)
+            if label is None or conf < self._conf_for(label):
+                continue
+            x1, y1, x2, y2 = prepared.to_frame_coords(box.xyxy[0].tolist())
+            if label == "person":
+                persons.append((int(x1), int(y1), int(x2), int(y2), conf, Detector.PERSON_CLASS))
+            elif label == "bottle":
+                bottles.append([x1, y1, x2, y2])
+            else:
+                smoke_boxes.append([x1, y1, x2, y2])
+        return persons, bottles, smoke_boxes
+
+    def _detect_merged(self, prepared_list, batch_tensor, imgsz):
+        with REGISTRY.model_span("merged"):
+            results = self.merged.predict(
+                source=batch_tensor,
+                classes=list(self.merged_classes),
+                imgsz=imgsz,
+                conf=min(min(self.class_conf.values()), self.smoke_conf),
+                verbose=False
+            )
+        out = []
+        for r, prepared in zip(results, prepared_list):
+            persons, bottles, smoke_boxes = self._parse_merged(r, prepared)
+            out.append(self._result(persons, bottles, len(smoke_boxes) > 0, smoke_boxes))
+        return out
+
+    def _detect_split(self, prepared_list, batch_tensor, imgsz, persons=True, smoke=True):
+        n = len(prepared_list)
+        dets_list, smoke_list = [None] * n, [(None, None)] * n
+        if persons:
+            with REGISTRY.model_span("persons"):
+                dets_list = self.det.detect_batch(prepared_list, batch_tensor, imgsz)
+        if smoke:
+            with REGISTRY.model_span("smoke"):
+                smoke_list = self.smoke_detector.detect_batch(prepared_list, batch_tensor, self.smoke_class_id, imgsz)
+
+        out = []
+        for dets, (smoke_detected, smoke_boxes) in zip(dets_list, smoke_list):
+            person_dets, bottles = None, None
+            if dets is not None:
+                person_dets, bottles = [], []
+                for d in dets:
+                    if d[5] == Detector.BOTTLE_CLASS:
+                        bottles.append(list(d[:4]))
+                    elif d[5] == Detector.PERSON_CLASS:
+                        person_dets.append(d)
+            out.append(self._result(person_dets, bottles, smoke_detected, smoke_boxes))
+        return out
+
+    @staticmethod
+    def _result(persons, bottles, smoke_detected, smoke_boxes):
+        return {
+            "persons": persons,
+            "bottles": bottles,
+            "smoke_detected": smoke_detected,
+            "smoke_boxes": smoke_boxes,
+        }
+
+    def detect_batch(self, frames, persons=True, smoke=True, imgsz=None):
+        """
+        detect() for many frames (e.g. from different cameras) in one forward pass per model.
+        persons / smoke: which models to run (split mode only; the merged model
+        always returns everything). Parts not run are returned as None.
+        imgsz: model input size for this call (multiple of 32); default self.imgsz.
+        """
+        if not frames:
+            return []
+        imgsz = imgsz or self.imgsz
+        prepared_list = [letterbox(frame, imgsz) for frame in frames]
+        batch_tensor = torch.cat([p.tensor for p in prepared_list], dim=0)
+
+        if self.merged is not None:
+            return self._detect_merged(prepared_list, batch_tensor, imgsz)
+        return self._detect_split(prepared_list, batch_tensor, imgsz, persons, smoke)
+
+    def detect(self, frame, persons=True, smoke=True, imgsz=None):
+        """
+        Returns {
+            "persons": [(x1, y1, x2, y2, conf, cls), ...],
+            "bottles": [[x1, y1, x2, y2], ...],
+            "smoke_detected": bool,
+            "smoke_boxes": [[x1, y1, x2, y2], ...],
+        }
+        """
+        return self.detect_batch([frame], persons, smoke, imgsz)[0]
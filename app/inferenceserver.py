@@ -0,0 +1,164 @@
+# app/inferenceserver.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class _Request:
+    __slots__ = ("frame", "key", "future", "enqueued")
+
+    def __init__(self, frame, key):
+        self.frame = frame
+        self.key = key  # (persons, smoke, imgsz): only equal keys share a batch
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class BatchInferenceServer:
+    """
+    In-process batching server in front of one FrameDetector.
+
+    Many CCTVProcessor instances submit single frames; a background thread
+    groups them into dynamic batches and runs ONE forward pass per model per
+    batch. A batch is flushed when it reaches the current batch size or when
+    its oldest frame has waited max_wait_ms.
+
+    Requests carry the models they need and their input size (persons,
+    smoke, imgsz); a batch only holds requests with the same key, so the
+    per-model cadence, per-camera imgsz and tile passes still apply.
+
+    latency_slo_ms: target p95 submit->result latency. When it is exceeded
+    the batch size is halved; while comfortably below it grows back toward
+    max_batch_size.
+    """
+
+    def __init__(self, frame_detector, max_batch_size=8, max_wait_ms=15.0,
+                 latency_slo_ms=250.0, window=200):
+        self.frame_detector = frame_detector
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.latency_slo = latency_slo_ms / 1000.0
+
+        self.batch_size = max_batch_size
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._latencies = deque(maxlen=window)
+        self._running = False
+        self._thread = None
+
+        # --- Stats ---
+        self.batches = 0
+        self.frames = 0
+
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, name="batch-inference", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        # Fail anything still waiting so no stream blocks forever
+        while self._queue:
+            self._queue.popleft().future.set_exception(RuntimeError("inference server stopped"))
+
+    def submit(self, frame, persons=True, smoke=True, imgsz=None):
+        """Queue one frame; returns a Future resolving to FrameDetector.detect() output."""
+        request = _Request(frame, (persons, smoke, imgsz))
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("inference server is not running")
+            self._queue.append(request)
+            self._cond.notify_all()
+        return request.future
+
+    def detect(self, frame, persons=True, smoke=True, imgsz=None):
+        return self.submit(frame, persons, smoke, imgsz).result()
+
+    def detect_batch(self, frames, persons=True, smoke=True, imgsz=None):
+        """Submits every frame (e.g. the tiles of one frame) so they share batches."""
+        futures = [self.submit(frame, persons, smoke, imgsz) for frame in frames]
+        return [f.result() for f in futures]
+
+    def _compatible(self, key):
+        return sum(1 for req in self._queue if req.key == key)
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running and not self._queue:
+                self._cond.wait(0.1)
+            if not self._running:
+                return []
+
+            # Batch the oldest request with the ones that need the same models / imgsz.
+            # Wait until the batch is full or the oldest frame hits its deadline.
+            key = self._queue[0].key
+            deadline = self._queue[0].enqueued + self.max_wait
+            while self._running and self._compatible(key) < self.batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch, rest = [], deque()
+            for req in self._queue:
+                if req.key == key and len(batch) < self.batch_size:
+                    batch.append(req)
+                else:
+                    rest.append(req)
+            self._queue = rest
+            return batch
+
+    def _adapt_batch_size(self):
+        if len(self._latencies) < 20:
+            return
+        ordered = sorted(self._latencies)
+        p95 = ordered[int(0.95 * (len(ordered) - 1))]
+        if p95 > self.latency_slo and self.batch_size > 1:
+            self.batch_size = max(1, self.batch_size // 2)
+            self._latencies.clear()
+        elif p95 < 0.5 * self.latency_slo and self.batch_size < self.max_batch_size:
+            self.batch_size += 1
+
+    def _loop(self):
+        while self._running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            persons, smoke, imgsz = batch[0].key
+            try:
+                results = self.frame_detector.detect_batch(
+                    [req.frame for req in batch], persons=persons, smoke=smoke, imgsz=imgsz
+                )
+            except Exception as e:
+                for req in batch:
+                    req.future.set_exception(e)
+                continue
+
+            now = time.perf_counter()
+            for req, result in zip(batch, results):
+                self._latencies.append(now - req.enqueued)
+                req.future.set_result(result)
+
+            self.batches += 1
+            self.frames += len(batch)
+            self._adapt_batch_size()
+
+    def snapshot(self):
+        ordered = sorted(self._latencies)
+        p95 = ordered[int(0.95 * (len(ordered) - 1))] if ordered else 0.0
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch": round(self.frames / self.batches, 2) if self.batches else 0.0,
+            "batch_size": self.batch_size,
+            "queue_depth": len(self._queue),
+            "p95_latency_ms": round(1000 * p95, 2),
+        }
@@ -0,0 +1,60 @@
+# app/letterbox.py
+import cv2
+import numpy as np
+import torch
+
+
+class LetterboxedFrame:
+    """
+    One preprocessed model input shared by every YOLO model for a frame.
+    Holds the normalized RGB tensor plus the scale/padding needed to map
+    boxes back into original frame coordinates.
+    """
+
+    def __init__(self, tensor, ratio, pad, shape=None):
+        self.tensor = tensor  # (1, 3, imgsz, imgsz) float32, RGB, 0..1
+        self.ratio = ratio
+        self.pad = pad        # (left, top) in pixels
+        self.shape = shape    # (height, width) of the original frame
+
+    def to_frame_coords(self, xyxy):
+        """Maps a box on the model input back to frame pixels, clipped to the frame."""
+        pad_x, pad_y = self.pad
+        x1, y1, x2, y2 = xyxy
+        box = [
+            (x1 - pad_x) / self.ratio,
+            (y1 - pad_y) / self.ratio,
+            (x2 - pad_x) / self.ratio,
+            (y2 - pad_y) / self.ratio,
+        ]
+        if self.shape is not None:
+            # Boxes reaching into the padding would otherwise leave the frame
+            h, w = self.shape
+            box = [min(max(v, 0.0), limit) for v, limit in zip(box, (w, h, w, h))]
+        return box
+
+
+def letterbox(frame, imgsz=640, pad_value=114):
+    """Resize with unchanged aspect ratio and pad to a square imgsz x imgsz input."""
+    h, w = frame.shape[:2]
+    ratio = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * ratio)), int(round(h * ratio))
+
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+
+    left = (imgsz - new_w) // 2
+    top = (imgsz - new_h) // 2
+    padded = cv2.copyMakeBorder(
+        resized,
+        top, imgsz - new_h - top,
+        left, imgsz - new_w - left,
+        cv2.BORDER_CONSTANT,
+        value=(pad_value, pad_value, pad_value),
+    )
+
+    # Ultralytics passes tensor sources straight to the model: RGB, BCHW, 0..1
+    rgb = cv2.cvtColor(padded, cv2.COLOR_BGR2RGB)
+    tensor = torch.from_numpy(np.ascontiguousarray(rgb.transpose(2, 0, 1)))
+    tensor = tensor.float().div_(255.0).unsqueeze(0)
+
+    return LetterboxedFrame(tensor, ratio, (left, top), (h, w))
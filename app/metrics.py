@@ -0,0 +1,286 @@
+# app/metrics.py
+"""
+Hot-path metrics: per-camera stage spans (decode, detect, track, pose,
+rules, draw, encode, display), model inference times, queue depths,
+dropped frames and FPS.
+
+Disabled by default; span() then returns a shared no-op object, so the
+instrumented code pays one attribute check per span. Enable with:
+
+    from app import metrics
+    metrics.configure({"port": 9108, "json_path": "metrics.json", "interval": 10})
+
+    curl localhost:9108/metrics        Prometheus text format
+    curl localhost:9108/metrics.json   same data as JSON
+
+Or set CCTVProcessor.METRICS to the same dict (run_logic configures it),
+or start the GUI with `python main.py --metrics-port 9108`.
+Supervisor workers use port + worker id and "{worker}" in json_path.
+
+The "smoking" / "drinking" counters count events (a track becoming
+confirmed), not the frames an event stays active for.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class Timer:
+    """Count / sum of observed durations plus a window for quantiles."""
+
+    def __init__(self, window=256):
+        self.count = 0
+        self.total = 0.0
+        self._window = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self._window.append(seconds)
+
+    def snapshot(self):
+        with self._lock:
+            values = sorted(self._window)
+            count, total = self.count, self.total
+
+        def q(p):
+            return round(1000 * values[min(len(values) - 1, int(p * len(values)))], 3) if values else 0.0
+
+        return {"count": count, "sum_s": round(total, 6), "p50_ms": q(0.50), "p95_ms": q(0.95), "p99_ms": q(0.99)}
+
+
+class _Span:
+    __slots__ = ("timer", "start")
+
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class CameraMetrics:
+    """Metrics of one camera / processor. Pipeline stats are read at scrape time."""
+
+    def __init__(self, registry, camera):
+        self.registry = registry
+        self.camera = camera
+        self.timers = {}   # {stage: Timer}
+        self.counters = {}  # {name: int}
+        self.pipeline = None
+        self._lock = threading.Lock()
+
+    def _timer(self, stage):
+        timer = self.timers.get(stage)
+        if timer is None:
+            with self._lock:
+                timer = self.timers.setdefault(stage, Timer())
+        return timer
+
+    def span(self, stage):
+        if not self.registry.enabled:
+            return _NULL_SPAN
+        return _Span(self._timer(stage))
+
+    def observe(self, stage, seconds):
+        if self.registry.enabled:
+            self._timer(stage).observe(seconds)
+
+    def inc(self, name, n=1):
+        if not self.registry.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def attach_pipeline(self, pipeline):
+        self.pipeline = pipeline
+
+    def snapshot(self):
+        out = {
+            "stages": {name: timer.snapshot() for name, timer in list(self.timers.items())},
+            "counters": dict(self.counters),
+        }
+        pipeline = self.pipeline
+        if pipeline is not None and pipeline.stats:
+            stats = pipeline.snapshot()
+            out["pipeline"] = stats
+            out["queue_depths"] = dict(zip([s["stage"] for s in stats], pipeline.queue_depths()))
+            out["dropped_frames"] = sum(s["dropped"] for s in stats)
+            out["fps"] = stats[-1]["fps"]  # frames leaving the last stage
+        return out
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.enabled = False
+        self.cameras = {}  # {camera: CameraMetrics}
+        self.models = CameraMetrics(self, None)  # model inference times, shared by all cameras
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    def camera(self, camera_id):
+        key = str(camera_id if camera_id is not None else "default")
+        with self._lock:
+            cam = self.cameras.get(key)
+            if cam is None:
+                cam = self.cameras[key] = CameraMetrics(self, key)
+            return cam
+
+    def model_span(self, model):
+        return self.models.span(model)
+
+    def snapshot(self):
+        return {
+            "time": time.time(),
+            "uptime_s": round(time.time() - self.started, 1),
+            "pid": os.getpid(),
+            "models": self.models.snapshot()["stages"],
+            "cameras": {key: cam.snapshot() for key, cam in list(self.cameras.items())},
+        }
+
+    def prometheus(self):
+        snap = self.snapshot()
+        # Text format: samples of one metric family must be contiguous
+        families = {
+            "cctv_model_inference_seconds": ("summary", []),
+            "cctv_stage_seconds": ("summary", []),
+            "cctv_events_total": ("counter", []),
+            "cctv_queue_depth": ("gauge", []),
+            "cctv_dropped_frames_total": ("counter", []),
+            "cctv_fps": ("gauge", []),
+        }
+
+        def summary(metric, labels, s):
+            samples = families[metric][1]
+            for q, key in (("0.5", "p50_ms"), ("0.95", "p95_ms"), ("0.99", "p99_ms")):
+                samples.append(f'{metric}{{{labels},quantile="{q}"}} {s[key] / 1000.0}')
+            samples.append(f"{metric}_sum{{{labels}}} {s['sum_s']}")
+            samples.append(f"{metric}_count{{{labels}}} {s['count']}")
+
+        for model, s in snap["models"].items():
+            summary("cctv_model_inference_seconds", f'model="{model}"', s)
+
+        for cam, c in snap["cameras"].items():
+            for stage, s in c["stages"].items():
+                summary("cctv_stage_seconds", f'camera="{cam}",stage="{stage}"', s)
+            for name, value in c["counters"].items():
+                families["cctv_events_total"][1].append(f'cctv_events_total{{camera="{cam}",event="{name}"}} {value}')
+            for queue, depth in c.get("queue_depths", {}).items():
+                families["cctv_queue_depth"][1].append(f'cctv_queue_depth{{camera="{cam}",queue="{queue}"}} {depth}')
+            if "pipeline" in c:
+                families["cctv_dropped_frames_total"][1].append(
+                    f'cctv_dropped_frames_total{{camera="{cam}"}} {c["dropped_frames"]}')
+                families["cctv_fps"][1].append(f'cctv_fps{{camera="{cam}"}} {c["fps"]}')
+
+        lines = []
+        for metric, (kind, samples) in families.items():
+            if samples:
+                lines.append(f"# TYPE {metric} {kind}")
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+# ----------------------------------------------------------
+# EXPOSITION
+# ----------------------------------------------------------
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = json.dumps(self.registry.snapshot()).encode(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = self.registry.prometheus().encode(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # keep scrapes out of the console
+
+
+def serve(port, host="127.0.0.1", registry=REGISTRY):
+    """Starts the /metrics endpoint on a daemon thread. Returns the server."""
+    handler = type("Handler", (_Handler,), {"registry": registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+class JsonDumper(threading.Thread):
+    """Writes registry.snapshot() to path every interval seconds (atomic replace)."""
+
+    def __init__(self, path, interval=10.0, registry=REGISTRY):
+        super().__init__(name="metrics-json", daemon=True)
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop_event = threading.Event()
+
+    def dump(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.registry.snapshot(), f, indent=2)
+        os.replace(tmp, self.path)
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.dump()
+            except OSError as e:
+                print(f"[metrics] could not write {self.path}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.dump()
+
+
+def configure(config, worker_id=None):
+    """
+    config: {"port": int, "host": str, "json_path": str, "interval": float}
+    Enables the registry and starts the endpoint and/or JSON dump.
+    """
+    REGISTRY.enabled = True
+    started = {}
+    if config.get("port") is not None:
+        port = int(config["port"]) + (worker_id or 0)
+        try:
+            started["server"] = serve(port, config.get("host", "127.0.0.1"))
+        except OSError as e:
+            print(f"[metrics] could not listen on port {port}: {e}")
+    if config.get("json_path"):
+        path = config["json_path"].format(worker=worker_id if worker_id is not None else 0)
+        started["dumper"] = JsonDumper(path, float(config.get("interval", 10.0)))
+        started["dumper"].start()
+    return started
@@ -0,0 +1,156 @@
+# app/modelregistry.py
+"""
+Process-wide cache of loaded models.
+
+CCTVProcessor() takes its default FrameDetector / PoseDetector from here, so
+a second session in the same process (another click in main.py) reuses warm
+models instead of reloading torch, the YOLO weights and Holistic.
+
+    from app.modelregistry import prewarm
+    prewarm()  # background thread: load + one dummy inference
+
+Importing this module is cheap; torch / ultralytics / mediapipe are only
+imported by the factories, on first use.
+
+Measure cold vs warm start:
+    python -m app.modelregistry
+"""
+import threading
+import time
+
+import numpy as np
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._models = {}  # {key: model}
+        self._locks = {}   # {key: Lock}, one loader per key
+        self._lock = threading.Lock()
+        self.timings = {}  # {key: {"load_s", "warmup_s"}}
+
+    def _key_lock(self, key):
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def get(self, key, factory, warmup=None):
+        """
+        Returns the model cached under key, building it with factory() once.
+        warmup(model) runs one dummy inference right after loading. Concurrent
+        callers for the same key wait for the first one instead of loading twice.
+        """
+        model = self._models.get(key)
+        if model is not None:
+            return model
+        with self._key_lock(key):
+            model = self._models.get(key)
+            if model is None:
+                start = time.perf_counter()
+                model = factory()
+                loaded = time.perf_counter()
+                if warmup is not None:
+                    warmup(model)
+                self.timings[key] = {
+                    "load_s": round(loaded - start, 3),
+                    "warmup_s": round(time.perf_counter() - loaded, 3),
+                }
+                self._models[key] = model
+        return model
+
+    def loaded(self, key):
+        return key in self._models
+
+    def clear(self):
+        with self._lock:
+            models, self._models = self._models, {}
+        for model in models.values():
+            if hasattr(model, "close"):
+                model.close()
+
+
+MODELS = ModelRegistry()
+
+_DUMMY_FRAME = np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def _frame_detector_key(config):
+    return (
+        "frame_detector",
+        config.DETECTOR_WEIGHTS,
+        config.SMOKE_WEIGHTS,
+        tuple(sorted(config.CLASS_CONF.items())),
+        config.SMOKE_CONF,
+        config.SMOKE_CLASS_ID,
+    )
+
+
+def frame_detector(config):
+    """
+    Shared FrameDetector for the weights / thresholds of config: a
+    CCTVProcessor class or instance (per-camera settings included).
+    """
+    return MODELS.get(
+        _frame_detector_key(config),
+        lambda: config.build_frame_detector(config),
+        warmup=lambda det: det.detect(_DUMMY_FRAME)  # first call initializes the backend
+    )
+
+
+def pose_detector(mode="holistic"):
+    """
+    Shared PoseDetector for a pose mode. Holistic / Pose are stateful, so only
+    one session may use it at a time; concurrent streams build their own
+    (see app/supervisor.py).
+    """
+    def build():
+        from app.posedetector import PoseDetector
+        return PoseDetector(mode=mode)
+
+    return MODELS.get(("pose_detector", mode), build, warmup=lambda pose: pose.analyze(_DUMMY_FRAME))
+
+
+def prewarm(config=None, background=True):
+    """Loads and warms the default models, on a daemon thread unless background=False."""
+    def run():
+        try:
+            cfg = config
+            if cfg is None:
+                from app.cctvprocessor import CCTVProcessor
+                cfg = CCTVProcessor
+            frame_detector(cfg)
+            pose_detector(cfg.POSE_MODE)
+        except Exception as e:
+            # The session that needs the models will load them (and report errors) itself
+            print(f"[models] pre-warm failed: {e!r}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="model-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def measure_cold_start(frames=1):
+    """Import, load and first-frame times of a first session vs a second one."""
+    report = {}
+    start = time.perf_counter()
+    from app.cctvprocessor import CCTVProcessor
+    report["import_s"] = round(time.perf_counter() - start, 3)
+
+    for session in ("first_session", "second_session"):
+        start = time.perf_counter()
+        processor = CCTVProcessor()
+        built = time.perf_counter()
+        for i in range(frames):
+            processor._analyze(_DUMMY_FRAME.copy(), i / 30.0)
+        report[session] = {
+            "construct_s": round(built - start, 3),
+            "first_frame_s": round(time.perf_counter() - start, 3),
+        }
+    report["models"] = {str(k[0] if isinstance(k, tuple) else k): v for k, v in MODELS.timings.items()}
+    return report
+
+
+if __name__ == "__main__":
+    import json
+    print(json.dumps(measure_cold_start(), indent=2))
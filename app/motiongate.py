@@ -0,0 +1,98 @@
+# app/motiongate.py
+import cv2
+
+
+class MotionGate:
+    """
+    Cheap scene-change gate in front of the detectors and the pose stage.
+
+    Works on a small blurred grayscale copy of the frame, using either plain
+    frame differencing ("diff") or MOG2 background subtraction ("mog2").
+    should_infer() returns True when inference must run:
+      - motion covers at least min_motion_ratio of the frame, or
+      - there are active tracks, or
+      - motion was seen within the last hold_seconds, or
+      - idle_interval frames have passed since the last inference
+        (reduced cadence on static, empty scenes).
+    Otherwise the caller reuses its last results.
+    """
+
+    def __init__(self, method="diff", downscale_width=320, pixel_threshold=25,
+                 min_motion_ratio=0.002, idle_interval=15, hold_seconds=2.0):
+        self.method = method
+        self.downscale_width = downscale_width
+        self.pixel_threshold = pixel_threshold
+        self.min_motion_ratio = min_motion_ratio
+        self.idle_interval = idle_interval
+        self.hold_seconds = hold_seconds
+
+        self._prev = None
+        self._bg = None
+        if method == "mog2":
+            self._bg = cv2.createBackgroundSubtractorMOG2(history=300, varThreshold=16, detectShadows=False)
+
+        self._last_motion_t = None
+        self._since_inference = 0
+
+        # --- Stats ---
+        self.frames = 0
+        self.inferred = 0
+        self.last_motion_ratio = 0.0
+        self.last_mask = None  # downscaled motion mask of the last frame (for tile skipping)
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.downscale_width / float(w)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (self.downscale_width, int(h * scale)), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def motion_ratio(self, frame):
+        gray = self._small_gray(frame)
+        if self._bg is not None:
+            mask = self._bg.apply(gray)
+        else:
+            if self._prev is None or self._prev.shape != gray.shape:
+                self._prev = gray
+                self.last_mask = None
+                return 1.0  # first frame: treat as motion
+            diff = cv2.absdiff(gray, self._prev)
+            self._prev = gray
+            _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        self.last_mask = mask
+        return cv2.countNonZero(mask) / float(mask.size)
+
+    def should_infer(self, frame, t, active_tracks=0):
+        self.frames += 1
+        self.last_motion_ratio = self.motion_ratio(frame)
+
+        if self.last_motion_ratio >= self.min_motion_ratio:
+            self._last_motion_t = t
+
+        recent_motion = self._last_motion_t is not None and (t - self._last_motion_t) <= self.hold_seconds
+        run = (
+            recent_motion
+            or active_tracks > 0
+            or self._since_inference + 1 >= self.idle_interval
+        )
+
+        if run:
+            self.inferred += 1
+            self._since_inference = 0
+        else:
+            self._since_inference += 1
+        return run
+
+    @property
+    def skip_ratio(self):
+        return 1.0 - self.inferred / self.frames if self.frames else 0.0
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped": self.frames - self.inferred,
+            "skip_ratio": round(self.skip_ratio, 3),
+            "last_motion_ratio": round(self.last_motion_ratio, 4),
+        }
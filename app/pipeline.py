@@ -0,0 +1,227 @@
+# app/pipeline.py
+import threading
+import time
+from collections import deque
+
+
+class StageStats:
+    """Per-stage counters: processed items, FPS and latency."""
+
+    def __init__(self, name, window=120):
+        self.name = name
+        self.count = 0
+        self.dropped = 0
+        self.total_latency = 0.0
+        self._latencies = deque(maxlen=window)
+        self._stamps = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        now = time.time()
+        with self._lock:
+            self.count += 1
+            self.total_latency += latency
+            self._latencies.append(latency)
+            self._stamps.append(now)
+
+    def record_drop(self, n=1):
+        with self._lock:
+            self.dropped += n
+
+    def snapshot(self):
+        with self._lock:
+            fps = 0.0
+            if len(self._stamps) > 1:
+                span = self._stamps[-1] - self._stamps[0]
+                fps = (len(self._stamps) - 1) / span if span > 0 else 0.0
+            avg_ms = 1000 * sum(self._latencies) / len(self._latencies) if self._latencies else 0.0
+            return {
+                "stage": self.name,
+                "count": self.count,
+                "dropped": self.dropped,
+                "fps": round(fps, 2),
+                "avg_latency_ms": round(avg_ms, 2),
+            }
+
+
+class FrameQueue:
+    """
+    Bounded queue between stages.
+    drop_oldest=True -> "latest frame wins": a full queue discards its oldest
+    item instead of blocking the producer (for live sources).
+    """
+
+    def __init__(self, maxsize=4, drop_oldest=False, stats=None):
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest
+        self.stats = stats
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            while len(self._items) >= self.maxsize and not self._closed:
+                if self.drop_oldest:
+                    self._items.popleft()
+                    if self.stats is not None:
+                        self.stats.record_drop()
+                    break
+                self._cond.wait(0.1)
+            if self._closed:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Returns the next item, or None once closed and drained."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while not self._items:
+                if self._closed:
+                    return None
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(0.1 if remaining is None else min(0.1, remaining))
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class Stage(threading.Thread):
+    """Worker thread: in_queue -> fn(item) -> out_queue. fn returning None drops the item."""
+
+    def __init__(self, name, fn, in_queue, out_queue, stats):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stats = stats
+        self.error = None
+
+    def run(self):
+        try:
+            while True:
+                item = self.in_queue.get()
+                if item is None:
+                    break
+                start = time.perf_counter()
+                out = self.fn(item)
+                self.stats.record(time.perf_counter() - start)
+                if out is not None and not self.out_queue.put(out):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            self.out_queue.close()
+
+
+class SourceStage(threading.Thread):
+    """Producer thread: calls read_fn() until it returns None or stop() is called."""
+
+    def __init__(self, name, read_fn, out_queue, stats):
+        super().__init__(name=name, daemon=True)
+        self.read_fn = read_fn
+        self.out_queue = out_queue
+        self.stats = stats
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            while not self._stop_event.is_set():
+                start = time.perf_counter()
+                item = self.read_fn()
+                if item is None:
+                    break
+                self.stats.record(time.perf_counter() - start)
+                if not self.out_queue.put(item):
+                    break
+        except Exception as e:
+            self.error = e
+        finally:
+            self.out_queue.close()
+
+
+class Pipeline:
+    """
+    capture -> stage 1 -> ... -> stage N -> output queue (consumed by the caller).
+
+    Each stage runs on its own thread, so a stage only ever processes items in
+    order (the state machine and tracker rely on that). live=True makes the
+    capture queue drop old frames instead of letting latency grow.
+    """
+
+    def __init__(self, live=False, queue_size=4):
+        self.live = live
+        self.queue_size = queue_size
+        self.source = None
+        self.stages = []
+        self.queues = []
+        self.stats = []
+        self.output = None
+        self._pending = []  # (name, fn) until start()
+        self._read_fn = None
+        self._source_name = None
+
+    def set_source(self, name, read_fn):
+        self._source_name = name
+        self._read_fn = read_fn
+
+    def add_stage(self, name, fn):
+        self._pending.append((name, fn))
+
+    def start(self):
+        source_stats = StageStats(self._source_name)
+        self.stats.append(source_stats)
+        # Only the capture queue drops: later stages are never slower than inference
+        q = FrameQueue(self.queue_size, drop_oldest=self.live, stats=source_stats)
+        self.queues.append(q)
+        self.source = SourceStage(self._source_name, self._read_fn, q, source_stats)
+
+        for name, fn in self._pending:
+            stats = StageStats(name)
+            out_q = FrameQueue(self.queue_size, stats=stats)
+            self.stats.append(stats)
+            self.stages.append(Stage(name, fn, q, out_q, stats))
+            self.queues.append(out_q)
+            q = out_q
+
+        self.output = q
+        self.source.start()
+        for stage in self.stages:
+            stage.start()
+        return self.output
+
+    def stop(self):
+        if self.source is not None:
+            self.source.stop()
+        for q in self.queues:
+            q.close()
+
+    def join(self, timeout=2.0):
+        for t in [self.source] + self.stages:
+            if t is not None:
+                t.join(timeout)
+
+    def errors(self):
+        return [t.error for t in [self.source] + self.stages if t is not None and t.error is not None]
+
+    def queue_depths(self):
+        return [len(q) for q in self.queues]
+
+    def snapshot(self):
+        return [s.snapshot() for s in self.stats]
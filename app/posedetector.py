@@ -1,122 +1,317 @@
 # app/posedetector.py
-import mediapipe as mp
 import cv2
 import numpy as np
 
+# "holistic": pose + 468-point face mesh + both 21-point hands per pass.
+# "lite": MediaPipe Pose with the lite model (33 body points, no face mesh or
+#         hand models); nose, outer eye corners and index fingertips come from
+#         the body landmarks. Compare with `python -m app.benchmark --clip ...`.
+POSE_MODES = ("holistic", "lite")
+
+
+class PoseResult:
+    """
+    Landmarks from ONE Holistic pass, converted to frame pixel coordinates.
+    Computed once per frame and queried by both the smoking and drinking logic.
+    """
+
+    def __init__(self, results, width, height, offset=(0, 0), finger_tip=8,
+                 nose_idx=1, left_eye_idx=33, right_eye_idx=263):
+        self.results = results
+        self.width = width
+        self.height = height
+        self.offset = offset
+
+        self.nose = None
+        self.left_eye = None
+        self.right_eye = None
+        self.hands = []  # index fingertips, right hand first
+
+        if results.face_landmarks:
+            lms = results.face_landmarks.landmark
+            self.nose = self._px(lms[nose_idx])
+            self.left_eye = self._px(lms[left_eye_idx])
+            self.right_eye = self._px(lms[right_eye_idx])
+
+        for hand_landmarks in (results.right_hand_landmarks, results.left_hand_landmarks):
+            if hand_landmarks:
+                self.hands.append(self._px(hand_landmarks.landmark[finger_tip]))
+
+    def _px(self, landmark):
+        ox, oy = self.offset
+        return int(landmark.x * self.width) + ox, int(landmark.y * self.height) + oy
+
+    @property
+    def face_width(self):
+        if self.left_eye is None or self.right_eye is None:
+            return 0.0
+        return float(np.hypot(self.left_eye[0] - self.right_eye[0],
+                              self.left_eye[1] - self.right_eye[1]))
+
+    def hand_to_mouth(self, threshold=0.5):
+        """Fingertip within threshold * face width of the nose."""
+        if self.nose is None or not self.hands:
+            return False
+
+        face_width_px = self.face_width
+        if face_width_px < 10:
+            return False
+
+        for hand_x, hand_y in self.hands:
+            distance = np.hypot(self.nose[0] - hand_x, self.nose[1] - hand_y)
+            if distance / face_width_px < threshold:
+                return True
+        return False
+
+    def inside(self, bbox):
+        """True if the detected face belongs to the person box."""
+        if self.nose is None:
+            return False
+        x1, y1, x2, y2 = bbox
+        return x1 <= self.nose[0] <= x2 and y1 <= self.nose[1] <= y2
+
+    def keypoints(self):
+        """The only landmarks the smoking / drinking logic reads."""
+        return [p for p in (self.nose, self.left_eye, self.right_eye) if p is not None] + self.hands
+
+    def person_points(self):
+        if self.nose is None:
+            return None
+        return {
+            "hand": self.hands[0] if self.hands else None,
+            "mouth": self.nose,
+            "face_width": self.face_width,
+            "hand_to_mouth": self.hand_to_mouth(),
+            "pose": self,  # for PoseDetector.draw()
+        }
+
+
+class LitePoseResult(PoseResult):
+    """
+    The same keypoints taken from MediaPipe Pose body landmarks. Pose always
+    returns all 33 points, so occluded ones (low visibility) are dropped.
+    """
+
+    def __init__(self, results, width, height, offset=(0, 0), finger_tips=(20, 19),
+                 nose_idx=0, left_eye_idx=3, right_eye_idx=6, min_visibility=0.5):
+        self.results = results
+        self.width = width
+        self.height = height
+        self.offset = offset
+
+        self.nose = None
+        self.left_eye = None
+        self.right_eye = None
+        self.hands = []  # index fingertips, right hand first
+
+        if results.pose_landmarks:
+            lms = results.pose_landmarks.landmark
+            if lms[nose_idx].visibility >= min_visibility:
+                self.nose = self._px(lms[nose_idx])
+                self.left_eye = self._px(lms[left_eye_idx])
+                self.right_eye = self._px(lms[right_eye_idx])
+            for idx in finger_tips:
+                if lms[idx].visibility >= min_visibility:
+                    self.hands.append(self._px(lms[idx]))
+
+
 class PoseDetector:
-    def __init__(self, mp_holistic=mp.solutions.holistic, mp_drawing=mp.solutions.drawing_utils):
-        # Initialize MediaPipe Holistic model (combines pose, face, and hands)
-        self.holistic = mp_holistic.Holistic(
-            min_detection_confidence=0.5,
-            min_tracking_confidence=0.5
-        )
+    def __init__(self, mode="holistic", mp_holistic=None, mp_pose=None,
+                 mp_drawing=None, max_track_estimators=8, draw_landmarks=True):
+        """
+        mode: "holistic" or "lite" (see POSE_MODES).
+        mp_holistic / mp_pose / mp_drawing: MediaPipe solution modules; default
+        mp.solutions.holistic / .pose / .drawing_utils (mediapipe is imported here).
+        draw_landmarks: default of is_smoking_pose(draw=...). Holistic draws every
+        landmark set, lite only the keypoints that are used.
+        """
+        if mode not in POSE_MODES:
+            raise ValueError(f"unknown pose mode {mode!r}, expected one of {POSE_MODES}")
+        if mp_holistic is None or mp_pose is None or mp_drawing is None:
+            import mediapipe as mp
+            mp_holistic = mp_holistic or mp.solutions.holistic
+            mp_pose = mp_pose or mp.solutions.pose
+            mp_drawing = mp_drawing or mp.solutions.drawing_utils
+        self.mode = mode
+        self.mp_holistic = mp_holistic
+        self.mp_pose = mp_pose
+        # Full-frame estimator (Holistic: pose, face and hands; lite: Pose only).
+        # This instance only ever sees full frames, so its tracking mode stays valid.
+        self.estimator = self._new_estimator()
         self.mp_drawing = mp_drawing
-        
+        self.draw_landmarks = draw_landmarks
+
+        # --- PER-TRACK ESTIMATORS ---
+        # Each tracked person gets its own Holistic instance for crops, so every
+        # track keeps its own temporal tracking state. The pool is capped; once
+        # it is full, new tracks share the static estimator instead of evicting
+        # (evicting would rebuild MediaPipe graphs every frame with > cap tracks).
+        self.max_track_estimators = max_track_estimators
+        self.track_estimators = {}  # {oid: Holistic / Pose}
+        self._static_estimator = None  # crops without a track id / pool overflow
+        self.pool_overflow = 0  # crops served by the static estimator because the pool was full
+
         # --- LANDMARKS ---
-        self.INDEX_FINGER_TIP = 8 
+        self.INDEX_FINGER_TIP = 8
         self.NOSE_LANDMARK_IDX = 1
         self.LEFT_EYE_INNER = 33
         self.RIGHT_EYE_INNER = 263
+        # Pose (lite) body landmarks
+        self.LITE_NOSE = 0
+        self.LITE_LEFT_EYE_OUTER = 3
+        self.LITE_RIGHT_EYE_OUTER = 6
+        self.LITE_INDEX_TIPS = (20, 19)  # right, left
         # --- END LANDMARKS ---
 
+    def _new_estimator(self, static_image_mode=False):
+        if self.mode == "lite":
+            return self.mp_pose.Pose(
+                static_image_mode=static_image_mode,
+                model_complexity=0,  # lite model
+                enable_segmentation=False,
+                min_detection_confidence=0.5,
+                min_tracking_confidence=0.5
+            )
+        return self.mp_holistic.Holistic(
+            static_image_mode=static_image_mode,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5
+        )
+
     def _get_pixel_coords(self, landmark, width, height):
         return int(landmark.x * width), int(landmark.y * height)
 
-    def is_smoking_pose(self, frame):
-        image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        results = self.holistic.process(image_rgb)
-        
-        frame_height, frame_width, _ = frame.shape
-        hand_to_mouth_event = False
-        
-        if results.face_landmarks and (results.left_hand_landmarks or results.right_hand_landmarks):
-            
-            # 1. Face width for normalization
-            l_eye_lm = results.face_landmarks.landmark[self.LEFT_EYE_INNER]
-            r_eye_lm = results.face_landmarks.landmark[self.RIGHT_EYE_INNER]
-            
-            l_eye_px, l_eye_py = self._get_pixel_coords(l_eye_lm, frame_width, frame_height)
-            r_eye_px, r_eye_py = self._get_pixel_coords(r_eye_lm, frame_width, frame_height)
-
-            face_width_px = np.sqrt((l_eye_px - r_eye_px)**2 + (l_eye_py - r_eye_py)**2)
-            if face_width_px < 10:
-                return False
-
-            nose_lm = results.face_landmarks.landmark[self.NOSE_LANDMARK_IDX]
-            nose_x, nose_y = self._get_pixel_coords(nose_lm, frame_width, frame_height)
-
-            hands = []
-            if results.right_hand_landmarks:
-                hands.append(results.right_hand_landmarks)
-            if results.left_hand_landmarks:
-                hands.append(results.left_hand_landmarks)
-                
-            for hand_landmarks in hands:
-                tip_lm = hand_landmarks.landmark[self.INDEX_FINGER_TIP]
-                hand_x, hand_y = self._get_pixel_coords(tip_lm, frame_width, frame_height)
-                
-                hand_to_nose_distance_px = np.sqrt((nose_x - hand_x)**2 + (nose_y - hand_y)**2)
-                normalized_distance = hand_to_nose_distance_px / face_width_px
-                
-                if normalized_distance < 0.5:
-                    hand_to_mouth_event = True
-                    break
-
-        # Draw landmarks
+    def _make_result(self, results, width, height, offset=(0, 0)):
+        if self.mode == "lite":
+            return LitePoseResult(
+                results, width, height, offset,
+                finger_tips=self.LITE_INDEX_TIPS,
+                nose_idx=self.LITE_NOSE,
+                left_eye_idx=self.LITE_LEFT_EYE_OUTER,
+                right_eye_idx=self.LITE_RIGHT_EYE_OUTER
+            )
+        return PoseResult(
+            results, width, height, offset,
+            finger_tip=self.INDEX_FINGER_TIP,
+            nose_idx=self.NOSE_LANDMARK_IDX,
+            left_eye_idx=self.LEFT_EYE_INNER,
+            right_eye_idx=self.RIGHT_EYE_INNER
+        )
+
+    def analyze(self, frame, frame_rgb=None, offset=(0, 0)):
+        """
+        Single full-frame pass -> PoseResult.
+        offset: position of frame inside the full frame when a zone crop is passed.
+        """
+        if frame_rgb is None:
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        results = self.estimator.process(frame_rgb)
+        frame_height, frame_width = frame.shape[:2]
+        return self._make_result(results, frame_width, frame_height, offset)
+
+    def draw(self, frame, pose):
+        """Draws pose (a PoseResult of frame, or of a crop / zone of it) onto frame."""
+        if self.mode == "lite":
+            for point in pose.keypoints():
+                cv2.circle(frame, point, 3, (0, 255, 0), -1)
+            return
+        results = pose.results
         if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(frame, results.pose_landmarks, mp.solutions.holistic.POSE_CONNECTIONS)
-            self.mp_drawing.draw_landmarks(frame, results.left_hand_landmarks, mp.solutions.holistic.HAND_CONNECTIONS)
-            self.mp_drawing.draw_landmarks(frame, results.right_hand_landmarks, mp.solutions.holistic.HAND_CONNECTIONS)
-            self.mp_drawing.draw_landmarks(frame, results.face_landmarks, mp.solutions.holistic.FACEMESH_CONTOURS)
+            # Landmarks are normalized to the image the estimator saw: draw into that region
+            ox, oy = pose.offset
+            region = frame[oy:oy + pose.height, ox:ox + pose.width]
+            self.mp_drawing.draw_landmarks(region, results.pose_landmarks, self.mp_holistic.POSE_CONNECTIONS)
+            self.mp_drawing.draw_landmarks(region, results.left_hand_landmarks, self.mp_holistic.HAND_CONNECTIONS)
+            self.mp_drawing.draw_landmarks(region, results.right_hand_landmarks, self.mp_holistic.HAND_CONNECTIONS)
+            self.mp_drawing.draw_landmarks(region, results.face_landmarks, self.mp_holistic.FACEMESH_CONTOURS)
 
-        return hand_to_mouth_event
+    def is_smoking_pose(self, frame, pose=None, draw=None):
+        """
+        pose: PoseResult from analyze(); computed here if not given.
+        draw: draw landmarks onto frame (None: self.draw_landmarks).
+        """
+        if pose is None:
+            pose = self.analyze(frame)
 
+        hand_to_mouth_event = pose.hand_to_mouth()
+
+        if self.draw_landmarks if draw is None else draw:
+            self.draw(frame, pose)
+
+        return hand_to_mouth_event
 
     # ----------------------------------------------------------
-    # NEW METHOD ADDED FOR DRINKING DETECTION (DO NOT MODIFY ABOVE)
+    # PER-PERSON POINTS FOR DRINKING DETECTION
     # ----------------------------------------------------------
-    def get_person_points(self, frame, bbox):
+    def _static(self):
+        if self._static_estimator is None:
+            self._static_estimator = self._new_estimator(static_image_mode=True)
+        return self._static_estimator
+
+    def _estimator_for(self, track_id):
+        if track_id is None:
+            return self._static()
+
+        estimator = self.track_estimators.get(track_id)
+        if estimator is not None:
+            return estimator
+        if len(self.track_estimators) >= self.max_track_estimators:
+            # Pool full: no eviction, this track falls back to per-crop detection
+            # until release_tracks() frees a slot.
+            if self.pool_overflow == 0:
+                print(f"Pose: more than {self.max_track_estimators} tracks, "
+                      f"extra tracks use the static estimator (raise max_track_estimators)")
+            self.pool_overflow += 1
+            return self._static()
+        estimator = self.track_estimators[track_id] = self._new_estimator()
+        return estimator
+
+    def release_tracks(self, active_ids):
+        """Close estimators of tracks that are no longer active."""
+        active_ids = set(active_ids)
+        for oid in [oid for oid in self.track_estimators if oid not in active_ids]:
+            self.track_estimators.pop(oid).close()
+
+    def get_person_points(self, frame, bbox, track_id=None, pose=None, frame_rgb=None, rgb_offset=(0, 0)):
         """
         Returns hand and mouth coordinates for drinking detection.
         bbox = person bounding box (x1, y1, x2, y2)
+        track_id = tracker id, selects the per-track estimator
+        pose = full-frame PoseResult; reused when its face lies in bbox
+        frame_rgb = RGB copy of the frame (or of the region starting at rgb_offset),
+                    already converted once per frame; the crop is sliced from it
         """
+        if pose is not None and pose.inside(bbox):
+            return pose.person_points()
 
         x1, y1, x2, y2 = bbox
-        person_crop = frame[y1:y2, x1:x2]
+        x1, y1 = max(0, x1), max(0, y1)
 
-        if person_crop.size == 0:
-            return None
+        if frame_rgb is not None:
+            ox, oy = rgb_offset
+            rgb_h, rgb_w = frame_rgb.shape[:2]
+            cx1, cy1 = max(0, x1 - ox), max(0, y1 - oy)
+            cx2, cy2 = min(rgb_w, x2 - ox), min(rgb_h, y2 - oy)
+            if cx2 <= cx1 or cy2 <= cy1:
+                return None
+            # MediaPipe needs a contiguous image: a copy, but no second conversion
+            img_rgb = np.ascontiguousarray(frame_rgb[cy1:cy2, cx1:cx2])
+            x1, y1 = cx1 + ox, cy1 + oy
+        else:
+            person_crop = frame[y1:y2, x1:x2]
+            if person_crop.size == 0:
+                return None
+            img_rgb = cv2.cvtColor(person_crop, cv2.COLOR_BGR2RGB)
 
-        hh, ww, _ = person_crop.shape
-        img_rgb = cv2.cvtColor(person_crop, cv2.COLOR_BGR2RGB)
-        results = self.holistic.process(img_rgb)
+        hh, ww = img_rgb.shape[:2]
+        results = self._estimator_for(track_id).process(img_rgb)
 
-        # No detected landmarks?
-        if not results.face_landmarks:
-            return None
-
-        # Mouth anchor = nose landmark
-        mouth_lm = results.face_landmarks.landmark[self.NOSE_LANDMARK_IDX]
-        mouth_x = int(mouth_lm.x * ww) + x1
-        mouth_y = int(mouth_lm.y * hh) + y1
-        mouth = (mouth_x, mouth_y)
-
-        # Select ANY available hand
-        hand = None
-        hand_landmarks = None
-
-        if results.right_hand_landmarks:
-            hand_landmarks = results.right_hand_landmarks
-        elif results.left_hand_landmarks:
-            hand_landmarks = results.left_hand_landmarks
+        # Mouth anchor = nose landmark, hand = ANY available index fingertip
+        return self._make_result(results, ww, hh, offset=(x1, y1)).person_points()
 
-        if hand_landmarks:
-            tip_lm = hand_landmarks.landmark[self.INDEX_FINGER_TIP]
-            hand_x = int(tip_lm.x * ww) + x1
-            hand_y = int(tip_lm.y * hh) + y1
-            hand = (hand_x, hand_y)
-
-        return {
-            "hand": hand,
-            "mouth": mouth
-        }
+    def close(self):
+        self.estimator.close()
+        self.release_tracks([])
+        if self._static_estimator is not None:
+            self._static_estimator.close()
+            self._static_estimator = None
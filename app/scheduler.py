@@ -0,0 +1,54 @@
+# app/scheduler.py
+
+
+class ModelScheduler:
+    """
+    Gives each model its own cadence.
+
+    intervals = {"persons": 1, "smoke": 6, "pose": 3} means the smoke model
+    runs on every 6th frame, pose on every 3rd, and so on. A model marked
+    "hot" in plan() runs on every frame (full rate) until it cools down.
+    Between runs the caller carries the previous results forward.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = {name: max(1, int(n)) for name, n in intervals.items()}
+        self._since = {name: None for name in self.intervals}  # frames since last run
+
+        # --- Stats ---
+        self.frames = 0
+        self.runs = {name: 0 for name in self.intervals}
+        self.escalated = {name: 0 for name in self.intervals}
+
+    def plan(self, hot=None):
+        """Returns {model_name: run_this_frame}. hot = {model_name: bool}."""
+        hot = hot or {}
+        self.frames += 1
+        plan = {}
+        for name, interval in self.intervals.items():
+            since = self._since[name]
+            due = since is None or since + 1 >= interval
+            run = due or hot.get(name, False)
+            if run and not due:
+                self.escalated[name] += 1
+            plan[name] = run
+            if run:
+                self.runs[name] += 1
+                self._since[name] = 0
+            else:
+                self._since[name] = since + 1
+        return plan
+
+    def reset(self):
+        self._since = {name: None for name in self.intervals}
+
+    def snapshot(self):
+        return {
+            name: {
+                "interval": self.intervals[name],
+                "runs": self.runs[name],
+                "escalated": self.escalated[name],
+                "run_ratio": round(self.runs[name] / self.frames, 3) if self.frames else 0.0,
+            }
+            for name in self.intervals
+        }
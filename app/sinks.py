@@ -0,0 +1,434 @@
+# app/sinks.py
+"""
+Output sinks for the annotated preview (replaces the hard-wired cv2.imshow).
+
+    sinks = build_sinks(["window", {"type": "mjpeg", "port": 8090}], fps=10, width=960)
+    due = sinks.due(t)          # sinks that take this frame (preview fps, viewers)
+    if due:
+        draw(frame)             # annotate only when something consumes the frame
+        sinks.submit(frame, due)
+
+Types:
+  - "none":   no preview.
+  - "window": local cv2 window. cv2 GUI calls must stay on the thread that
+              created the window, so run_logic calls sinks.poll() from its loop.
+  - "mjpeg":  multipart JPEG stream from a small HTTP server
+              (http://host:port/stream.mjpg, /snapshot.jpg) for a browser or
+              VLC; no display needed on the server. Nothing is drawn or
+              encoded while no viewer is connected.
+  - "shm":    raw BGR frames in a named shared-memory block for a viewer in
+              another process (SharedMemoryReader, or `python -m app.sinks NAME`).
+
+Each sink has its own preview fps and width, independent of the analysis
+rate. submit() keeps only the latest frame (a resized copy, so the decode
+pool buffer can be reused); encoding / copying runs on the sink's thread
+and frames it has not picked up yet are replaced, never queued.
+"""
+import struct
+import threading
+from abc import ABC, abstractmethod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+SINK_TYPES = ("none", "window", "mjpeg", "shm")
+
+
+class OutputSink(ABC):
+    name = "sink"
+
+    def __init__(self, fps=10.0, width=None):
+        self.fps = fps
+        self.width = width
+        self._next_t = None
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # --- Stats ---
+        self.submitted = 0
+        self.written = 0
+
+    def due(self, t):
+        """True if the frame at time t goes to this sink (None/0 fps: every frame)."""
+        if not self.fps:
+            return True
+        period = 1.0 / self.fps
+        if self._next_t is None or t >= self._next_t or t < self._next_t - 2 * period:
+            # The last case: clock restarted (new run_logic call)
+            self._next_t = t + period
+            return True
+        return False
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        if self.width and self.width < w:
+            size = (int(self.width), int(round(h * self.width / float(w))))
+            return cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+        return frame.copy()
+
+    def submit(self, frame):
+        frame = self._prepare(frame)
+        with self._cond:
+            self._frame = frame
+            self._seq += 1
+            self.submitted += 1
+            self._cond.notify()
+
+    def start(self):
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"sink-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _loop(self):
+        seen = 0
+        while True:
+            with self._cond:
+                while self._seq == seen and not self._stop_event.is_set():
+                    self._cond.wait(0.5)
+                if self._stop_event.is_set():
+                    return
+                frame, seen = self._frame, self._seq
+            try:
+                self.write(frame)
+                self.written += 1
+            except Exception as e:
+                print(f"[{self.name}] output failed: {e!r}")
+
+    @abstractmethod
+    def write(self, frame):
+        """Encodes / publishes one frame (sink thread)."""
+
+    def poll(self):
+        """Called from the run_logic thread. Returns False to end the run."""
+        return True
+
+    def close(self):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(2.0)
+            self._thread = None
+
+    def snapshot(self):
+        return {"submitted": self.submitted, "written": self.written}
+
+
+class WindowSink(OutputSink):
+    """Local window. No thread: imshow / waitKey run in poll() on the window's thread."""
+    name = "window"
+
+    def __init__(self, fps=15.0, width=None, title="CCTV AI"):
+        super().__init__(fps, width)
+        self.title = title
+        self._shown = 0
+
+    def start(self):
+        return self
+
+    def write(self, frame):
+        cv2.imshow(self.title, frame)
+
+    def poll(self):
+        with self._cond:
+            frame, seq = self._frame, self._seq
+        if seq != self._shown:
+            self.write(frame)
+            self._shown = seq
+            self.written += 1
+        return (cv2.waitKey(1) & 0xFF) != ord('q')
+
+    def close(self):
+        if self._shown:
+            cv2.destroyWindow(self.title)
+            self._shown = 0
+
+
+class _MJPEGHandler(BaseHTTPRequestHandler):
+    sink = None
+    boundary = "frame"
+
+    def do_GET(self):
+        if self.path.startswith("/snapshot.jpg"):
+            with self.sink.viewer():
+                jpeg = self.sink.wait_jpeg(0, timeout=5.0)[1]
+            if jpeg is None:
+                self.send_error(503, "no frame yet")
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "image/jpeg")
+            self.send_header("Content-Length", str(len(jpeg)))
+            self.end_headers()
+            self.wfile.write(jpeg)
+        elif self.path in ("/", "/stream.mjpg"):
+            self.send_response(200)
+            self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={self.boundary}")
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            seq = 0
+            with self.sink.viewer():
+                try:
+                    while not self.sink.closed:
+                        seq, jpeg = self.sink.wait_jpeg(seq, timeout=1.0)
+                        if jpeg is None:
+                            continue
+                        self.wfile.write(
+                            f"--{self.boundary}\r\nContent-Type: image/jpeg\r\n"
+                            f"Content-Length: {len(jpeg)}\r\n\r\n".encode() + jpeg + b"\r\n"
+                        )
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # viewer went away
+        else:
+            self.send_error(404)
+
+    def log_message(self, *args):
+        pass
+
+
+class _Viewer:
+    def __init__(self, sink):
+        self.sink = sink
+
+    def __enter__(self):
+        with self.sink._viewers_lock:
+            self.sink.viewers += 1
+
+    def __exit__(self, *exc):
+        with self.sink._viewers_lock:
+            self.sink.viewers -= 1
+        return False
+
+
+class MJPEGSink(OutputSink):
+    """
+    Preview as MJPEG over HTTP. Each frame is JPEG-encoded once on the sink
+    thread and shared by all viewers.
+    """
+    name = "mjpeg"
+
+    def __init__(self, fps=10.0, width=None, port=8090, host="127.0.0.1", quality=70):
+        super().__init__(fps, width)
+        self.port = port
+        self.host = host
+        self.quality = quality
+        self.closed = False
+        self.viewers = 0
+        self._viewers_lock = threading.Lock()
+        self._jpeg = None
+        self._jpeg_seq = 0
+        self._jpeg_cond = threading.Condition()
+        self._server = None
+
+    def viewer(self):
+        return _Viewer(self)
+
+    def start(self):
+        if self._server is None:
+            handler = type("Handler", (_MJPEGHandler,), {"sink": self})
+            self._server = ThreadingHTTPServer((self.host, self.port), handler)
+            self._server.daemon_threads = True
+            threading.Thread(target=self._server.serve_forever, name="mjpeg-http", daemon=True).start()
+            print(f"Preview stream: http://{self.host}:{self.port}/stream.mjpg")
+        self.closed = False
+        return super().start()
+
+    def due(self, t):
+        # Nobody watching: no drawing, no copy, no encoding
+        return self.viewers > 0 and super().due(t)
+
+    def write(self, frame):
+        ok, buf = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+        with self._jpeg_cond:
+            self._jpeg = buf.tobytes()
+            self._jpeg_seq += 1
+            self._jpeg_cond.notify_all()
+
+    def wait_jpeg(self, seen, timeout=1.0):
+        """(seq, jpeg) of a frame newer than seen, or (seen, None) after timeout."""
+        with self._jpeg_cond:
+            if self._jpeg_seq == seen:
+                self._jpeg_cond.wait(timeout)
+            if self._jpeg_seq == seen:
+                return seen, None
+            return self._jpeg_seq, self._jpeg
+
+    def close(self):
+        self.closed = True
+        super().close()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Shared-memory layout: header (seq, height, width) + height * width * 3 BGR bytes.
+# seq is odd while a frame is being written (seqlock): readers retry on a change.
+_SHM_HEADER = struct.Struct("<QII")
+
+
+class SharedMemorySink(OutputSink):
+    """
+    Publishes frames into a named shared-memory block; a viewer process
+    maps the same block (SharedMemoryReader) and copies frames out, so the
+    preview costs the analysis process one memcpy per preview frame.
+    The block is sized by the first frame; later frames are resized to it.
+    """
+    name = "shm"
+
+    def __init__(self, fps=15.0, width=None, shm_name="cctv_preview"):
+        super().__init__(fps, width)
+        self.shm_name = shm_name
+        self._shm = None
+        self._view = None
+        self._shape = None
+        self._count = 0
+
+    def _create(self, shape):
+        size = _SHM_HEADER.size + shape[0] * shape[1] * 3
+        try:
+            self._shm = shared_memory.SharedMemory(self.shm_name, create=True, size=size)
+        except FileExistsError:
+            # Left over from a run that did not exit cleanly
+            stale = shared_memory.SharedMemory(self.shm_name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(self.shm_name, create=True, size=size)
+        self._shape = (shape[0], shape[1], 3)
+        self._view = np.ndarray(self._shape, dtype=np.uint8, buffer=self._shm.buf, offset=_SHM_HEADER.size)
+        print(f"Preview shared memory: {self.shm_name} ({shape[1]}x{shape[0]})")
+
+    def write(self, frame):
+        if self._shm is None:
+            self._create(frame.shape)
+        elif frame.shape != self._shape:
+            frame = cv2.resize(frame, (self._shape[1], self._shape[0]), interpolation=cv2.INTER_AREA)
+        h, w = self._shape[:2]
+        self._count += 1
+        _SHM_HEADER.pack_into(self._shm.buf, 0, 2 * self._count - 1, h, w)
+        self._view[:] = frame
+        _SHM_HEADER.pack_into(self._shm.buf, 0, 2 * self._count, h, w)
+
+    def close(self):
+        super().close()
+        if self._shm is not None:
+            self._view = None
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            self._count = 0
+
+
+class SharedMemoryReader:
+    """Viewer side of SharedMemorySink: read() returns a new frame or None."""
+
+    def __init__(self, shm_name):
+        try:
+            self._shm = shared_memory.SharedMemory(shm_name, track=False)
+        except TypeError:
+            # Python < 3.13: keep the resource tracker from unlinking the writer's block
+            from multiprocessing import resource_tracker
+            self._shm = shared_memory.SharedMemory(shm_name)
+            resource_tracker.unregister(self._shm._name, "shared_memory")
+        self._seen = 0
+
+    def read(self):
+        for _ in range(3):
+            seq, h, w = _SHM_HEADER.unpack_from(self._shm.buf, 0)
+            if seq == self._seen or seq % 2:
+                return None  # nothing new, or a write in progress
+            frame = np.ndarray((h, w, 3), dtype=np.uint8, buffer=self._shm.buf,
+                               offset=_SHM_HEADER.size).copy()
+            if _SHM_HEADER.unpack_from(self._shm.buf, 0)[0] == seq:
+                self._seen = seq
+                return frame
+        return None
+
+    def close(self):
+        self._shm.close()
+
+
+class SinkSet:
+    """The sinks of one processor; empty means no preview at all."""
+
+    def __init__(self, sinks=()):
+        self.sinks = list(sinks)
+
+    def __bool__(self):
+        return bool(self.sinks)
+
+    def start(self):
+        for sink in self.sinks:
+            sink.start()
+        return self
+
+    def due(self, t):
+        return [sink for sink in self.sinks if sink.due(t)]
+
+    def submit(self, frame, due):
+        for sink in due:
+            sink.submit(frame)
+
+    def poll(self):
+        keep_running = True
+        for sink in self.sinks:
+            keep_running = sink.poll() and keep_running
+        return keep_running
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+    def snapshot(self):
+        return {sink.name: sink.snapshot() for sink in self.sinks}
+
+
+def build_sinks(specs, fps=15.0, width=None, camera_id=None):
+    """
+    specs: sink types or dicts with a "type" plus per-sink options, e.g.
+    ["window", {"type": "mjpeg", "port": 8091, "fps": 5, "width": 640}].
+    fps / width are the defaults for every sink.
+    """
+    sinks = []
+    for spec in specs or ():
+        options = dict(spec) if isinstance(spec, dict) else {"type": spec}
+        kind = options.pop("type")
+        if kind not in SINK_TYPES:
+            raise ValueError(f"unknown output sink {kind!r}, expected one of {SINK_TYPES}")
+        options.setdefault("fps", fps)
+        options.setdefault("width", width)
+        if kind == "window":
+            sinks.append(WindowSink(**options))
+        elif kind == "mjpeg":
+            sinks.append(MJPEGSink(**options))
+        elif kind == "shm":
+            options.setdefault("shm_name", f"cctv_{camera_id}" if camera_id is not None else "cctv_preview")
+            sinks.append(SharedMemorySink(**options))
+    return SinkSet(sinks)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="View a shared-memory preview (\"shm\" output sink)")
+    parser.add_argument("name", help="shared memory name, e.g. cctv_cam1")
+    args = parser.parse_args()
+
+    reader = SharedMemoryReader(args.name)
+    try:
+        while True:
+            frame = reader.read()
+            if frame is not None:
+                cv2.imshow(args.name, frame)
+            if (cv2.waitKey(10) & 0xFF) == ord('q'):
+                break
+    finally:
+        reader.close()
+        cv2.destroyAllWindows()
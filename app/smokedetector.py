@@ -1,30 +1,43 @@
 # app/smokedetector.py
-from ultralytics import YOLO
+from app.backends import load_yolo
 
 class SmokeDetector:
     # --- IMPORTANT CHANGE: Load the local file ---
     # Change the model_name to the local file path: 'app/best.pt'
-    def __init__(self, model_name='app/best.pt', device='cpu'):
+    def __init__(self, model_name='app/best.pt', device='cpu', conf=0.5, imgsz=640):
         # NOTE: If you save the file in your main project folder, change this to 'best.pt'
-        self.model = YOLO(model_name) 
-        self.model.to(device)
+        # Exported .onnx / OpenVINO weights work too -- see app/backends.py
+        self.model = load_yolo(model_name, device)
+        self.conf = conf
+        self.imgsz = imgsz
 
-    def detect(self, frame, smoke_class_id=0):
-        # NOTE: We assume smoke_class_id=0 based on custom single-class training practices.
-        
+    def _predict(self, source, smoke_class_id, imgsz=None):
         # Only run prediction for the specific smoke class
-        results = self.model.predict(source=frame, classes=[smoke_class_id], imgsz=640, conf=0.5, verbose=False)
-        
+        return self.model.predict(source=source, classes=[smoke_class_id], imgsz=imgsz or self.imgsz, conf=self.conf, verbose=False)
+
+    def _parse(self, r, smoke_class_id, prepared=None):
         smoke_detected = False
-        r = results[0]
-        
+
         if getattr(r, "boxes", None) is not None and len(r.boxes) > 0:
             smoke_detected = True
-        
+
         boxes = []
         if smoke_detected:
             # Filter the boxes to ensure they belong to the expected smoke class (ID 0)
             target_boxes = [box for box in r.boxes if int(box.cls[0]) == smoke_class_id]
             boxes = [box.xyxy[0].tolist() for box in target_boxes]
+            if prepared is not None:
+                boxes = [prepared.to_frame_coords(b) for b in boxes]
+
+        return smoke_detected, boxes
+
+    def detect(self, frame, smoke_class_id=0, prepared=None):
+        # NOTE: We assume smoke_class_id=0 based on custom single-class training practices.
+        # prepared: optional LetterboxedFrame shared with the person/bottle Detector.
+        source = prepared.tensor if prepared is not None else frame
+        return self._parse(self._predict(source, smoke_class_id)[0], smoke_class_id, prepared)
 
-        return smoke_detected, boxes
\ No newline at end of file
+    def detect_batch(self, prepared_list, batch_tensor, smoke_class_id=0, imgsz=None):
+        """One forward pass for many frames. batch_tensor = torch.cat of the prepared tensors."""
+        results = self._predict(batch_tensor, smoke_class_id, imgsz)
+        return [self._parse(r, smoke_class_id, prepared) for r, prepared in zip(results, prepared_list)]
@@ -0,0 +1,281 @@
+# app/supervisor.py
+"""
+Multi-camera supervisor.
+
+    python -m app.supervisor cameras.json
+
+cameras.json:
+    {
+        "workers": 4,
+        "restart_delay": 5.0,
+        "pin_cores": true,
+        "sources": [
+            {"id": "cam1", "source": "rtsp://10.0.0.11/stream"},
+            {"id": "cam2", "source": 0,
+             "zones": [{"points": [[0.5, 0.2], [1.0, 0.2], [1.0, 1.0], [0.5, 1.0]], "mode": "include"}]}
+        ]
+    }
+
+workers defaults to one per CPU core; restart_delay is the pause in seconds
+before a crashed stream or worker is restarted. An optional
+"batch_inference" object ({"max_batch_size", "max_wait_ms", "latency_slo_ms"})
+routes a worker's streams through one BatchInferenceServer. An optional
+"metrics" object ({"port", "host", "json_path", "interval"}) enables the
+per-stage metrics of app/metrics.py: worker N serves /metrics on port + N
+and writes json_path with "{worker}" replaced by N.
+
+A source may list "zones" (see CCTVProcessor.ZONES) to limit processing to
+part of its frame, and "settings" to override CCTVProcessor class settings
+for that camera only (e.g. {"TILING": true, "IMGSZ_MAX": 960}). Workers
+never open a window; "OUTPUT_SINKS" there publishes a preview instead
+(e.g. [{"type": "mjpeg", "port": 8091}], see app/sinks.py).
+
+Sources are spread round-robin over worker processes, each pinned to one
+core. A worker loads the YOLO models once per distinct detector setup
+(weights / thresholds, usually one) and runs its streams on threads, so
+models are never loaded per stream. Crashed streams are restarted inside
+the worker; crashed workers are restarted by the supervisor.
+"""
+import argparse
+import json
+import logging
+import multiprocessing as mp
+import os
+import threading
+import time
+
+
+def load_config(path):
+    with open(path) as f:
+        config = json.load(f)
+    if not config.get("sources"):
+        raise ValueError(f"{path}: no 'sources' configured")
+    for i, src in enumerate(config["sources"]):
+        if not isinstance(src, dict) or "source" not in src:
+            raise ValueError(f"{path}: sources[{i}] needs a 'source' (URL, file or camera index)")
+        src.setdefault("id", f"cam{i}")
+    ids = [src["id"] for src in config["sources"]]
+    duplicates = sorted({i for i in ids if ids.count(i) > 1})
+    if duplicates:
+        raise ValueError(f"{path}: duplicate source ids {duplicates}")
+    return config
+
+
+class _SharedDetector:
+    """Serializes access to one FrameDetector shared by all streams of a worker."""
+
+    def __init__(self, frame_detector):
+        self.frame_detector = frame_detector
+        self._lock = threading.Lock()
+
+    def detect(self, frame, persons=True, smoke=True, imgsz=None):
+        with self._lock:
+            return self.frame_detector.detect(frame, persons, smoke, imgsz)
+
+    def detect_batch(self, frames, persons=True, smoke=True, imgsz=None):
+        with self._lock:
+            return self.frame_detector.detect_batch(frames, persons, smoke, imgsz)
+
+
+def _shared_detectors(sources, batch_inference=None):
+    """
+    One detector per source. Models are loaded ONCE per worker and shared by
+    all streams with the same detector settings (per-camera "settings" may
+    change weights / thresholds). Returns (detectors, batch servers started).
+    """
+    from app.cctvprocessor import CCTVProcessor
+    from app import modelregistry
+
+    shared = {}  # {id(FrameDetector): _SharedDetector or BatchInferenceServer}
+    servers = []
+    detectors = []
+    for src in sources:
+        frame_detector = modelregistry.frame_detector(CCTVProcessor.configured(src.get("settings")))
+        if id(frame_detector) not in shared:
+            if batch_inference:
+                # Frames from all streams of this worker share dynamic batches
+                from app.inferenceserver import BatchInferenceServer
+                server = BatchInferenceServer(frame_detector, **batch_inference).start()
+                servers.append(server)
+                shared[id(frame_detector)] = server
+            else:
+                shared[id(frame_detector)] = _SharedDetector(frame_detector)
+        detectors.append(shared[id(frame_detector)])
+    return detectors, servers
+
+
+def _pin_to_core(core):
+    if core is None or not hasattr(os, "sched_setaffinity"):
+        return
+    try:
+        os.sched_setaffinity(0, {core})
+    except OSError as e:
+        print(f"[supervisor] could not pin to core {core}: {e}")
+
+
+def _run_stream(src, detector, stop_event, restart_delay, status_queue):
+    # Imported here so the supervisor process itself never loads torch/mediapipe
+    from app.cctvprocessor import CCTVProcessor
+    from app.posedetector import PoseDetector
+
+    # Holistic / Pose are stateful: one per stream
+    pose_detector = PoseDetector(mode=(src.get("settings") or {}).get("POSE_MODE", CCTVProcessor.POSE_MODE))
+    current = {}
+
+    def stop_on_event():
+        stop_event.wait()
+        if "processor" in current:
+            current["processor"].stop()
+
+    threading.Thread(target=stop_on_event, daemon=True).start()
+
+    while not stop_event.is_set():
+        processor = CCTVProcessor(frame_detector=detector, pose_detector=pose_detector, camera_id=src["id"],
+                                  zones=src.get("zones"), settings=src.get("settings"))
+        current["processor"] = processor
+        status_queue.put(("started", src["id"], None))
+        reason = "finished"
+        try:
+            processor.run_logic(src["source"], display=False)
+            errors = processor.pipeline.errors() if processor.pipeline else []
+            if errors:
+                reason = f"crashed: {errors[0]!r}"
+        except Exception as e:
+            reason = f"crashed: {e!r}"
+        status_queue.put(("stopped", src["id"], reason))
+
+        # Files end for good; live streams are restarted after a delay
+        if not CCTVProcessor.is_live_source(src["source"]) and reason == "finished":
+            break
+        stop_event.wait(restart_delay)
+    pose_detector.close()
+
+
+def worker_main(worker_id, core, sources, restart_delay, stop_event, status_queue, batch_inference=None,
+                metrics=None):
+    _pin_to_core(core)
+    # Spawned processes start without the parent's logging setup
+    logging.basicConfig(level=logging.INFO,
+                        format=f"%(asctime)s %(levelname)s [worker {worker_id}] %(name)s: %(message)s")
+
+    exporters = {}
+    if metrics:
+        from app import metrics as metrics_module
+        exporters = metrics_module.configure(metrics, worker_id)
+
+    # One core per worker: keep libraries from spawning competing thread pools
+    import cv2
+    import torch
+    cv2.setNumThreads(1)
+    torch.set_num_threads(1)
+
+    detectors, servers = _shared_detectors(sources, batch_inference)
+    status_queue.put(("worker_ready", worker_id, [s["id"] for s in sources]))
+
+    threads = [
+        threading.Thread(
+            target=_run_stream,
+            args=(src, detector, stop_event, restart_delay, status_queue),
+            name=f"stream-{src['id']}",
+            daemon=True
+        )
+        for src, detector in zip(sources, detectors)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for server in servers:
+        print(f"[worker {worker_id}] batch inference: {server.snapshot()}")
+        server.stop()
+    if "dumper" in exporters:
+        exporters["dumper"].stop()
+
+
+class Supervisor:
+    def __init__(self, config):
+        self.sources = config["sources"]
+        n_cores = os.cpu_count() or 1
+        self.n_workers = max(1, min(int(config.get("workers", n_cores)), len(self.sources)))
+        self.restart_delay = float(config.get("restart_delay", 5.0))
+        self.pin_cores = config.get("pin_cores", True)
+        # e.g. {"max_batch_size": 8, "max_wait_ms": 15, "latency_slo_ms": 250}
+        self.batch_inference = config.get("batch_inference")
+        # e.g. {"port": 9108, "json_path": "metrics_{worker}.json", "interval": 10}
+        self.metrics = config.get("metrics")
+
+        # Fail on bad per-camera settings here, not in a worker restart loop
+        from app.cctvprocessor import CCTVProcessor
+        for src in self.sources:
+            CCTVProcessor.validate_settings(src.get("settings"))
+
+        # Round-robin assignment of streams to workers
+        self.assignments = [self.sources[i::self.n_workers] for i in range(self.n_workers)]
+
+        self.ctx = mp.get_context("spawn")
+        self.stop_event = self.ctx.Event()
+        self.status_queue = self.ctx.Queue()
+        self.workers = {}  # {worker_id: Process}
+
+    def _core_for(self, worker_id):
+        if not self.pin_cores or not hasattr(os, "sched_getaffinity"):
+            return None
+        cores = sorted(os.sched_getaffinity(0))
+        return cores[worker_id % len(cores)]
+
+    def _start_worker(self, worker_id):
+        p = self.ctx.Process(
+            target=worker_main,
+            args=(worker_id, self._core_for(worker_id), self.assignments[worker_id],
+                  self.restart_delay, self.stop_event, self.status_queue, self.batch_inference,
+                  self.metrics),
+            name=f"cctv-worker-{worker_id}",
+            daemon=True
+        )
+        p.start()
+        self.workers[worker_id] = p
+
+    def _drain_status(self):
+        while not self.status_queue.empty():
+            kind, who, info = self.status_queue.get_nowait()
+            print(f"[supervisor] {kind}: {who} {info if info is not None else ''}")
+
+    def run(self):
+        for worker_id in range(self.n_workers):
+            self._start_worker(worker_id)
+        print(f"[supervisor] {len(self.sources)} streams on {self.n_workers} workers")
+
+        try:
+            while True:
+                self._drain_status()
+                alive = False
+                for worker_id, p in list(self.workers.items()):
+                    if p.is_alive():
+                        alive = True
+                    elif p.exitcode != 0:
+                        print(f"[supervisor] worker {worker_id} died (exit {p.exitcode}), restarting")
+                        time.sleep(self.restart_delay)
+                        self._start_worker(worker_id)
+                        alive = True
+                if not alive:
+                    break
+                time.sleep(1.0)
+        except KeyboardInterrupt:
+            print("[supervisor] stopping")
+        finally:
+            self.stop()
+
+    def stop(self, timeout=10.0):
+        self.stop_event.set()
+        for p in self.workers.values():
+            p.join(timeout)
+            if p.is_alive():
+                p.terminate()
+        self._drain_status()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run many CCTV streams across worker processes")
+    parser.add_argument("config", help="JSON file listing the camera sources")
+    args = parser.parse_args()
+    Supervisor(load_config(args.config)).run()
@@ -0,0 +1,175 @@
+# app/tiling.py
+import numpy as np
+
+
+def _starts(length, tile, step):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, step))
+    return starts + [length - tile]  # last tile flush with the border
+
+
+def tile_grid(width, height, tile=640, overlap=0.2):
+    """Overlapping tile x tile windows covering the frame: [(x1, y1, x2, y2), ...]"""
+    step = max(1, int(tile * (1.0 - overlap)))
+    return [
+        (x, y, min(x + tile, width), min(y + tile, height))
+        for y in _starts(height, tile, step)
+        for x in _starts(width, tile, step)
+    ]
+
+
+def merge_boxes(boxes, ios_threshold=0.6):
+    """
+    NMS-style merge of boxes found by the full frame and by overlapping tiles.
+    The boxes carry no scores, so larger boxes win (a box cut at a tile edge
+    is the smaller copy), and overlap is measured as intersection over the
+    smaller box, which also removes fragments contained in a full box.
+    """
+    if len(boxes) < 2:
+        return [list(b) for b in boxes]
+    b = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+    area = np.maximum(0.0, b[:, 2] - b[:, 0]) * np.maximum(0.0, b[:, 3] - b[:, 1])
+    order = np.argsort(-area)
+
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        ix1 = np.maximum(b[i, 0], b[rest, 0])
+        iy1 = np.maximum(b[i, 1], b[rest, 1])
+        ix2 = np.minimum(b[i, 2], b[rest, 2])
+        iy2 = np.minimum(b[i, 3], b[rest, 3])
+        inter = np.maximum(0.0, ix2 - ix1) * np.maximum(0.0, iy2 - iy1)
+        ios = inter / np.maximum(np.minimum(area[i], area[rest]), 1e-6)
+        order = rest[ios < ios_threshold]
+    return [b[i].tolist() for i in sorted(keep)]
+
+
+class InferenceScalePolicy:
+    """
+    Model input size per camera, from the analyzed frame (or zone crop) size:
+    the long side times scale, rounded up to the model stride and clamped to
+    [min_imgsz, max_imgsz]. Low-resolution feeds stop being upscaled to 640.
+    """
+
+    def __init__(self, min_imgsz=320, max_imgsz=640, scale=1.0, stride=32):
+        self.min_imgsz = min_imgsz
+        self.max_imgsz = max_imgsz
+        self.scale = scale
+        self.stride = stride
+
+    def imgsz_for(self, frame_shape):
+        long_side = max(frame_shape[:2]) * self.scale
+        imgsz = int(np.ceil(long_side / self.stride)) * self.stride
+        return int(min(self.max_imgsz, max(self.min_imgsz, imgsz)))
+
+
+class TiledInference:
+    """
+    SAHI-style slicing for small objects (smoke, bottles) on large frames.
+
+    The frame is cut into overlapping tile_size tiles, each run at
+    imgsz=tile_size (about native resolution) in one detect_batch() call,
+    and the small-object boxes are merged with the full-frame ones. Persons
+    always come from the full-frame pass. A tile is skipped unless it
+    overlaps motion (motion gate mask) or a person box, since smoke and
+    bottles only matter near people.
+    """
+
+    def __init__(self, tile_size=640, overlap=0.2, min_frame_side=1920,
+                 targets=("smoke", "bottles"), ios_threshold=0.6, person_margin=0.25):
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.min_frame_side = min_frame_side
+        self.targets = set(targets)
+        self.ios_threshold = ios_threshold
+        self.person_margin = person_margin
+
+        self._grid_shape = None
+        self._grid = []
+
+        # --- Stats ---
+        self.frames = 0
+        self.tiles_total = 0
+        self.tiles_run = 0
+
+    def tiles(self, frame_shape):
+        if self._grid_shape != tuple(frame_shape[:2]):
+            h, w = frame_shape[:2]
+            self._grid = tile_grid(w, h, self.tile_size, self.overlap)
+            self._grid_shape = tuple(frame_shape[:2])
+        return self._grid
+
+    def active_tiles(self, frame_shape, motion_mask=None, person_boxes=()):
+        h, w = frame_shape[:2]
+        grid = self.tiles(frame_shape)
+
+        boxes = np.asarray([p[:4] for p in person_boxes], dtype=np.float32).reshape(-1, 4)
+        if len(boxes):
+            # Smoke / bottles sit around the person, not only inside the box
+            mw = (boxes[:, 2] - boxes[:, 0]) * self.person_margin
+            mh = (boxes[:, 3] - boxes[:, 1]) * self.person_margin
+            boxes = boxes + np.stack([-mw, -mh, mw, mh], axis=1)
+
+        if motion_mask is not None:
+            sy, sx = motion_mask.shape[0] / float(h), motion_mask.shape[1] / float(w)
+
+        active = []
+        for x1, y1, x2, y2 in grid:
+            near_person = bool(len(boxes)) and bool(np.any(
+                (boxes[:, 0] < x2) & (boxes[:, 2] > x1) & (boxes[:, 1] < y2) & (boxes[:, 3] > y1)
+            ))
+            if motion_mask is None:
+                moving = True  # no motion information: every tile counts
+            else:
+                cell = motion_mask[int(y1 * sy):max(int(y2 * sy), int(y1 * sy) + 1),
+                                   int(x1 * sx):max(int(x2 * sx), int(x1 * sx) + 1)]
+                moving = bool(cell.any())
+            if near_person or moving:
+                active.append((x1, y1, x2, y2))
+        return active
+
+    def detect(self, detector, frame, base, persons=True, smoke=True, motion_mask=None):
+        """
+        base: FrameDetector.detect() output for the full frame.
+        persons / smoke: which models ran on the full frame (bottles come
+        with the person model); tiles only re-run those.
+        Returns base with tile detections merged into bottles / smoke_boxes.
+        """
+        run_bottles = persons and "bottles" in self.targets
+        run_smoke = smoke and "smoke" in self.targets
+        if max(frame.shape[:2]) < self.min_frame_side or not (run_bottles or run_smoke):
+            return base
+
+        self.frames += 1
+        self.tiles_total += len(self.tiles(frame.shape))
+        tiles = self.active_tiles(frame.shape, motion_mask, base["persons"] or ())
+        if not tiles:
+            return base
+        self.tiles_run += len(tiles)
+
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        results = detector.detect_batch(crops, persons=run_bottles, smoke=run_smoke, imgsz=self.tile_size)
+
+        out = dict(base)
+        for key, enabled in (("bottles", run_bottles), ("smoke_boxes", run_smoke)):
+            if not enabled or base[key] is None:
+                continue
+            boxes = list(base[key])
+            for (x1, y1, _, _), r in zip(tiles, results):
+                for bx1, by1, bx2, by2 in r[key] or ():
+                    boxes.append([bx1 + x1, by1 + y1, bx2 + x1, by2 + y1])
+            out[key] = merge_boxes(boxes, self.ios_threshold)
+        if run_smoke and out["smoke_boxes"]:
+            out["smoke_detected"] = True
+        return out
+
+    def snapshot(self):
+        return {
+            "frames": self.frames,
+            "tiles_run": self.tiles_run,
+            "tiles_skipped": self.tiles_total - self.tiles_run,
+            "avg_tiles": round(self.tiles_run / self.frames, 2) if self.frames else 0.0,
+        }
@@ -1,5 +1,8 @@
 # app/tracker.py
 import math
+import numpy as np
+from filterpy.kalman import KalmanFilter
+from scipy.optimize import linear_sum_assignment
 
 class SimpleTracker:
     def __init__(self):
@@ -42,4 +45,184 @@ class SimpleTracker:
             # Output format: (oid, bbox_tuple, cls, conf)
             output_tracked.append((oid, bbox, cls, conf))
             
-        return output_tracked
\ No newline at end of file
+        return output_tracked
+
+# ----------------------------------------------------------
+# KALMAN + HUNGARIAN TRACKER (SORT / ByteTrack style)
+# ----------------------------------------------------------
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU of (N, 4) and (M, 4) xyxy arrays -> (N, M)."""
+    a = np.asarray(boxes_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float32).reshape(-1, 4)
+    if len(a) == 0 or len(b) == 0:
+        return np.zeros((len(a), len(b)), dtype=np.float32)
+
+    ix1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    iy1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    ix2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    iy2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def _bbox_to_z(bbox):
+    # xyxy -> [cx, cy, area, aspect ratio]
+    x1, y1, x2, y2 = bbox
+    w, h = x2 - x1, y2 - y1
+    return np.array([x1 + w / 2.0, y1 + h / 2.0, w * h, w / float(max(h, 1e-6))]).reshape(4, 1)
+
+
+def _x_to_bbox(x):
+    cx, cy, s, r = x[0, 0], x[1, 0], max(x[2, 0], 1e-6), max(x[3, 0], 1e-6)
+    w = np.sqrt(s * r)
+    h = s / w
+    return (cx - w / 2.0, cy - h / 2.0, cx + w / 2.0, cy + h / 2.0)
+
+
+class _KalmanTrack:
+    """Constant-velocity box track: state [cx, cy, s, r, vcx, vcy, vs]."""
+
+    def __init__(self, oid, bbox, conf, cls):
+        kf = KalmanFilter(dim_x=7, dim_z=4)
+        kf.F = np.eye(7)
+        kf.F[0, 4] = kf.F[1, 5] = kf.F[2, 6] = 1.0
+        kf.H = np.zeros((4, 7))
+        kf.H[:4, :4] = np.eye(4)
+        kf.R[2:, 2:] *= 10.0
+        kf.P[4:, 4:] *= 1000.0  # unknown initial velocity
+        kf.P *= 10.0
+        kf.Q[-1, -1] *= 0.01
+        kf.Q[4:, 4:] *= 0.01
+        kf.x[:4] = _bbox_to_z(bbox)
+        self.kf = kf
+
+        self.oid = oid
+        self.conf = conf
+        self.cls = cls
+        self.hits = 1
+        self.hit_streak = 1
+        self.time_since_update = 0
+
+    def predict(self):
+        if self.kf.x[2, 0] + self.kf.x[6, 0] <= 0:
+            self.kf.x[6, 0] = 0.0
+        self.kf.predict()
+        if self.time_since_update > 0:
+            self.hit_streak = 0
+        self.time_since_update += 1
+        return _x_to_bbox(self.kf.x)
+
+    def update(self, bbox, conf, cls):
+        self.kf.update(_bbox_to_z(bbox))
+        self.conf = conf
+        self.cls = cls
+        self.hits += 1
+        self.hit_streak += 1
+        self.time_since_update = 0
+
+    @property
+    def bbox(self):
+        return _x_to_bbox(self.kf.x)
+
+
+class KalmanTracker:
+    """
+    SORT-style tracker with ByteTrack's two-pass association.
+
+    - Kalman prediction of every track, then Hungarian matching on a
+      vectorized IoU cost matrix.
+    - First pass: high-score detections (conf >= high_thresh) vs all tracks.
+      Second pass: low-score detections vs the tracks still unmatched, so
+      briefly occluded people keep their ID. Only high-score detections
+      start new tracks.
+    - Lifecycle: a track is reported after min_hits consecutive matches and
+      deleted after max_age frames without one.
+
+    update() keeps the SimpleTracker contract: [(oid, bbox, cls, conf), ...].
+    """
+
+    def __init__(self, max_age=30, min_hits=3, iou_threshold=0.3, high_thresh=0.35, low_thresh=0.1):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+
+        self.next_id = 0
+        self.frame_count = 0
+        self.tracks = []
+        self.objects = {}  # reported tracks: {oid: (x1, y1, x2, y2, conf, cls)}
+
+    def _match(self, track_boxes, det_boxes):
+        """Hungarian assignment on IoU. Returns (matches, unmatched_tracks, unmatched_dets)."""
+        n_t, n_d = len(track_boxes), len(det_boxes)
+        if n_t == 0 or n_d == 0:
+            return [], list(range(n_t)), list(range(n_d))
+
+        iou = iou_matrix(track_boxes, det_boxes)
+        rows, cols = linear_sum_assignment(-iou)
+
+        matches = []
+        matched_t, matched_d = set(), set()
+        for r, c in zip(rows, cols):
+            if iou[r, c] >= self.iou_threshold:
+                matches.append((r, c))
+                matched_t.add(r)
+                matched_d.add(c)
+        unmatched_t = [i for i in range(n_t) if i not in matched_t]
+        unmatched_d = [j for j in range(n_d) if j not in matched_d]
+        return matches, unmatched_t, unmatched_d
+
+    def update(self, detections):
+        self.frame_count += 1
+
+        dets = [d for d in detections if d[4] >= self.low_thresh]
+        high = [d for d in dets if d[4] >= self.high_thresh]
+        low = [d for d in dets if d[4] < self.high_thresh]
+
+        predicted = np.array([t.predict() for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        # Drop tracks whose prediction became invalid
+        valid = np.all(np.isfinite(predicted), axis=1)
+        if not np.all(valid):
+            self.tracks = [t for t, ok in zip(self.tracks, valid) if ok]
+            predicted = predicted[valid]
+
+        # --- First pass: high-score detections ---
+        matches, unmatched_t, unmatched_high = self._match(predicted, [d[:4] for d in high])
+        for ti, di in matches:
+            x1, y1, x2, y2, conf, cls = high[di]
+            self.tracks[ti].update((x1, y1, x2, y2), conf, cls)
+
+        # --- Second pass: low-score detections vs remaining tracks ---
+        remaining = predicted[unmatched_t]
+        matches_low, still_unmatched, _ = self._match(remaining, [d[:4] for d in low])
+        for ri, di in matches_low:
+            x1, y1, x2, y2, conf, cls = low[di]
+            self.tracks[unmatched_t[ri]].update((x1, y1, x2, y2), conf, cls)
+
+        # --- New tracks from unmatched high-score detections ---
+        for di in unmatched_high:
+            x1, y1, x2, y2, conf, cls = high[di]
+            self.tracks.append(_KalmanTrack(self.next_id, (x1, y1, x2, y2), conf, cls))
+            self.next_id += 1
+
+        # --- Lifecycle ---
+        self.tracks = [t for t in self.tracks if t.time_since_update <= self.max_age]
+
+        output_tracked = []
+        self.objects = {}
+        for t in self.tracks:
+            if t.time_since_update > 0:
+                continue
+            if t.hit_streak < self.min_hits and self.frame_count > self.min_hits:
+                continue
+            x1, y1, x2, y2 = (int(round(v)) for v in t.bbox)
+            self.objects[t.oid] = (x1, y1, x2, y2, t.conf, t.cls)
+            # Output format: (oid, bbox_tuple, cls, conf)
+            output_tracked.append((t.oid, (x1, y1, x2, y2), t.cls, t.conf))
+
+        return output_tracked
@@ -0,0 +1,222 @@
+# app/videosource.py
+"""
+Decode layer in front of the pipeline.
+
+    source = open_source("rtsp://...", backend="pyav", width=1280)
+    while (item := source.read()) is not None:
+        index, frame = item   # BGR, possibly downscaled
+
+Backends:
+  - "opencv": cv2.VideoCapture. Frames are decoded into a small pool of
+    preallocated buffers (VideoCapture.read(dst)), downscaling goes into the
+    pool via cv2.resize(dst=...), skipped frames are grab()bed, never decoded.
+  - "pyav": FFmpeg through PyAV with frame/slice threading. Scaling and
+    YUV->BGR run as one swscale pass at the output size, so 4K streams are
+    never materialized as full-size BGR. keyframes_only=True asks the codec
+    to skip every non-key frame (fast offline scans).
+  - "auto": pyav when installed, else opencv.
+
+The opencv pool is reused round-robin: a returned frame stays valid for
+the next pool_size - 1 reads, so pool_size must exceed the number of frames
+the caller keeps alive (queued pipeline packets included). The pyav backend
+does not pool (see PyAVSource).
+"""
+from abc import ABC, abstractmethod
+
+import cv2
+
+BACKENDS = ("opencv", "pyav", "auto")
+
+
+class FramePool:
+    """Round-robin set of reusable frame buffers, adopted from the decoder's first outputs."""
+
+    def __init__(self, size):
+        self.size = max(1, size)
+        self._buffers = []
+        self._next = 0
+
+    def get(self):
+        """Buffer to decode into next, or None while the pool is still filling."""
+        if len(self._buffers) < self.size:
+            return None
+        buf = self._buffers[self._next]
+        self._next = (self._next + 1) % self.size
+        return buf
+
+    def put(self, frame, buf):
+        """Registers the array the decoder returned for buf; returns it."""
+        if buf is None:
+            self._buffers.append(frame)
+        elif frame is not buf:
+            # Frame size changed: the old buffers no longer fit
+            self._buffers = [frame]
+            self._next = 0
+        return frame
+
+
+def _output_size(in_w, in_h, width):
+    """Downscaled (w, h) with the same aspect ratio, or None to keep the input size."""
+    if not width or not in_w or width >= in_w:
+        return None
+    height = int(round(in_h * width / float(in_w))) & ~1  # even sizes for encoders
+    return int(width), max(2, height)
+
+
+class VideoSource(ABC):
+    fps = 30.0
+    width = 0
+    height = 0
+
+    @abstractmethod
+    def read(self):
+        """Returns (frame_index, BGR frame), or None at the end of the stream."""
+
+    @abstractmethod
+    def seek(self, frame_index):
+        """Positions the source so the next read() returns frame_index (or the first one after it)."""
+
+    def release(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class OpenCVSource(VideoSource):
+    def __init__(self, source, width=None, stride=1, pool_size=2):
+        self.cap = cv2.VideoCapture(source)
+        if not self.cap.isOpened():
+            raise IOError(f"could not open video source {source!r}")
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        in_w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        in_h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        self._size = _output_size(in_w, in_h, width)
+        self.width, self.height = self._size or (in_w, in_h)
+
+        self.stride = max(1, stride)
+        self.pool = FramePool(pool_size)
+        self._raw = None  # full-size decode buffer when downscaling
+        self._index = 0
+        self._skip = 0
+
+    def seek(self, frame_index):
+        self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+        self._index = frame_index
+        self._skip = 0
+
+    def read(self):
+        # Skipped frames are grabbed but never decoded
+        for _ in range(self._skip):
+            if not self.cap.grab():
+                return None
+            self._index += 1
+        self._skip = self.stride - 1
+
+        buf = self.pool.get()
+        if self._size is None:
+            ret, frame = self.cap.read(buf)
+        else:
+            ret, self._raw = self.cap.read(self._raw)
+            frame = None
+            if ret:
+                frame = cv2.resize(self._raw, self._size, dst=buf, interpolation=cv2.INTER_AREA)
+        if not ret:
+            return None
+
+        index = self._index
+        self._index += 1
+        return index, self.pool.put(frame, buf)
+
+    def release(self):
+        self.cap.release()
+
+
+class PyAVSource(VideoSource):
+    """
+    Limitation: every returned frame is a NEW ndarray. VideoFrame.to_ndarray
+    cannot convert into a caller-owned buffer, and copying into a pool would
+    add a full-frame memcpy on top of the allocation it is meant to save. The
+    allocation is at the output size (after the swscale downscale), so it is
+    cheapest with width set; pool_size does not apply to this backend.
+    """
+
+    def __init__(self, source, width=None, stride=1, keyframes_only=False, threads=0, options=None):
+        import av
+
+        try:
+            # options: FFmpeg demuxer options, e.g. {"rtsp_transport": "tcp"}
+            self.container = av.open(str(source), options=options or {})
+        except av.error.FFmpegError as e:
+            raise IOError(f"could not open video source {source!r}: {e}") from e
+
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"  # frame + slice threads inside FFmpeg
+        if threads:
+            self.stream.thread_count = threads
+        self.keyframes_only = keyframes_only
+        if keyframes_only:
+            self.stream.codec_context.skip_frame = "NONKEY"
+
+        self.fps = float(self.stream.average_rate or 30.0)
+        ctx = self.stream.codec_context
+        self._size = _output_size(ctx.width, ctx.height, width)
+        self.width, self.height = self._size or (ctx.width, ctx.height)
+        self._start_pts = self.stream.start_time or 0
+
+        self.stride = max(1, stride)
+        self._first = 0
+        self._count = 0
+        self._frames = self.container.decode(self.stream)
+
+    def _index_of(self, frame):
+        if frame.pts is None:
+            return self._first + self._count
+        return int(round(float((frame.pts - self._start_pts) * self.stream.time_base) * self.fps))
+
+    def seek(self, frame_index):
+        # Lands on the keyframe before frame_index; earlier frames are dropped in read()
+        offset = int(frame_index / self.fps / self.stream.time_base) + self._start_pts
+        self.container.seek(offset, stream=self.stream, backward=True)
+        self._frames = self.container.decode(self.stream)
+        self._first = frame_index
+        self._count = 0
+
+    def read(self):
+        for frame in self._frames:
+            index = self._index_of(frame)
+            self._count += 1
+            if index < self._first:
+                continue
+            if not self.keyframes_only and (index - self._first) % self.stride != 0:
+                continue  # decoded (references need it) but never converted
+            w, h = self._size or (frame.width, frame.height)
+            return index, frame.to_ndarray(format="bgr24", width=w, height=h, interpolation="AREA")
+        return None
+
+    def release(self):
+        self.container.close()
+
+
+def open_source(source, backend="opencv", width=None, stride=1, keyframes_only=False,
+                threads=0, pool_size=2, options=None):
+    """Opens source with the given backend. Raises IOError if it cannot be opened."""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown decode backend {backend!r}, expected one of {BACKENDS}")
+    if backend == "auto":
+        try:
+            import av  # noqa: F401
+            backend = "pyav"
+        except ImportError:
+            backend = "opencv"
+
+    # Camera indices are OpenCV-only
+    if backend == "pyav" and not isinstance(source, int):
+        return PyAVSource(source, width, stride, keyframes_only, threads, options)
+    if keyframes_only:
+        print("keyframes_only needs the pyav backend: decoding every frame")
+    return OpenCVSource(source, width, stride, pool_size)
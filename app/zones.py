@@ -0,0 +1,142 @@
+# app/zones.py
+import cv2
+import numpy as np
+
+
+class Zone:
+    """
+    One polygon. mode="include" marks an area to monitor, mode="exclude"
+    cuts an area out of it. Points are pixels, or fractions of the frame
+    size (resolution independent). normalized=None guesses fractions when
+    every coordinate is <= 1.0; set it explicitly for pixel polygons that
+    small.
+    """
+
+    def __init__(self, points, mode="include", name=None, normalized=None):
+        if mode not in ("include", "exclude"):
+            raise ValueError(f"zone mode must be 'include' or 'exclude', got {mode!r}")
+        self.points = [tuple(p) for p in points]
+        self.mode = mode
+        self.name = name
+        if normalized is None:
+            normalized = bool(self.points) and max(max(p) for p in self.points) <= 1.0
+        self.normalized = normalized
+
+    @classmethod
+    def from_config(cls, entry):
+        """entry: [[x, y], ...] or {"points": [...], "mode": "include", "name": ..., "normalized": ...}"""
+        if isinstance(entry, Zone):
+            return entry
+        if isinstance(entry, dict):
+            return cls(entry["points"], entry.get("mode", "include"), entry.get("name"), entry.get("normalized"))
+        return cls(entry)
+
+    def pixels(self, width, height):
+        pts = np.asarray(self.points, dtype=np.float64)
+        if self.normalized:
+            pts = pts * (width, height)
+        return np.round(pts).astype(np.int32)
+
+
+class ZoneSet:
+    """
+    Per-camera zones, rasterized once per frame size:
+      - mask: uint8, 1 inside the monitored area (includes minus excludes;
+        without include zones the whole frame minus excludes)
+      - integral image of the mask: the covered fraction of any box is O(1)
+      - crop: bounding rectangle of the mask (+ margin), the only region
+        the detectors and the full-frame pose pass need to see.
+    An empty ZoneSet monitors the whole frame and costs nothing.
+    """
+
+    def __init__(self, zones=None, min_overlap=0.3, crop_margin=32):
+        self.zones = [Zone.from_config(z) for z in (zones or [])]
+        self.min_overlap = min_overlap
+        self.crop_margin = crop_margin
+
+        self._shape = None
+        self.mask = None
+        self._integral = None
+        self._crop = None  # (x1, y1, x2, y2)
+
+    def __bool__(self):
+        return bool(self.zones)
+
+    def _build(self, height, width):
+        includes = [z for z in self.zones if z.mode == "include"]
+        mask = np.zeros((height, width), dtype=np.uint8) if includes else np.ones((height, width), dtype=np.uint8)
+        for z in includes:
+            cv2.fillPoly(mask, [z.pixels(width, height)], 1)
+        for z in self.zones:
+            if z.mode == "exclude":
+                cv2.fillPoly(mask, [z.pixels(width, height)], 0)
+
+        self.mask = mask
+        self._integral = cv2.integral(mask)  # (h+1, w+1)
+        x, y, w, h = cv2.boundingRect(mask)
+        if w == 0 or h == 0:
+            raise ValueError(f"zones leave no area to monitor in a {width}x{height} frame")
+        m = self.crop_margin
+        self._crop = (max(0, x - m), max(0, y - m), min(width, x + w + m), min(height, y + h + m))
+        self._shape = (height, width)
+
+    def _ensure(self, frame_shape):
+        if self._shape != tuple(frame_shape[:2]):
+            self._build(*frame_shape[:2])
+
+    def crop(self, frame):
+        """Returns (view of the monitored region, (x_offset, y_offset))."""
+        if not self.zones:
+            return frame, (0, 0)
+        self._ensure(frame.shape)
+        x1, y1, x2, y2 = self._crop
+        return frame[y1:y2, x1:x2], (x1, y1)
+
+    def crop_fraction(self, frame_shape):
+        """Share of the frame's pixels inside the crop."""
+        if not self.zones:
+            return 1.0
+        self._ensure(frame_shape)
+        x1, y1, x2, y2 = self._crop
+        return (x2 - x1) * (y2 - y1) / float(self._shape[0] * self._shape[1])
+
+    def coverage(self, bbox, frame_shape):
+        """Fraction of bbox inside the monitored area."""
+        if not self.zones:
+            return 1.0
+        self._ensure(frame_shape)
+        h, w = self._shape
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        x1, x2 = min(max(x1, 0), w), min(max(x2, 0), w)
+        y1, y2 = min(max(y1, 0), h), min(max(y2, 0), h)
+        area = (x2 - x1) * (y2 - y1)
+        if area <= 0:
+            return 0.0
+        ii = self._integral
+        inside = int(ii[y2, x2]) - int(ii[y1, x2]) - int(ii[y2, x1]) + int(ii[y1, x1])
+        return inside / float(area)
+
+    def contains_box(self, bbox, frame_shape):
+        return self.coverage(bbox, frame_shape) >= self.min_overlap
+
+    def draw(self, frame):
+        h, w = frame.shape[:2]
+        for z in self.zones:
+            color = (0, 0, 255) if z.mode == "include" else (128, 128, 128)
+            cv2.polylines(frame, [z.pixels(w, h)], True, color, 2)
+
+
+def shift_detections(detections, offset):
+    """Maps FrameDetector.detect() output from crop to frame coordinates."""
+    ox, oy = offset
+    if ox == 0 and oy == 0:
+        return detections
+    out = dict(detections)
+    if detections["persons"] is not None:
+        out["persons"] = [
+            (x1 + ox, y1 + oy, x2 + ox, y2 + oy, conf, cls) for x1, y1, x2, y2, conf, cls in detections["persons"]
+        ]
+    for key in ("bottles", "smoke_boxes"):
+        if detections[key] is not None:
+            out[key] = [[x1 + ox, y1 + oy, x2 + ox, y2 + oy] for x1, y1, x2, y2 in detections[key]]
+    return out
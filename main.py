@@ -1,13 +1,15 @@
+import logging
 import os
+import sys
 import tkinter as tk
 from tkinter import filedialog
 from tkinter import messagebox
-# Import the new processing class
-from app.cctvprocessor import CCTVProcessor
 
 
 def run_live_footage():
     """Checks live camera footage (index 0)"""
+    # Imported on first use so the menu shows up before torch/mediapipe load
+    from app.cctvprocessor import CCTVProcessor
     root.withdraw()
     processor = CCTVProcessor()
     processor.run_logic(video_source=0)
@@ -21,6 +23,7 @@ def check_pre_recorded_footage():
         filetypes=[("Video files", "*.mp4 *.avi")]
     )
     if file_path:
+        from app.cctvprocessor import CCTVProcessor
         root.withdraw()
         processor = CCTVProcessor()
         processor.run_logic(video_source=file_path)
@@ -29,7 +32,38 @@ def check_pre_recorded_footage():
         messagebox.showinfo("Cancelled", "No video file selected.")
 
 
+def run_headless(argv):
+    """python main.py --headless <dir> [--out results] [--stride N] [--workers N]"""
+    from app.batchrunner import build_arg_parser, run_batch
+    parser = build_arg_parser()
+    parser.prog = "main.py --headless"
+    args = parser.parse_args(argv)
+    run_batch(args.input_dir, args.out, max(1, args.stride), args.workers, args.segment_seconds,
+              args.decoder, args.keyframes_only, args.decode_width)
+
+
+def enable_metrics(argv):
+    """python main.py --metrics-port N: serves /metrics and /metrics.json on port N"""
+    if "--metrics-port" not in argv:
+        return
+    from app import metrics
+    metrics.configure({"port": int(argv[argv.index("--metrics-port") + 1])})
+
+
 if __name__ == "__main__":
+    # Stream stats and errors from app/cctvprocessor.py are logged at INFO
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--headless":
+        run_headless(sys.argv[2:])
+        sys.exit(0)
+
+    enable_metrics(sys.argv)
+
+    # Load and warm the models while the user picks a mode; later sessions reuse them
+    from app.modelregistry import prewarm
+    prewarm()
+
     root = tk.Tk()
     root.title("CCTV AI Monitor")
     root.geometry("300x150")
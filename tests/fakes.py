@@ -0,0 +1,77 @@
+# tests/fakes.py
+"""Model-free stand-ins for FrameDetector and PoseDetector."""
+import numpy as np
+
+
+def blank_frame(width=640, height=480):
+    return np.zeros((height, width, 3), dtype=np.uint8)
+
+
+class FakeFrameDetector:
+    """
+    Returns the detections set on its attributes; models that are not
+    asked for come back as None, like FrameDetector in split mode.
+    Every detect_batch() call is recorded in self.calls.
+    """
+
+    def __init__(self, persons=(), bottles=(), smoke_boxes=()):
+        self.persons = list(persons)  # [(x1, y1, x2, y2, conf, cls), ...]
+        self.bottles = list(bottles)
+        self.smoke_boxes = list(smoke_boxes)
+        self.calls = []  # [(n_frames, persons, smoke, imgsz), ...]
+
+    def detect_batch(self, frames, persons=True, smoke=True, imgsz=None):
+        self.calls.append((len(frames), persons, smoke, imgsz))
+        return [{
+            "persons": list(self.persons) if persons else None,
+            "bottles": [list(b) for b in self.bottles] if persons else None,
+            "smoke_detected": bool(self.smoke_boxes) if smoke else None,
+            "smoke_boxes": [list(b) for b in self.smoke_boxes] if smoke else None,
+        } for _ in frames]
+
+    def detect(self, frame, persons=True, smoke=True, imgsz=None):
+        return self.detect_batch([frame], persons, smoke, imgsz)[0]
+
+
+class FakePose:
+    def inside(self, bbox):
+        return False
+
+    def keypoints(self):
+        return [(150, 200)]  # inside the test person box
+
+
+class FakePoseDetector:
+    """
+    get_person_points() returns self.points[track_id], else self.default; counts
+    calls. draw() marks the pose's keypoints and records the pose in self.drawn.
+    """
+
+    def __init__(self, points=None, default=None):
+        self.points = dict(points or {})
+        self.default = default
+        self.calls = 0
+        self.drawn = []
+
+    def analyze(self, frame, frame_rgb=None, offset=(0, 0)):
+        return FakePose()
+
+    def get_person_points(self, frame, bbox, track_id=None, pose=None, frame_rgb=None, rgb_offset=(0, 0)):
+        self.calls += 1
+        return self.points.get(track_id, self.default)
+
+    def draw(self, frame, pose):
+        self.drawn.append(pose)
+        for x, y in pose.keypoints():
+            frame[y, x] = (0, 255, 0)
+
+    def release_tracks(self, active_ids):
+        pass
+
+    def close(self):
+        pass
+
+
+def hand_at_mouth(hand_to_mouth=True, pose=None):
+    return {"hand": (100, 100), "mouth": (100, 95), "face_width": 40.0, "hand_to_mouth": hand_to_mouth,
+            "pose": pose}
@@ -0,0 +1,56 @@
+import numpy as np
+
+from app.association import SpatialAssociator
+from app.drinkingdetector import DrinkingDetector
+
+
+def _person(oid, x):
+    return (oid, (x, 100, x + 100, 400), 0, 0.9)
+
+
+def test_batch_drinking_matches_the_per_person_rule():
+    detector = DrinkingDetector()
+    rng = np.random.default_rng(0)
+    people = [{"hand": tuple(rng.integers(0, 500, 2)), "mouth": tuple(rng.integers(0, 500, 2))}
+              for _ in range(50)]
+    people += [None, {"hand": None, "mouth": (10, 10)}]
+    bottles = [[x, y, x + 30, y + 60] for x, y in rng.integers(0, 500, (8, 2))]
+
+    batch, _ = detector.detect_drinking_batch(people, bottles)
+    single = [bool(p) and detector.detect_drinking(p, bottles) for p in people]
+    assert list(batch) == single
+
+
+def test_bottle_is_linked_to_the_drinking_person_only():
+    associator = SpatialAssociator(DrinkingDetector())
+    points = {
+        1: {"hand": (150, 150), "mouth": (150, 130), "face_width": 30.0},
+        2: {"hand": (560, 350), "mouth": (550, 130), "face_width": 30.0},
+    }
+    out = associator.associate([_person(1, 100), _person(2, 500)], points, [[140, 140, 170, 200]], [])
+    assert out[1]["drinking"] and out[1]["bottle"] == 0
+    assert not out[2]["drinking"] and out[2]["bottle"] is None
+
+
+def test_smoke_goes_to_the_closest_overlapping_head():
+    associator = SpatialAssociator(DrinkingDetector())
+    tracked = [_person(1, 100), _person(2, 180)]  # overlapping boxes, heads side by side
+    smoke = [[230, 90, 260, 130]]  # above person 2's head
+    out = associator.associate(tracked, {}, [], smoke)
+    assert out[2]["smoke"] and out[2]["smoke_box"] == 0
+    assert not out[1]["smoke"]
+
+
+def test_head_box_follows_the_mouth_when_pose_found_one():
+    associator = SpatialAssociator(DrinkingDetector(), head_margin=0.0)
+    heads = associator.head_boxes([(0, 0, 100, 400)], [{"mouth": (50, 300), "face_width": 20.0}])
+    assert np.allclose(heads[0], [25, 275, 75, 325])
+    heads = associator.head_boxes([(0, 0, 100, 400)], [None])
+    assert np.allclose(heads[0], [0, 0, 100, 100])
+
+
+def test_no_people_or_objects():
+    associator = SpatialAssociator(DrinkingDetector())
+    assert associator.associate([], {}, [[0, 0, 1, 1]], [[0, 0, 1, 1]]) == {}
+    out = associator.associate([_person(1, 0)], {1: None}, [], [])
+    assert out[1] == {"drinking": False, "bottle": None, "smoke": False, "smoke_box": None}
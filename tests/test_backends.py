@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+
+from app.backends import accuracy_gate, backend_of, detect_head_nodes, map50
+
+BOX_A = [0, 0, 10, 10]
+BOX_B = [20, 20, 40, 40]
+
+
+def _frame(boxes=(), classes=(), confs=None):
+    boxes = np.array(boxes, dtype=np.float32).reshape(-1, 4)
+    classes = np.array(classes, dtype=np.int64)
+    confs = np.array(confs if confs is not None else [0.9] * len(classes), dtype=np.float32)
+    return boxes, classes, confs
+
+
+def test_map50_perfect_match():
+    ref = [_frame([BOX_A, BOX_B], [0, 1]), _frame([BOX_A], [0])]
+    assert map50(ref, ref) == pytest.approx(1.0)
+
+
+def test_map50_false_positive_ranked_first():
+    ref = [_frame([BOX_A], [0])]
+    test = [_frame([BOX_B, BOX_A], [0, 0], confs=[0.9, 0.5])]
+    # Precision 0 at recall 0, then 1/2 at recall 1
+    assert map50(ref, test) == pytest.approx(0.5)
+
+
+def test_map50_missing_class_scores_zero():
+    ref = [_frame([BOX_A, BOX_B], [0, 1])]
+    test = [_frame([BOX_A], [0])]
+    assert map50(ref, test) == pytest.approx(0.5)
+
+
+def test_map50_class_absent_from_reference_scores_zero():
+    # Footage without smoke: a model that hallucinates smoke must not score 1.0
+    ref = [_frame([BOX_A], [0])] * 3
+    test = [_frame([BOX_A, BOX_B], [0, 80])] * 3
+    assert map50(ref, test) == pytest.approx(0.5)
+
+
+def test_map50_empty_reference_is_undecided():
+    assert map50([_frame()] * 3, [_frame()] * 3) is None
+    assert map50([_frame()], [_frame([BOX_A], [80])]) is None
+
+
+def _report(fp32, int8):
+    return {"best.pt": {"onnx": {"map50_vs_torch": fp32}, "onnx-int8": {"map50_vs_torch": int8}}}
+
+
+def test_accuracy_gate_threshold():
+    within = _report(0.95, 0.93)
+    assert accuracy_gate(within, max_map_drop=0.02) == []
+    assert within["best.pt"]["onnx-int8"]["accuracy_gate"] == "pass"
+
+    beyond = _report(0.95, 0.92)
+    assert accuracy_gate(beyond, max_map_drop=0.02) == ["best.pt/onnx-int8"]
+    assert beyond["best.pt"]["onnx-int8"]["map50_drop_vs_fp32"] == pytest.approx(0.03)
+
+
+def test_accuracy_gate_fails_without_reference_boxes():
+    report = _report(None, None)
+    assert accuracy_gate(report) == ["best.pt/onnx-int8"]
+    assert report["best.pt"]["onnx-int8"]["accuracy_gate"] == "no-reference"
+
+
+def test_backend_of():
+    assert backend_of("yolov8n.int8.onnx") == "onnx"
+    assert backend_of("yolov8n_openvino_model/") == "openvino"
+    assert backend_of("app/best.pt") == "torch"
+
+
+def _head_graph():
+    """Backbone conv -> box / class convs -> YOLOv8-style decode (DFL + sigmoid + concat)."""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper
+
+    def weight(name, out_ch, in_ch):
+        return helper.make_tensor(name, TensorProto.FLOAT, [out_ch, in_ch, 1, 1], [0.1] * out_ch * in_ch)
+
+    nodes = [
+        helper.make_node("Conv", ["images", "w0"], ["feat"], name="/model.0/conv/Conv"),
+        helper.make_node("Conv", ["feat", "w_box"], ["box"], name="/model.22/cv2.0/cv2.0.2/Conv"),
+        helper.make_node("Conv", ["feat", "w_cls"], ["cls"], name="/model.22/cv3.0/cv3.0.2/Conv"),
+        helper.make_node("Softmax", ["box"], ["box_sm"], name="/model.22/dfl/Softmax", axis=1),
+        helper.make_node("Conv", ["box_sm", "w_dfl"], ["dist"], name="/model.22/dfl/conv/Conv"),
+        helper.make_node("Mul", ["dist", "stride"], ["dbox"], name="/model.22/Mul_2"),
+        helper.make_node("Sigmoid", ["cls"], ["scores"], name="/model.22/Sigmoid"),
+        helper.make_node("Concat", ["dbox", "scores"], ["output0"], name="/model.22/Concat_5", axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes, "head",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, 8, 8])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [1, 5, 8, 8])],
+        initializer=[weight("w0", 4, 3), weight("w_box", 4, 4), weight("w_cls", 1, 4),
+                     weight("w_dfl", 4, 4), helper.make_tensor("stride", TensorProto.FLOAT, [1], [8.0])],
+    )
+    model = helper.make_model(graph)
+    onnx.checker.check_model(model)
+    return model
+
+
+def test_detect_head_nodes_stop_at_the_last_feature_convs():
+    assert detect_head_nodes(_head_graph()) == [
+        "/model.22/Concat_5",
+        "/model.22/Mul_2",
+        "/model.22/Sigmoid",
+        "/model.22/dfl/Softmax",
+        "/model.22/dfl/conv/Conv",
+    ]
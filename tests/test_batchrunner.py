@@ -0,0 +1,52 @@
+import cv2
+import numpy as np
+
+from app.batchrunner import find_videos, plan_segments
+
+
+def _clip(path, frames):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (32, 24))
+    for _ in range(frames):
+        writer.write(np.zeros((24, 32, 3), dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_find_videos_recurses_and_filters(tmp_path):
+    (tmp_path / "cam1").mkdir()
+    for name in ("cam1/a.AVI", "b.mp4", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    assert [p[len(str(tmp_path)) + 1:] for p in find_videos(tmp_path)] == ["b.mp4", "cam1/a.AVI"]
+
+
+def test_plan_segments_covers_the_file(tmp_path):
+    path = _clip(tmp_path / "clip.avi", 25)
+    assert plan_segments(path, 1.0) == [(path, 0, 10), (path, 10, 20), (path, 20, 25)]
+
+
+def test_unreadable_length_is_one_open_segment(tmp_path):
+    path = str(tmp_path / "broken.mp4")
+    open(path, "wb").close()
+    assert plan_segments(path, 1.0) == [(path, 0, None)]
+
+
+def test_events_carry_structured_fields(tmp_path, monkeypatch):
+    from app import batchrunner
+    from app.cctvprocessor import CCTVProcessor
+    from fakes import FakeFrameDetector, FakePoseDetector, hand_at_mouth
+
+    monkeypatch.setattr(CCTVProcessor, "MOTION_GATE", False)
+    monkeypatch.setattr(CCTVProcessor, "MODEL_INTERVALS", {"persons": 1, "smoke": 1, "pose": 1})
+    monkeypatch.setitem(batchrunner._models, "frame_detector", FakeFrameDetector(
+        persons=[(0, 0, 30, 22, 0.9, 0)], bottles=[[4, 4, 8, 8]]))
+    monkeypatch.setitem(batchrunner._models, "pose_detector", FakePoseDetector(
+        default=dict(hand_at_mouth(), hand=(6, 6), mouth=(6, 5))))
+
+    path = _clip(tmp_path / "clip.avi", 30)
+    (tmp_path / "evidence").mkdir()  # created by run_batch
+    events = batchrunner.process_segment(path, 0, None, str(tmp_path))
+    assert len(events) == 1  # logged once, when the episode starts
+    event = events[0]
+    assert event["event_type"] == "drinking" and event["event"] == f"DRINKING DETECTED ID {event['track_id']}"
+    assert isinstance(event["track_id"], int) and isinstance(event["state"], str)
+    assert 0.0 < event["confidence"] <= 1.0
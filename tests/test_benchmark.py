@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+from app.benchmark import bench_processor, bench_trackers, synthetic_frames
+from fakes import FakeFrameDetector, FakePoseDetector, hand_at_mouth
+
+PERSON = (100, 50, 200, 300, 0.9, 0)
+
+
+def _well_formed(stats, calls):
+    assert stats["calls"] == calls
+    assert 0.0 < stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"]
+    assert stats["fps"] == pytest.approx(1000.0 / stats["mean_ms"], rel=0.01)
+
+
+def test_processor_loop_with_fake_models(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    frames = synthetic_frames(320, 240, 6)
+    detector = FakeFrameDetector(persons=[PERSON], smoke_boxes=[PERSON[:4]])
+    report = bench_processor(frames, "320x240", trace_alloc=True, frame_detector=detector,
+                             pose_detector=FakePoseDetector(default=hand_at_mouth()))
+
+    assert list(report) == ["CCTVProcessor.frame[320x240]"]
+    stats = report["CCTVProcessor.frame[320x240]"]
+    _well_formed(stats, calls=6)
+    assert stats["alloc_peak_kb"] >= stats["alloc_retained_kb"] >= 0.0
+    assert detector.calls  # the loop ran the (fake) models
+
+    # No event store, evidence folder or clips left behind
+    assert os.listdir(tmp_path) == []
+
+
+def test_tracker_stages_are_keyed_per_crowd_size():
+    report = bench_trackers([1, 5], 640, 360, frames=4, trace_alloc=False)
+    assert sorted(report) == [
+        "KalmanTracker.update[persons=1]", "KalmanTracker.update[persons=5]",
+        "SimpleTracker.update[persons=1]", "SimpleTracker.update[persons=5]",
+    ]
+    for stats in report.values():
+        _well_formed(stats, calls=4)
@@ -0,0 +1,132 @@
+import pytest
+
+from app.cctvprocessor import CCTVProcessor
+from app.eventengine import NONE, POSE_ACTIVE
+from fakes import FakeFrameDetector, FakePoseDetector, blank_frame, hand_at_mouth
+
+PERSON = (100, 50, 200, 400, 0.9, 0)
+
+
+def _processor(tmp_path, pose, **settings):
+    base = {"EVIDENCE_FOLDER": str(tmp_path), "EVENT_STORE": False, "MOTION_GATE": False,
+            "MODEL_INTERVALS": {"persons": 1, "smoke": 10, "pose": 3}}
+    base.update(settings)
+    return CCTVProcessor(frame_detector=FakeFrameDetector(persons=[PERSON]), pose_detector=pose,
+                         settings=base)
+
+
+def _run(processor, pose, positives, frames=15):
+    """Hand at the mouth on the first `positives` frames pose actually runs on."""
+    states, sampled = [], 0
+    for i in range(frames):
+        pose.default = hand_at_mouth(sampled < positives)
+        before = pose.calls
+        result = processor._analyze(blank_frame(), i / 30.0)
+        if pose.calls > before:
+            sampled += 1
+        states.extend(ts["state"] for ts in result["track_states"].values())
+    return states
+
+
+def test_carried_forward_pose_is_not_counted_again(tmp_path):
+    pose = FakePoseDetector()
+    processor = _processor(tmp_path, pose)
+    states = _run(processor, pose, positives=1)
+    assert POSE_ACTIVE not in states
+    assert set(states) == {NONE}
+
+
+def test_fresh_pose_samples_still_trigger(tmp_path):
+    pose = FakePoseDetector()
+    processor = _processor(tmp_path, pose)
+    assert POSE_ACTIVE in _run(processor, pose, positives=2)
+
+
+def test_unknown_setting_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        _processor(tmp_path, FakePoseDetector(), NOT_A_SETTING=1)
+
+
+class _FakeDetectorProcessor(CCTVProcessor):
+    built = []
+
+    @classmethod
+    def build_frame_detector(cls, config=None):
+        config = config or cls
+        cls.built.append((config.SMOKE_CONF, dict(config.CLASS_CONF)))
+        return FakeFrameDetector()
+
+
+def test_detector_settings_select_their_own_registry_model(tmp_path):
+    from app.modelregistry import MODELS
+    MODELS.clear()
+    try:
+        base = {"EVIDENCE_FOLDER": str(tmp_path), "EVENT_STORE": False}
+        default = _FakeDetectorProcessor(pose_detector=FakePoseDetector(), settings=base)
+        same = _FakeDetectorProcessor(pose_detector=FakePoseDetector(), settings=base)
+        strict = _FakeDetectorProcessor(pose_detector=FakePoseDetector(),
+                                        settings=dict(base, SMOKE_CONF=0.8, CLASS_CONF={"0": 0.2, "39": 0.3}))
+    finally:
+        MODELS.clear()
+    assert default.frame_detector is same.frame_detector
+    assert strict.frame_detector is not default.frame_detector
+    assert _FakeDetectorProcessor.built[-1] == (0.8, {0: 0.2, 39: 0.3})  # JSON keys back to class ids
+    assert strict.CLASS_CONF[0] == 0.2
+
+
+def test_configured_class_carries_the_settings():
+    cfg = CCTVProcessor.configured({"SMOKE_CONF": 0.9})
+    assert cfg.SMOKE_CONF == 0.9 and CCTVProcessor.SMOKE_CONF != 0.9
+    assert CCTVProcessor.configured(None) is CCTVProcessor
+    with pytest.raises(ValueError):
+        CCTVProcessor.configured({"smoke_conf": 0.9})
+
+
+def test_metrics_count_confirmed_events_not_frames(tmp_path, monkeypatch):
+    from app.metrics import REGISTRY
+    monkeypatch.setattr(REGISTRY, "enabled", True)
+    pose = FakePoseDetector(default=hand_at_mouth())
+    processor = CCTVProcessor(
+        frame_detector=FakeFrameDetector(persons=[PERSON], smoke_boxes=[PERSON[:4]]),
+        pose_detector=pose, camera_id=f"metrics-{tmp_path.name}",
+        settings={"EVIDENCE_FOLDER": str(tmp_path), "EVENT_STORE": False, "MOTION_GATE": False,
+                  "MODEL_INTERVALS": {"persons": 1, "smoke": 1, "pose": 1}})
+    smoking_frames = 0
+    for i in range(20):
+        pose.default = hand_at_mouth(i < 3)  # hand to the mouth, then away while smoke is seen
+        smoking_frames += bool(processor._analyze(blank_frame(), i / 30.0)["smoking_events"])
+    assert smoking_frames > 1
+    assert processor.metrics.counters["smoking"] == 1
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_draw_pose_landmarks_setting(tmp_path, enabled):
+    from fakes import FakePose
+    pose = FakePoseDetector(default=hand_at_mouth(pose=FakePose()))
+    processor = _processor(tmp_path, pose, DRAW_POSE_LANDMARKS=enabled,
+                           MODEL_INTERVALS={"persons": 1, "smoke": 1, "pose": 1})
+    for i in range(4):
+        frame = blank_frame()
+        processor._draw_detections(frame, processor._analyze(frame, i / 30.0))
+    assert len(pose.drawn) == (4 if enabled else 0)
+    assert tuple(frame[200, 150]) == ((0, 255, 0) if enabled else (0, 0, 0))
+
+
+def test_run_stats_are_logged_not_printed(tmp_path, caplog, capsys):
+    import logging
+
+    import cv2
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (64, 48))
+    for _ in range(5):
+        writer.write(blank_frame(64, 48))
+    writer.release()
+
+    processor = CCTVProcessor(frame_detector=FakeFrameDetector(), pose_detector=FakePoseDetector(),
+                              camera_id="door", settings={"EVIDENCE_FOLDER": str(tmp_path), "EVENT_STORE": False})
+    with caplog.at_level(logging.INFO, logger="app.cctvprocessor"):
+        assert processor.run_logic(path, display=False)
+    messages = [r.getMessage() for r in caplog.records if r.name == "app.cctvprocessor"]
+    assert any(m.startswith("[door] first frame after") for m in messages)
+    assert any(m.startswith("[door] pipeline:") for m in messages)
+    assert "first frame" not in capsys.readouterr().out.lower()
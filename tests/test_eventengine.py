@@ -0,0 +1,69 @@
+from app.eventengine import (EventEngine, NONE, POSE_ACTIVE, VIOLATION_CONFIRMED,
+                             WAITING_FOR_SMOKE)
+
+
+def _obs(hand=False, smoke=False, drinking=False):
+    return {"hand_to_mouth": hand, "smoke": smoke, "drinking": drinking}
+
+
+def test_single_hand_sample_is_debounced():
+    engine = EventEngine(pose_on_frames=2)
+    assert engine.update(0.0, {1: _obs(hand=True)})[1]["state"] == NONE
+    assert engine.update(0.1, {1: _obs(hand=False)})[1]["state"] == NONE
+    assert engine.update(0.2, {1: _obs(hand=True)})[1]["state"] == NONE
+    assert engine.update(0.3, {1: _obs(hand=True)})[1]["state"] == POSE_ACTIVE
+
+
+def test_smoking_sequence_confirms_once_smoke_follows_the_pose():
+    engine = EventEngine(pose_on_frames=2, pose_off_frames=3, smoke_window_seconds=3.0)
+    t = 0.0
+    for hand in (True, True, False, False, False):
+        state = engine.update(t, {1: _obs(hand=hand)})[1]
+        t += 0.1
+    assert state["state"] == WAITING_FOR_SMOKE
+
+    result = engine.update(t, {1: _obs(smoke=True)})[1]
+    assert result["smoking"] and result["state"] == VIOLATION_CONFIRMED
+
+
+def test_waiting_for_smoke_times_out():
+    engine = EventEngine(pose_on_frames=1, pose_off_frames=1, smoke_window_seconds=1.0)
+    engine.update(0.0, {1: _obs(hand=True)})
+    assert engine.update(0.1, {1: _obs()})[1]["state"] == WAITING_FOR_SMOKE
+    assert engine.update(2.0, {1: _obs()})[1]["state"] == NONE
+
+
+def test_tracks_have_independent_state():
+    engine = EventEngine(pose_on_frames=1)
+    out = engine.update(0.0, {1: _obs(hand=True), 2: _obs()})
+    assert out[1]["state"] == POSE_ACTIVE and out[2]["state"] == NONE
+    assert engine.summary_state() == POSE_ACTIVE
+
+
+def test_drinking_hysteresis():
+    engine = EventEngine(history=10, drink_on=3, drink_off=1)
+    states = [engine.update(i * 0.1, {1: _obs(drinking=d)})[1]["drinking"]
+              for i, d in enumerate([True, True, True, False, False, False, False, False, False, False])]
+    # On after the third positive, stays on while > drink_off positives remain in the window
+    assert states[:3] == [False, False, True]
+    assert all(states[3:])
+    states = [engine.update(1.0 + i * 0.1, {1: _obs()})[1]["drinking"] for i in range(3)]
+    assert states[-1] is False
+
+
+def test_missing_keys_add_no_samples():
+    engine = EventEngine(pose_on_frames=2)
+    engine.update(0.0, {1: _obs(hand=True)})
+    # Pose skipped on the next frames: the one positive sample must not be repeated
+    for i in range(1, 4):
+        out = engine.update(i * 0.1, {1: {"smoke": False}})
+    assert out[1]["state"] == NONE
+    assert out[1]["smoking_conf"] == 1.0
+    assert len(engine.tracks[1].hand_mouth) == 1
+
+
+def test_unseen_tracks_are_evicted():
+    engine = EventEngine(track_ttl_seconds=1.0)
+    engine.update(0.0, {1: _obs(), 2: _obs()})
+    engine.update(1.5, {2: _obs()})
+    assert set(engine.tracks) == {2}
@@ -0,0 +1,68 @@
+import time
+
+import pytest
+
+from app.eventstore import EventStore, _parse_since, apply_retention, connect, query
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(tmp_path / "events.db", flush_interval=0.05)
+    yield store
+    store.close()
+
+
+def test_open_and_close_an_event(store):
+    store.open_event("cam1", 7, "drinking", start_time=100.0, confidence=0.8)
+    store.close_event("cam1", 7, "drinking", start_time=100.0, end_time=104.5, clip_path="clip.mp4")
+    assert store.flush()
+    (row,) = store.query()
+    assert row["camera"] == "cam1" and row["track_id"] == 7 and row["event_type"] == "drinking"
+    assert row["end_time"] == 104.5 and row["confidence"] == 0.8 and row["clip_path"] == "clip.mp4"
+    assert store.snapshot() == {"written": 1, "pending": 0, "dropped": 0}
+
+
+def test_query_filters_and_orders_newest_first(store):
+    for i in range(10):
+        store.open_event(f"cam{i % 2}", i, "smoking" if i % 3 else "drinking", start_time=float(i))
+    store.flush()
+    rows = query(store.path, camera="cam1", event_type="smoking", since=2.0, until=9.0)
+    assert [r["track_id"] for r in rows] == [7, 5]
+    assert len(query(store.path, limit=3)) == 3
+
+
+def test_queries_use_the_indexes(store):
+    conn = connect(store.path)
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM events WHERE camera = ? AND event_type = ? AND start_time >= ?",
+        ("cam1", "smoking", 0.0)))
+    conn.close()
+    assert "idx_events_camera_type_time" in plan
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    store = EventStore(tmp_path / "events.db", max_pending=1, flush_interval=5.0)
+    try:
+        start = time.perf_counter()
+        for i in range(1000):
+            store.open_event("cam1", i, "smoking", start_time=float(i))
+        assert time.perf_counter() - start < 1.0
+        assert store.dropped > 0
+    finally:
+        store.close()
+
+
+def test_retention_deletes_only_old_rows(store):
+    now = time.time()
+    for i, age_days in enumerate([100, 95, 10, 0]):
+        store.open_event("cam1", i, "smoking", start_time=now - age_days * 86400)
+    store.flush()
+    conn = connect(store.path)
+    assert apply_retention(conn, retention_days=90, chunk=1) == 2
+    conn.close()
+    assert sorted(r["track_id"] for r in store.query()) == [2, 3]
+
+
+def test_parse_since():
+    assert _parse_since("1700000000") == 1700000000.0
+    assert abs(_parse_since("2h") - (time.time() - 7200)) < 5
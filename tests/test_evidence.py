@@ -0,0 +1,83 @@
+import cv2
+import pytest
+
+from app.evidence import EvidenceRecorder, FrameRingBuffer, decode_frame
+from fakes import blank_frame
+
+
+def test_ring_buffer_stores_raw_copies_by_default():
+    buffer = FrameRingBuffer()
+    frame = blank_frame(64, 48)
+    data = buffer.encode(frame)
+    frame[:] = 255  # caller draws on the frame afterwards
+    assert data.shape == (48, 64, 3) and not data.any()
+
+
+def test_compressed_ring_buffer_round_trips_jpeg():
+    buffer = FrameRingBuffer(compress=True)
+    data = buffer.encode(blank_frame(64, 48))
+    assert data.ndim == 1
+    assert decode_frame(data).shape == (48, 64, 3)
+
+
+def test_ring_buffer_caps_span_and_bytes():
+    frame = blank_frame(64, 48)
+    by_time = FrameRingBuffer(max_seconds=1.0)
+    for i in range(30):
+        by_time.push(frame.copy(), i * 0.1)
+    assert [t for t, _ in by_time.drain()][0] >= 1.9
+
+    by_size = FrameRingBuffer(max_bytes=3 * frame.nbytes)
+    for i in range(10):
+        by_size.push(frame.copy(), i * 0.01)
+    assert len(by_size) == 3 and by_size.nbytes == 3 * frame.nbytes
+
+
+def test_byte_cap_shortening_the_pre_roll_warns_once(capsys):
+    frame = blank_frame(64, 48)
+    buffer = FrameRingBuffer(max_seconds=5.0, max_bytes=3 * frame.nbytes)
+    for t in range(10):
+        buffer.push(frame.copy(), t * 0.1)
+    assert buffer.capped_seconds == pytest.approx(0.2)
+    assert capsys.readouterr().out.count("pre-roll limited") == 1
+
+
+def test_span_cap_alone_does_not_warn(capsys):
+    frame = blank_frame(64, 48)
+    buffer = FrameRingBuffer(max_seconds=1.0, max_bytes=100 * frame.nbytes)
+    for t in range(30):
+        buffer.push(frame.copy(), t * 0.1)
+    assert buffer.capped_seconds is None and capsys.readouterr().out == ""
+
+
+def test_recorder_writes_pre_and_post_roll(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    recorder = EvidenceRecorder(pre_roll_seconds=2.0, post_roll_seconds=2.0, block=True)
+    for t in range(10):  # only t = 7, 8, 9 stay in the pre-roll
+        recorder.push(blank_frame(64, 48), t)
+    assert recorder.trigger(path, 10.0, 10)
+    assert not recorder.trigger(path, 10.0, 10)
+    t = 10
+    while recorder.push(blank_frame(64, 48), t):  # 10..12, closed by the frame at 13
+        t += 1
+    recorder.close()
+
+    assert recorder.writer.written == [path]
+    capture = cv2.VideoCapture(path)
+    assert capture.get(cv2.CAP_PROP_FRAME_COUNT) == 3 + 4
+    capture.release()
+
+
+def test_recorder_sends_raw_frames_while_recording(tmp_path):
+    recorder = EvidenceRecorder(compress=True, block=True)
+    sent = []
+    submit = recorder.writer.submit
+    recorder.writer.submit = lambda item, block=False: sent.append(item) or submit(item, block)
+
+    recorder.push(blank_frame(64, 48), 0.0)
+    recorder.trigger(str(tmp_path / "clip.avi"), 10.0, 0.1)
+    recorder.push(blank_frame(64, 48), 0.2)
+    recorder.close()
+
+    frames = [item[1] for item in sent if item[0] == "frame"]
+    assert [data.ndim for data in frames] == [1, 3]  # JPEG pre-roll, then raw
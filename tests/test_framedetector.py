@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+from app import detector, framedetector, smokedetector
+from app.framedetector import FrameDetector
+
+# 1280x720 frames letterboxed to 640: ratio 0.5, 140 px of padding on top
+PERSON = (0, 0.9, [100, 190, 200, 440])   # (cls, conf, xyxy on the model input)
+BOTTLE = (39, 0.8, [0, 130, 20, 160])     # reaches into the top padding
+SMOKE = (0, 0.7, [300, 200, 400, 300])
+
+
+class _FakeYolo:
+    """Stands in for an ultralytics YOLO model: the same boxes for every image of a batch."""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+        self.calls = []  # [(batch size, classes, imgsz), ...]
+
+    def predict(self, source, classes=None, imgsz=640, conf=0.25, verbose=True):
+        self.calls.append((source.shape[0], classes, imgsz))
+        boxes = [SimpleNamespace(cls=[c], conf=[p], xyxy=[torch.tensor(xyxy)])
+                 for c, p, xyxy in self.boxes if p >= conf and (classes is None or c in classes)]
+        return [SimpleNamespace(boxes=boxes) for _ in range(source.shape[0])]
+
+
+@pytest.fixture
+def models(monkeypatch):
+    models = {
+        "yolov8n.pt": _FakeYolo([PERSON, BOTTLE]),
+        "app/best.pt": _FakeYolo([SMOKE]),
+        "merged.pt": _FakeYolo([PERSON, BOTTLE, (80, 0.7, SMOKE[2]), (2, 0.9, [0, 0, 10, 10])]),
+    }
+
+    def load_yolo(name, device="cpu"):
+        return models[name]
+
+    for module in (detector, smokedetector, framedetector):
+        monkeypatch.setattr(module, "load_yolo", load_yolo)
+    return models
+
+
+def _frames(n):
+    return [np.zeros((720, 1280, 3), dtype=np.uint8) for _ in range(n)]
+
+
+def test_split_models_share_one_batched_call_each(models):
+    results = FrameDetector().detect_batch(_frames(3))
+    assert models["yolov8n.pt"].calls == [(3, [0, 39], 640)]
+    assert models["app/best.pt"].calls == [(3, [0], 640)]
+
+    assert len(results) == 3
+    for result in results:
+        assert result["persons"] == [(200, 100, 400, 600, pytest.approx(0.9), 0)]
+        assert result["bottles"] == [pytest.approx([0, 0, 40, 40])]
+        assert result["smoke_detected"]
+        assert result["smoke_boxes"] == [pytest.approx([600, 120, 800, 320])]
+
+
+def test_split_models_not_asked_for_are_skipped(models):
+    fd = FrameDetector()
+    result = fd.detect(_frames(1)[0], smoke=False)
+    assert result["persons"] and result["smoke_detected"] is None and result["smoke_boxes"] is None
+    result = fd.detect(_frames(1)[0], persons=False, imgsz=320)
+    assert result["persons"] is None and result["bottles"] is None and result["smoke_detected"]
+    assert models["yolov8n.pt"].calls == [(1, [0, 39], 640)]
+    assert models["app/best.pt"].calls == [(1, [0], 320)]
+
+
+def test_merged_model_results_are_split_by_label(models):
+    fd = FrameDetector(merged_model="merged.pt")
+    results = fd.detect_batch(_frames(2))
+    assert models["merged.pt"].calls == [(2, [0, 39, 80], 640)]
+    for result in results:
+        assert [p[:4] for p in result["persons"]] == [(200, 100, 400, 600)]
+        assert result["bottles"] == [pytest.approx([0, 0, 40, 40])]
+        assert result["smoke_boxes"] == [pytest.approx([600, 120, 800, 320])]
+
+
+def test_no_frames_runs_no_model(models):
+    assert FrameDetector().detect_batch([]) == []
+    assert models["yolov8n.pt"].calls == [] and models["app/best.pt"].calls == []
@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.inferenceserver import BatchInferenceServer
+from fakes import FakeFrameDetector, blank_frame
+
+
+def _server(detector, **kwargs):
+    return BatchInferenceServer(detector, max_wait_ms=50, **kwargs).start()
+
+
+def test_detect_runs_only_requested_models_at_requested_size():
+    detector = FakeFrameDetector(persons=[(0, 0, 10, 10, 0.9, 0)], smoke_boxes=[[1, 1, 2, 2]])
+    server = _server(detector)
+    try:
+        result = server.detect(blank_frame(), persons=False, smoke=True, imgsz=320)
+    finally:
+        server.stop()
+    assert detector.calls == [(1, False, True, 320)]
+    assert result["persons"] is None
+    assert result["smoke_boxes"] == [[1, 1, 2, 2]]
+
+
+def test_incompatible_requests_never_share_a_batch():
+    detector = FakeFrameDetector()
+    server = _server(detector, max_batch_size=8)
+    keys = [(True, True, 640), (True, False, 640), (True, True, 320)] * 4
+    try:
+        with ThreadPoolExecutor(len(keys)) as pool:
+            list(pool.map(lambda k: server.detect(blank_frame(), *k), keys))
+    finally:
+        server.stop()
+    # Each key batched on its own, with all of its frames accounted for
+    per_key = {}
+    for n, persons, smoke, imgsz in detector.calls:
+        per_key[(persons, smoke, imgsz)] = per_key.get((persons, smoke, imgsz), 0) + n
+    assert per_key == {key: 4 for key in set(keys)}
+
+
+def test_compatible_requests_are_batched_together():
+    detector = FakeFrameDetector()
+    server = _server(detector, max_batch_size=4)
+    try:
+        results = server.detect_batch([blank_frame()] * 4, persons=True, smoke=False, imgsz=640)
+    finally:
+        server.stop()
+    assert len(results) == 4
+    assert detector.calls == [(4, True, False, 640)]
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from app.letterbox import LetterboxedFrame, letterbox
+
+
+def test_landscape_frame_is_padded_top_and_bottom():
+    frame = np.full((720, 1280, 3), 255, dtype=np.uint8)
+    prepared = letterbox(frame, 640)
+    assert prepared.tensor.shape == (1, 3, 640, 640)
+    assert prepared.ratio == pytest.approx(0.5)
+    assert prepared.pad == (0, 140) and prepared.shape == (720, 1280)
+
+    tensor = prepared.tensor[0]
+    assert tensor[:, :140].max() == pytest.approx(114 / 255)  # pad rows
+    assert tensor[:, 500:].max() == pytest.approx(114 / 255)
+    assert tensor[:, 140:500].min() == pytest.approx(1.0)    # resized frame
+
+
+def test_portrait_frame_is_padded_left_and_right():
+    frame = np.zeros((600, 300, 3), dtype=np.uint8)
+    frame[..., 2] = 255  # BGR red
+    prepared = letterbox(frame, 320)
+    assert prepared.ratio == pytest.approx(320 / 600)
+    assert prepared.pad == (80, 0)
+
+    tensor = prepared.tensor[0]
+    assert tensor[0, :, 80:240].min() == pytest.approx(1.0)  # red comes first: RGB
+    assert tensor[2, :, 80:240].max() == 0.0
+    assert tensor[:, :, :80].max() == pytest.approx(114 / 255)
+
+
+def test_boxes_map_back_to_frame_pixels():
+    prepared = letterbox(np.zeros((720, 1280, 3), dtype=np.uint8), 640)
+    assert prepared.to_frame_coords([100, 190, 200, 440]) == pytest.approx([200, 100, 400, 600])
+
+
+def test_boxes_reaching_into_the_padding_are_clipped():
+    prepared = letterbox(np.zeros((720, 1280, 3), dtype=np.uint8), 640)
+    assert prepared.to_frame_coords([-4, 130, 20, 160]) == pytest.approx([0, 0, 40, 40])
+    assert prepared.to_frame_coords([600, 480, 650, 510]) == pytest.approx([1200, 680, 1280, 720])
+
+
+def test_without_frame_shape_boxes_are_not_clipped():
+    prepared = LetterboxedFrame(None, 0.5, (0, 140))
+    assert prepared.to_frame_coords([0, 130, 20, 160]) == pytest.approx([0, -20, 40, 40])
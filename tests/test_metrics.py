@@ -0,0 +1,56 @@
+import json
+
+from app.metrics import JsonDumper, MetricsRegistry
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    cam = registry.camera("cam1")
+    with cam.span("detect"):
+        pass
+    cam.inc("frames")
+    assert cam.snapshot() == {"stages": {}, "counters": {}}
+
+
+def test_spans_and_counters_per_camera():
+    registry = MetricsRegistry()
+    registry.enabled = True
+    cam = registry.camera("cam1")
+    for _ in range(3):
+        with cam.span("detect"):
+            pass
+    cam.inc("smoking")
+    cam.inc("smoking")
+    snap = registry.snapshot()["cameras"]["cam1"]
+    assert snap["stages"]["detect"]["count"] == 3
+    assert snap["counters"] == {"smoking": 2}
+    assert registry.camera("cam1") is cam
+
+
+def test_prometheus_groups_samples_by_family():
+    registry = MetricsRegistry()
+    registry.enabled = True
+    for name in ("a", "b"):
+        cam = registry.camera(name)
+        cam.observe("track", 0.01)
+        cam.inc("drinking")
+    with registry.model_span("persons"):
+        pass
+    lines = registry.prometheus().splitlines()
+
+    families = [line.split()[2] for line in lines if line.startswith("# TYPE")]
+    assert families == ["cctv_model_inference_seconds", "cctv_stage_seconds", "cctv_events_total"]
+    assert 'cctv_events_total{camera="b",event="drinking"} 1' in lines
+    # Samples of one family are contiguous
+    names = [line.split("{")[0].replace("_sum", "").replace("_count", "") for line in lines
+             if not line.startswith("#")]
+    assert names == sorted(names, key=families.index)
+
+
+def test_json_dumper_writes_a_snapshot(tmp_path):
+    registry = MetricsRegistry()
+    registry.enabled = True
+    registry.camera("cam1").inc("frames", 5)
+    path = tmp_path / "metrics.json"
+    JsonDumper(str(path), registry=registry).dump()
+    assert json.loads(path.read_text())["cameras"]["cam1"]["counters"] == {"frames": 5}
@@ -0,0 +1,52 @@
+import threading
+import time
+
+from app.modelregistry import ModelRegistry
+
+
+class _Model:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_builds_once_and_warms_up():
+    registry = ModelRegistry()
+    built, warmed = [], []
+
+    def factory():
+        built.append(_Model())
+        return built[-1]
+
+    first = registry.get("det", factory, warmup=warmed.append)
+    assert registry.get("det", factory) is first
+    assert built == [first] and warmed == [first]
+    assert set(registry.timings["det"]) == {"load_s", "warmup_s"}
+
+
+def test_concurrent_callers_share_one_load():
+    registry = ModelRegistry()
+    built = []
+
+    def slow_factory():
+        time.sleep(0.05)
+        built.append(_Model())
+        return built[-1]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("det", slow_factory)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1 and all(model is built[0] for model in results)
+
+
+def test_clear_closes_models():
+    registry = ModelRegistry()
+    model = registry.get("pose", _Model)
+    registry.clear()
+    assert model.closed and not registry.loaded("pose")
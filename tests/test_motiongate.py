@@ -0,0 +1,37 @@
+import numpy as np
+
+from app.motiongate import MotionGate
+from fakes import blank_frame
+
+
+def test_static_scene_runs_only_at_the_idle_interval():
+    gate = MotionGate(idle_interval=5, hold_seconds=0.0)
+    frame = blank_frame()
+    runs = [gate.should_infer(frame, i / 30.0) for i in range(11)]
+    # First frame counts as motion; afterwards every 5th frame
+    assert runs == [True, False, False, False, False, True, False, False, False, False, True]
+    assert gate.snapshot()["skipped"] == 8
+
+
+def test_motion_and_active_tracks_force_inference():
+    gate = MotionGate(idle_interval=100, hold_seconds=0.0)
+    still = blank_frame()
+    gate.should_infer(still, 0.0)
+    assert gate.should_infer(still, 0.1) is False
+    assert gate.should_infer(still, 0.2, active_tracks=1) is True
+
+    moved = still.copy()
+    moved[100:300, 100:300] = 255
+    assert gate.should_infer(moved, 0.3) is True
+    assert gate.last_mask is not None and np.count_nonzero(gate.last_mask) > 0
+
+
+def test_motion_holds_full_rate_for_hold_seconds():
+    gate = MotionGate(idle_interval=100, hold_seconds=1.0)
+    still = blank_frame()
+    moved = still.copy()
+    moved[:, :320] = 255
+    gate.should_infer(still, 0.0)
+    gate.should_infer(moved, 0.1)
+    assert gate.should_infer(moved, 0.5) is True   # frame identical to the previous one
+    assert gate.should_infer(moved, 2.0) is False
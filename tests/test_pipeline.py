@@ -0,0 +1,56 @@
+import threading
+
+from app.pipeline import FrameQueue, Pipeline, StageStats
+
+
+def test_drop_oldest_keeps_the_latest_items():
+    stats = StageStats("capture")
+    q = FrameQueue(maxsize=2, drop_oldest=True, stats=stats)
+    for i in range(5):
+        assert q.put(i)
+    assert [q.get(timeout=0.1), q.get(timeout=0.1)] == [3, 4]
+    assert stats.snapshot()["dropped"] == 3
+
+
+def test_blocking_queue_waits_for_the_consumer():
+    q = FrameQueue(maxsize=1)
+    q.put(1)
+    done = threading.Event()
+    threading.Thread(target=lambda: (q.put(2), done.set()), daemon=True).start()
+    assert not done.wait(0.2)
+    assert q.get(timeout=1) == 1
+    assert done.wait(1.0)
+    assert q.get(timeout=1) == 2
+
+
+def test_closed_queue_drains_then_returns_none():
+    q = FrameQueue(maxsize=4)
+    q.put("a")
+    q.close()
+    assert q.put("b") is False
+    assert q.get() == "a"
+    assert q.get() is None
+
+
+def test_pipeline_keeps_order_and_reports_stage_errors():
+    items = iter(range(20))
+    pipeline = Pipeline(live=False, queue_size=2)
+    pipeline.set_source("capture", lambda: next(items, None))
+    pipeline.add_stage("double", lambda x: x * 2)
+    pipeline.add_stage("inc", lambda x: x + 1)
+    output = pipeline.start()
+    out = []
+    while (item := output.get(timeout=2)) is not None:
+        out.append(item)
+    pipeline.join()
+    assert out == [2 * i + 1 for i in range(20)]
+    assert pipeline.errors() == []
+
+    failing = Pipeline(queue_size=2)
+    failing.set_source("capture", lambda: 1)
+    failing.add_stage("boom", lambda x: 1 / 0)
+    output = failing.start()
+    assert output.get(timeout=2) is None
+    failing.stop()
+    failing.join()
+    assert isinstance(failing.errors()[0], ZeroDivisionError)
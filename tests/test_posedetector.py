@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.posedetector import LitePoseResult, PoseDetector
+
+
+class _Estimator:
+    def __init__(self, static_image_mode=False, **kwargs):
+        self.static_image_mode = static_image_mode
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class _Solutions:
+    """Stands in for mp.solutions.holistic / .pose / .drawing_utils."""
+    created = []
+
+    @classmethod
+    def Holistic(cls, **kwargs):
+        cls.created.append(_Estimator(**kwargs))
+        return cls.created[-1]
+
+    Pose = Holistic
+
+
+def _detector(cap, mode="holistic"):
+    _Solutions.created = []
+    return PoseDetector(mode=mode, mp_holistic=_Solutions, mp_pose=_Solutions, mp_drawing=_Solutions,
+                        max_track_estimators=cap, draw_landmarks=False)
+
+
+def _landmarks(points, visibility=1.0):
+    """33 Pose landmarks, all invisible except points {index: (x, y)} (normalized)."""
+    lms = [SimpleNamespace(x=0.0, y=0.0, visibility=0.0) for _ in range(33)]
+    for idx, (x, y) in points.items():
+        lms[idx] = SimpleNamespace(x=x, y=y, visibility=visibility)
+    return SimpleNamespace(pose_landmarks=SimpleNamespace(landmark=lms))
+
+
+FACE = {0: (0.5, 0.2), 3: (0.45, 0.15), 6: (0.55, 0.15)}  # nose, outer eye corners
+
+
+def test_unknown_mode_raises():
+    with pytest.raises(ValueError):
+        PoseDetector(mode="full-body")
+
+
+def test_lite_maps_body_landmarks_to_keypoints():
+    results = _landmarks({**FACE, 20: (0.5, 0.25), 19: (0.9, 0.9)})
+    pose = LitePoseResult(results, 200, 100, offset=(10, 20))
+    assert pose.nose == (110, 40)
+    assert pose.hands == [(110, 45), (190, 110)]  # 20 = right index tip first, then 19
+    assert pose.face_width == pytest.approx(20.0)  # outer eye corners, 0.1 * 200 px
+    assert pose.hand_to_mouth()
+
+
+def test_lite_drops_landmarks_below_the_visibility_cutoff():
+    results = _landmarks({**FACE, 20: (0.5, 0.25)}, visibility=0.4)
+    pose = LitePoseResult(results, 200, 100)
+    assert pose.nose is None and pose.hands == [] and pose.face_width == 0.0
+    assert pose.person_points() is None
+
+    results.pose_landmarks.landmark[0].visibility = 0.5  # cutoff is inclusive
+    assert LitePoseResult(results, 200, 100).nose == (100, 20)
+
+
+def test_lite_without_a_person():
+    pose = LitePoseResult(SimpleNamespace(pose_landmarks=None), 200, 100)
+    assert pose.keypoints() == [] and not pose.hand_to_mouth()
+
+
+def test_lite_mode_builds_pose_estimators():
+    pose = _detector(2, mode="lite")
+    assert pose._estimator_for(1) is _Solutions.created[-1]
+
+
+def test_track_keeps_its_estimator():
+    pose = _detector(2)
+    assert pose._estimator_for(1) is pose._estimator_for(1)
+
+
+def test_full_pool_falls_back_to_static_without_evicting():
+    pose = _detector(2)
+    first, second = pose._estimator_for(1), pose._estimator_for(2)
+    overflow = pose._estimator_for(3)
+
+    assert overflow.static_image_mode
+    assert pose._estimator_for(1) is first and pose._estimator_for(2) is second
+    assert not first.closed and not second.closed
+    assert pose.pool_overflow == 1
+
+
+def test_released_slot_is_reused():
+    pose = _detector(1)
+    old = pose._estimator_for(1)
+    pose.release_tracks([2])
+    assert old.closed
+    assert not pose._estimator_for(2).static_image_mode
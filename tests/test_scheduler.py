@@ -0,0 +1,27 @@
+from app.scheduler import ModelScheduler
+
+
+def test_each_model_runs_at_its_interval():
+    scheduler = ModelScheduler({"persons": 1, "smoke": 3, "pose": 2})
+    plans = [scheduler.plan() for _ in range(6)]
+    assert [p["persons"] for p in plans] == [True] * 6
+    assert [p["smoke"] for p in plans] == [True, False, False, True, False, False]
+    assert [p["pose"] for p in plans] == [True, False, True, False, True, False]
+
+
+def test_hot_model_runs_every_frame_and_restarts_its_cadence():
+    scheduler = ModelScheduler({"smoke": 4})
+    scheduler.plan()
+    assert scheduler.plan({"smoke": True})["smoke"] is True
+    assert scheduler.plan({"smoke": True})["smoke"] is True
+    # Cooled down: the interval counts from the last (escalated) run
+    assert [scheduler.plan()["smoke"] for _ in range(4)] == [False, False, False, True]
+    assert scheduler.snapshot()["smoke"]["escalated"] == 2
+
+
+def test_reset_runs_everything_on_the_next_frame():
+    scheduler = ModelScheduler({"smoke": 10})
+    scheduler.plan()
+    scheduler.plan()
+    scheduler.reset()
+    assert scheduler.plan()["smoke"] is True
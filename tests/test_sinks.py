@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from app.sinks import MJPEGSink, OutputSink, SharedMemorySink, build_sinks
+from fakes import blank_frame
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class _ListSink(OutputSink):
+    name = "list"
+
+    def __init__(self, fps=10.0, width=None):
+        super().__init__(fps, width)
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+
+def test_output_sink_requires_write():
+    with pytest.raises(TypeError):
+        OutputSink()
+
+
+def test_due_follows_the_preview_fps():
+    sink = _ListSink(fps=10.0)
+    due = [sink.due(i * 0.05) for i in range(6)]  # 20 fps in
+    assert due == [True, False, True, False, True, False]
+    assert sink.due(0.0)  # clock restarted
+
+
+def test_submit_downscales_a_copy_and_writes_on_the_sink_thread():
+    sink = _ListSink(width=32).start()
+    frame = blank_frame(64, 48)
+    sink.submit(frame)
+    frame[:] = 255
+    deadline = time.time() + 2.0
+    while not sink.frames and time.time() < deadline:
+        time.sleep(0.01)
+    sink.close()
+    assert sink.frames[0].shape == (24, 32, 3) and not sink.frames[0].any()
+
+
+def test_mjpeg_is_not_due_without_viewers():
+    sink = MJPEGSink(fps=0)
+    assert not sink.due(0.0)
+    with sink.viewer():
+        assert sink.due(0.0)
+    assert not sink.due(0.1)
+
+
+_VIEWER = """
+import sys
+from app.sinks import SharedMemoryReader
+reader = SharedMemoryReader(sys.argv[1])
+first, second = reader.read(), reader.read()
+print(first.shape, int(first.sum()), second is None)
+reader.close()
+"""
+
+
+def test_shared_memory_round_trip():
+    # The viewer is a separate interpreter, as with `python -m app.sinks NAME`
+    sink = SharedMemorySink(shm_name=f"cctv_test_{time.time_ns()}")
+    frame = np.arange(48 * 64 * 3, dtype=np.uint8).reshape(48, 64, 3)
+    sink.write(frame)
+    try:
+        out = subprocess.run([sys.executable, "-c", _VIEWER, sink.shm_name], capture_output=True,
+                             text=True, timeout=30, cwd=ROOT, check=True).stdout
+    finally:
+        sink.close()
+    assert out.split() == ["(48,", "64,", "3)", str(int(frame.sum())), "True"]
+
+
+def test_build_sinks_rejects_unknown_types():
+    assert not build_sinks(["none"])
+    with pytest.raises(ValueError):
+        build_sinks(["hologram"])
@@ -0,0 +1,150 @@
+import json
+import queue
+import threading
+
+import pytest
+
+from app import modelregistry
+from app.cctvprocessor import CCTVProcessor
+from app.inferenceserver import BatchInferenceServer
+from app.supervisor import Supervisor, _SharedDetector, _run_stream, _shared_detectors, load_config
+from fakes import FakeFrameDetector, FakePoseDetector
+
+
+def _write(tmp_path, config):
+    path = tmp_path / "cameras.json"
+    path.write_text(json.dumps(config))
+    return str(path)
+
+
+def test_load_config_fills_in_ids(tmp_path):
+    config = load_config(_write(tmp_path, {"sources": [{"source": 0}, {"id": "door", "source": "a.mp4"}]}))
+    assert [src["id"] for src in config["sources"]] == ["cam0", "door"]
+
+
+@pytest.mark.parametrize("config", [
+    {},
+    {"sources": []},
+    {"sources": [{"id": "cam1"}]},
+    {"sources": ["rtsp://10.0.0.11/stream"]},
+    {"sources": [{"id": "cam1", "source": 0}, {"id": "cam1", "source": 1}]},
+])
+def test_load_config_rejects_invalid_entries(tmp_path, config):
+    with pytest.raises(ValueError):
+        load_config(_write(tmp_path, config))
+
+
+def _sources(n):
+    return [{"id": f"cam{i}", "source": f"rtsp://10.0.0.{i}/stream"} for i in range(n)]
+
+
+def test_supervisor_defaults_and_round_robin():
+    supervisor = Supervisor({"sources": _sources(5), "workers": 2})
+    assert supervisor.restart_delay == 5.0 and supervisor.pin_cores
+    assert [[src["id"] for src in group] for group in supervisor.assignments] == [
+        ["cam0", "cam2", "cam4"], ["cam1", "cam3"]]
+
+
+def test_supervisor_never_starts_idle_workers():
+    supervisor = Supervisor({"sources": _sources(3), "workers": 8, "pin_cores": False})
+    assert supervisor.n_workers == 3 and supervisor._core_for(0) is None
+
+
+def test_supervisor_rejects_bad_camera_settings():
+    sources = _sources(1)
+    sources[0]["settings"] = {"NOT_A_SETTING": 1}
+    with pytest.raises(ValueError):
+        Supervisor({"sources": sources})
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    built = []
+
+    def build(cls, config=None):
+        built.append(FakeFrameDetector())
+        return built[-1]
+
+    monkeypatch.setattr(CCTVProcessor, "build_frame_detector", classmethod(build))
+    modelregistry.MODELS.clear()
+    yield built
+    modelregistry.MODELS.clear()
+
+
+def test_identical_detector_settings_share_one_detector(fake_models):
+    sources = [{"source": 0}, {"source": 1, "settings": {"TILING": True}},
+               {"source": 2, "settings": {"SMOKE_CONF": 0.7}}]
+    detectors, servers = _shared_detectors(sources)
+    assert len(fake_models) == 2 and servers == []
+    assert detectors[0] is detectors[1] and detectors[2] is not detectors[0]
+    assert isinstance(detectors[0], _SharedDetector)
+    assert detectors[0].frame_detector is fake_models[0]
+
+
+def test_batch_inference_gets_one_server_per_detector(fake_models):
+    sources = [{"source": 0}, {"source": 1}, {"source": 2, "settings": {"SMOKE_CONF": 0.7}}]
+    detectors, servers = _shared_detectors(sources, {"max_batch_size": 2})
+    try:
+        assert len(servers) == 2 and all(isinstance(s, BatchInferenceServer) for s in servers)
+        assert detectors[0] is detectors[1] is servers[0]
+    finally:
+        for server in servers:
+            server.stop()
+
+
+class _Event(threading.Event):
+    """Records the restart delays _run_stream waits for."""
+
+    def __init__(self):
+        super().__init__()
+        self.delays = []
+
+    def wait(self, timeout=None):
+        if timeout is not None:
+            self.delays.append(timeout)
+        return super().wait(timeout)
+
+
+def _stream(tmp_path, monkeypatch, source, outcomes):
+    """
+    Runs _run_stream with run_logic replaced by outcomes: one per run,
+    "ok", "crash" or "stop" (sets the stop event, as Supervisor.stop does).
+    """
+    stop_event = _Event()
+    runs = []
+
+    def run_logic(self, video_source, display=True):
+        outcome = outcomes[len(runs)]
+        runs.append(video_source)
+        if outcome == "crash":
+            raise RuntimeError("stream lost")
+        if outcome == "stop":
+            stop_event.set()
+        return True
+
+    monkeypatch.setattr(CCTVProcessor, "run_logic", run_logic)
+    monkeypatch.setattr("app.posedetector.PoseDetector", lambda mode: FakePoseDetector())
+    src = {"id": "cam1", "source": source,
+           "settings": {"EVIDENCE_FOLDER": str(tmp_path), "EVENT_STORE": False}}
+    status = queue.Queue()
+    _run_stream(src, FakeFrameDetector(), stop_event, 0.01, status)
+    stopped = [info for kind, _, info in list(status.queue) if kind == "stopped"]
+    return runs, stopped, stop_event.delays
+
+
+def test_finished_file_is_not_restarted(tmp_path, monkeypatch):
+    runs, stopped, delays = _stream(tmp_path, monkeypatch, "clip.mp4", ["ok"])
+    assert len(runs) == 1 and stopped == ["finished"] and delays == []
+
+
+def test_crashed_file_is_restarted_after_the_delay(tmp_path, monkeypatch):
+    runs, stopped, delays = _stream(tmp_path, monkeypatch, "clip.mp4", ["crash", "ok"])
+    assert len(runs) == 2
+    assert stopped[0].startswith("crashed") and stopped[1] == "finished"
+    assert delays == [0.01]
+
+
+def test_live_stream_is_restarted_until_stopped(tmp_path, monkeypatch):
+    runs, stopped, delays = _stream(tmp_path, monkeypatch, "rtsp://10.0.0.1/stream", ["ok", "crash", "stop"])
+    assert len(runs) == 3
+    assert delays[:2] == [0.01, 0.01]
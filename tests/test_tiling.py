@@ -0,0 +1,61 @@
+import numpy as np
+
+from app.tiling import InferenceScalePolicy, TiledInference, merge_boxes, tile_grid
+from fakes import FakeFrameDetector
+
+
+def test_tile_grid_covers_the_frame_with_overlap():
+    tiles = tile_grid(1920, 1080, tile=640, overlap=0.2)
+    covered = np.zeros((1080, 1920), dtype=bool)
+    for x1, y1, x2, y2 in tiles:
+        assert x2 - x1 <= 640 and y2 - y1 <= 640
+        covered[y1:y2, x1:x2] = True
+    assert covered.all()
+    assert tile_grid(320, 240, tile=640) == [(0, 0, 320, 240)]
+
+
+def test_merge_keeps_the_larger_box_and_drops_contained_fragments():
+    full = [100, 100, 200, 200]
+    fragment = [150, 100, 200, 200]  # cut at a tile edge
+    other = [400, 400, 450, 450]
+    merged = merge_boxes([fragment, full, other], ios_threshold=0.6)
+    assert merged == [[100.0, 100.0, 200.0, 200.0], [400.0, 400.0, 450.0, 450.0]]
+    assert merge_boxes([full]) == [full]
+
+
+def test_scale_policy_rounds_to_stride_and_clamps():
+    policy = InferenceScalePolicy(min_imgsz=320, max_imgsz=640)
+    assert policy.imgsz_for((240, 426, 3)) == 448
+    assert policy.imgsz_for((100, 100, 3)) == 320
+    assert policy.imgsz_for((2160, 3840, 3)) == 640
+
+
+def test_tiles_without_motion_or_people_are_skipped():
+    tiler = TiledInference(tile_size=640, overlap=0.0, min_frame_side=1280)
+    shape = (1280, 1280, 3)
+    mask = np.zeros((320, 320), dtype=np.uint8)
+    assert tiler.active_tiles(shape, mask) == []
+    mask[10, 10] = 255  # motion in the top-left tile only
+    assert tiler.active_tiles(shape, mask) == [(0, 0, 640, 640)]
+    person = [(900, 900, 1000, 1100, 0.9, 0)]
+    assert (640, 640, 1280, 1280) in tiler.active_tiles(shape, np.zeros_like(mask), person)
+
+
+def test_detect_runs_only_the_targets_at_tile_size_and_merges_into_frame_coords():
+    detector = FakeFrameDetector(smoke_boxes=[[10, 10, 20, 20]])
+    tiler = TiledInference(tile_size=640, overlap=0.0, min_frame_side=1280, targets=("smoke",))
+    frame = np.zeros((1280, 1280, 3), dtype=np.uint8)
+    base = {"persons": [], "bottles": [], "smoke_detected": False, "smoke_boxes": []}
+    out = tiler.detect(detector, frame, base, persons=True, smoke=True)
+    assert detector.calls == [(4, False, True, 640)]
+    assert sorted(out["smoke_boxes"]) == [[10, 10, 20, 20], [10, 650, 20, 660],
+                                          [650, 10, 660, 20], [650, 650, 660, 660]]
+    assert out["smoke_detected"] is True
+    assert out["bottles"] == []
+
+
+def test_small_frames_are_not_tiled():
+    detector = FakeFrameDetector()
+    base = {"persons": [], "bottles": [], "smoke_detected": False, "smoke_boxes": []}
+    assert TiledInference(min_frame_side=1920).detect(detector, np.zeros((720, 1280, 3), np.uint8), base) is base
+    assert detector.calls == []
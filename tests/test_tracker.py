@@ -0,0 +1,66 @@
+import numpy as np
+
+from app.tracker import KalmanTracker, iou_matrix
+
+
+def _det(x, y=100, w=50, h=120, conf=0.9):
+    return (x, y, x + w, y + h, conf, 0)
+
+
+def _ids(tracked):
+    return sorted(oid for oid, _, _, _ in tracked)
+
+
+def test_iou_matrix():
+    iou = iou_matrix([[0, 0, 10, 10]], [[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]])
+    assert np.allclose(iou, [[1.0, 1 / 3, 0.0]], atol=1e-6)
+    assert iou_matrix([], [[0, 0, 1, 1]]).shape == (0, 1)
+
+
+def test_ids_stay_stable_for_moving_people():
+    tracker = KalmanTracker(min_hits=1)
+    first = None
+    for i in range(20):
+        tracked = tracker.update([_det(50 + 3 * i), _det(400 - 3 * i)])
+        if first is None:
+            first = {oid: bbox[0] for oid, bbox, _, _ in tracked}
+    assert _ids(tracked) == sorted(first)
+    by_id = {oid: bbox[0] for oid, bbox, _, _ in tracked}
+    left = min(first, key=first.get)
+    assert by_id[left] < by_id[max(first, key=first.get)]
+
+
+def test_track_reported_only_after_min_hits():
+    tracker = KalmanTracker(min_hits=3)
+    tracker.update([_det(50)])  # frame_count <= min_hits: reported immediately
+    for i in range(5):
+        tracker.update([_det(50)])
+    # A new person later in the stream must be matched min_hits times first
+    assert len(tracker.update([_det(50), _det(400)])) == 1
+    tracker.update([_det(50), _det(400)])
+    assert len(tracker.update([_det(50), _det(400)])) == 2
+
+
+def test_track_coasts_through_a_short_gap_and_keeps_its_id():
+    tracker = KalmanTracker(min_hits=1, max_age=5)
+    for i in range(5):
+        (oid, _, _, _), = tracker.update([_det(100 + 2 * i)])
+    for _ in range(3):
+        assert tracker.update([]) == []  # coasting tracks are not reported
+    assert _ids(tracker.update([_det(118)])) == [oid]
+
+
+def test_track_deleted_after_max_age():
+    tracker = KalmanTracker(min_hits=1, max_age=2)
+    (oid, _, _, _), = tracker.update([_det(100)])
+    for _ in range(4):
+        tracker.update([])
+    assert _ids(tracker.update([_det(100)])) != [oid]
+
+
+def test_low_score_detection_keeps_a_track_but_never_starts_one():
+    tracker = KalmanTracker(min_hits=1, high_thresh=0.5, low_thresh=0.1)
+    (oid, _, _, _), = tracker.update([_det(100, conf=0.9)])
+    assert _ids(tracker.update([_det(101, conf=0.2)])) == [oid]
+    assert tracker.update([_det(400, conf=0.2)]) == []
+    assert tracker.update([_det(400, conf=0.05)]) == []
@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+import pytest
+
+from app.videosource import FramePool, OpenCVSource, VideoSource, open_source
+
+
+def _clip(path, frames=6, size=(64, 48)):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, size)
+    for i in range(frames):
+        writer.write(np.full((size[1], size[0], 3), 40 * i, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def test_video_source_is_abstract():
+    with pytest.raises(TypeError):
+        VideoSource()
+
+
+def test_frame_pool_reuses_buffers_round_robin():
+    pool = FramePool(2)
+    a, b = np.zeros(3), np.zeros(3)
+    assert pool.put(a, pool.get()) is a
+    assert pool.put(b, pool.get()) is b
+    assert pool.get() is a and pool.get() is b and pool.get() is a
+
+
+def test_frame_pool_restarts_when_the_size_changes():
+    pool = FramePool(2)
+    pool.put(np.zeros(3), pool.get())
+    pool.put(np.zeros(3), pool.get())
+    bigger = np.zeros(4)
+    pool.put(bigger, pool.get())
+    assert pool.get() is None  # refilling with the new size
+
+
+def test_opencv_source_strides_downscales_and_reuses_buffers(tmp_path):
+    with open_source(_clip(tmp_path / "clip.avi"), backend="opencv", width=32, stride=2) as source:
+        assert isinstance(source, OpenCVSource)
+        frames = []
+        while (item := source.read()) is not None:
+            frames.append(item)
+    assert [index for index, _ in frames] == [0, 2, 4]
+    assert frames[0][1].shape == (24, 32, 3)
+    assert frames[2][1] is frames[0][1]  # pool_size=2
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        open_source("clip.avi", backend="gstreamer")
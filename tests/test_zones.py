@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from app.zones import Zone, ZoneSet, shift_detections
+
+LEFT_HALF = [[0.0, 0.0], [0.5, 0.0], [0.5, 1.0], [0.0, 1.0]]
+
+
+def test_normalized_points_scale_with_the_frame():
+    zone = Zone(LEFT_HALF)
+    assert zone.normalized
+    assert zone.pixels(200, 100).tolist() == [[0, 0], [100, 0], [100, 100], [0, 100]]
+
+
+def test_pixel_points_are_kept_and_the_guess_can_be_overridden():
+    assert not Zone([[0, 0], [640, 0], [640, 480]]).normalized
+    tiny = Zone.from_config({"points": [[0, 0], [1, 0], [1, 1]], "normalized": False})
+    assert tiny.pixels(640, 480).tolist() == [[0, 0], [1, 0], [1, 1]]
+
+
+def test_coverage_and_contains_box():
+    zones = ZoneSet([LEFT_HALF], min_overlap=0.3, crop_margin=0)
+    shape = (100, 200, 3)
+    assert zones.coverage((0, 0, 50, 50), shape) == pytest.approx(1.0)
+    assert zones.coverage((150, 0, 200, 50), shape) == 0.0
+    assert zones.coverage((80, 0, 120, 10), shape) == pytest.approx(21 / 40, abs=0.03)
+    assert zones.contains_box((80, 0, 120, 10), shape)
+    assert not zones.contains_box((150, 0, 200, 50), shape)
+    assert zones.coverage((-50, -50, -10, -10), shape) == 0.0
+
+
+def test_exclude_zone_cuts_the_monitored_area():
+    zones = ZoneSet([{"points": [[0.0, 0.0], [0.25, 0.0], [0.25, 1.0], [0.0, 1.0]], "mode": "exclude"}],
+                    crop_margin=0)
+    shape = (100, 200, 3)
+    assert zones.coverage((0, 0, 40, 100), shape) == 0.0
+    assert zones.coverage((100, 0, 200, 100), shape) == pytest.approx(1.0)
+
+
+def test_crop_is_a_view_of_the_zone_bounding_box_with_margin():
+    zones = ZoneSet([LEFT_HALF], crop_margin=10)
+    frame = np.zeros((100, 200, 3), dtype=np.uint8)
+    view, offset = zones.crop(frame)
+    assert offset == (0, 0)
+    assert view.shape[:2] == (100, 111)
+    assert np.shares_memory(view, frame)
+    assert zones.crop_fraction(frame.shape) == pytest.approx(111 / 200)
+
+
+def test_empty_zoneset_is_the_whole_frame():
+    zones = ZoneSet()
+    frame = np.zeros((10, 10, 3), dtype=np.uint8)
+    assert not zones
+    assert zones.crop(frame) == (frame, (0, 0))
+    assert zones.coverage((0, 0, 1, 1), frame.shape) == 1.0
+
+
+def test_zones_without_area_are_rejected():
+    everything_excluded = [{"points": [[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]], "mode": "exclude"}]
+    with pytest.raises(ValueError):
+        ZoneSet(everything_excluded).crop(np.zeros((10, 10, 3), dtype=np.uint8))
+    with pytest.raises(ValueError):
+        Zone(LEFT_HALF, mode="maybe")
+
+
+def test_shift_detections_keeps_missing_parts():
+    dets = {"persons": [(1, 2, 3, 4, 0.9, 0)], "bottles": None, "smoke_detected": False, "smoke_boxes": [[0, 0, 1, 1]]}
+    out = shift_detections(dets, (10, 20))
+    assert out["persons"] == [(11, 22, 13, 24, 0.9, 0)]
+    assert out["bottles"] is None
+    assert out["smoke_boxes"] == [[10, 20, 11, 21]]